@@ -0,0 +1,249 @@
+# Benchmark: surveillance d'une flotte de serveurs contre un panel simulé
+#
+# Pour chaque taille de flotte, démarre le panel simulé (mock_panel.py) dans un processus
+# séparé, puis exécute le bot dans un autre processus avec un canal Discord simulé:
+# récupération de l'inventaire (fetch_servers), passages de vérification
+# (check_server_status), publication des statuts (post_server_status) et mémoire.
+#
+# Utilisation: python benchmarks/bench_fleet.py [--sizes 10,100,1000] [--latency 0.02]
+#              [--rate-limit 0] [--error-rate 0] [--streaming] [--dashboard] [--wings] [--json résultats.json]
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Fonction pour trouver un port local libre
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+# Fonction pour attendre que le panel simulé réponde
+def wait_for_panel(port, timeout=15):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Le panel simulé ne répond pas sur le port {port}")
+
+# Scénario exécuté dans le processus du bot
+async def run_scenario(args):
+    import aiohttp
+    import tracemalloc
+    import resource
+
+    from mock_panel import NODES
+
+    data_dir = tempfile.mkdtemp(prefix="pterobot-bench-")
+    os.environ.update({
+        "PTERODACTYL_API_URL": f"http://127.0.0.1:{args.port}",
+        "PTERODACTYL_API_KEY": "benchmark",
+        "DISCORD_TOKEN": "benchmark",
+        "NOTIFICATION_CHANNEL_ID": "1",
+        "API_RATE_LIMIT": str(args.rate_limit or 1000000),
+        "CONSOLE_STREAMING": "true" if args.streaming else "false",
+        "DASHBOARD_MODE": "true" if args.dashboard else "false",
+        "OUTBOX_WINDOW": "0.1",
+        "STATE_DB_FILE": os.path.join(data_dir, "state.db"),
+        "GAME_PROFILES_FILE": os.path.join(data_dir, "game_profiles.json"),
+        "PERF_FILE": "",
+        "LOG_LEVEL": "ERROR",
+        "WINGS_NODES": json.dumps({
+            f"node-{i}": {"url": f"http://127.0.0.1:{args.port}/wings/node-{i}", "token": "wings"} for i in range(NODES)
+        }) if args.wings else "",
+    })
+    sys.path.insert(0, os.path.join(BENCH_DIR, ".."))
+    import bot
+    from discord_stub import StubChannel
+
+    channel = StubChannel(latency=args.discord_latency)
+    bot.bot.get_channel = lambda channel_id: channel
+    if args.mode == "memory":
+        tracemalloc.start()
+
+    panel_url = f"http://127.0.0.1:{args.port}"
+    results = {"servers": args.scenario, "mode": args.mode}
+
+    async with aiohttp.ClientSession() as session:
+        async def panel_stats(reset=True):
+            async with session.get(f"{panel_url}/_stats") as response:
+                stats = await response.json()
+            if reset:
+                await session.post(f"{panel_url}/_stats/reset")
+            return stats
+
+        await panel_stats()
+
+        # Inventaire
+        started = time.perf_counter()
+        await bot.fetch_servers()
+        results["fetch_s"] = time.perf_counter() - started
+        results["fetch_calls"] = (await panel_stats())["total"]
+
+        # Premier passage: tampons de console complets
+        started = time.perf_counter()
+        await bot.check_server_status(full=True)
+        results["tick_cold_s"] = time.perf_counter() - started
+        results["tick_cold_calls"] = (await panel_stats())["total"]
+
+        if args.streaming:
+            # Laisser les websockets s'authentifier
+            await asyncio.sleep(args.stream_warmup)
+            await panel_stats()
+
+        # Passages suivants: seules les nouvelles lignes de console sont analysées
+        durations, calls, rate_limited = [], [], 0
+        for _ in range(args.ticks):
+            await asyncio.sleep(args.tick_gap)
+            started = time.perf_counter()
+            await bot.check_server_status(full=True)
+            durations.append(time.perf_counter() - started)
+            stats = await panel_stats()
+            calls.append(stats["total"])
+            rate_limited += stats["rate_limited"]
+        results["tick_s"] = statistics.median(durations)
+        results["tick_max_s"] = max(durations)
+        results["tick_calls"] = statistics.mean(calls)
+        results["rate_limited"] = rate_limited
+        results["streams"] = (await panel_stats(reset=False))["sockets"]
+
+        # Publication des statuts: premier envoi puis mise à jour
+        channel.reset_calls()
+        started = time.perf_counter()
+        await bot.post_server_status()
+        results["post_first_s"] = time.perf_counter() - started
+        results["post_first_calls"] = dict(channel.calls)
+        channel.reset_calls()
+        started = time.perf_counter()
+        await bot.post_server_status()
+        results["post_update_s"] = time.perf_counter() - started
+        results["post_update_calls"] = dict(channel.calls)
+        results["notifications"] = bot.outbox.sent + bot.outbox.depth()
+
+    if args.mode == "memory":
+        current, peak = tracemalloc.get_traced_memory()
+        results["memory_mb"] = current / (1024 * 1024)
+        results["memory_peak_mb"] = peak / (1024 * 1024)
+        tracemalloc.stop()
+    results["max_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    await bot.console_streams.stop_all()
+    await bot.outbox.stop()
+    await bot.state_store.close()
+    await bot.wings.close()
+    await bot.api.close()
+    print(json.dumps(results))
+
+# Fonction pour exécuter un scénario dans un nouveau processus (état du bot vierge)
+def run_in_subprocess(args, size, port, mode):
+    command = [
+        sys.executable, os.path.abspath(__file__),
+        "--scenario", str(size), "--port", str(port), "--mode", mode,
+        "--ticks", str(args.ticks if mode == "time" else 1),
+        "--tick-gap", str(args.tick_gap),
+        "--rate-limit", str(args.rate_limit),
+        "--discord-latency", str(args.discord_latency),
+        "--stream-warmup", str(args.stream_warmup),
+    ]
+    if args.streaming:
+        command.append("--streaming")
+    if args.dashboard:
+        command.append("--dashboard")
+    if args.wings:
+        command.append("--wings")
+    output = subprocess.run(command, capture_output=True, text=True, cwd=BENCH_DIR)
+    if output.returncode != 0:
+        raise RuntimeError(f"Échec du scénario {size} serveurs ({mode}):\n{output.stderr[-2000:]}")
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+def run_size(args, size):
+    port = free_port()
+    panel = subprocess.Popen(
+        [
+            sys.executable, os.path.join(BENCH_DIR, "mock_panel.py"),
+            "--servers", str(size), "--port", str(port),
+            "--latency", str(args.latency),
+            "--rate-limit", str(args.rate_limit),
+            "--error-rate", str(args.error_rate),
+            "--lines-per-second", str(args.lines_per_second),
+        ],
+        cwd=BENCH_DIR
+    )
+    try:
+        wait_for_panel(port)
+        result = run_in_subprocess(args, size, port, "time")
+        memory = run_in_subprocess(args, size, port, "memory")
+        result["memory_mb"] = memory["memory_mb"]
+        result["memory_peak_mb"] = memory["memory_peak_mb"]
+        return result
+    finally:
+        panel.terminate()
+        panel.wait()
+
+def print_table(results):
+    columns = [
+        ("serveurs", lambda r: f"{r['servers']}"),
+        ("inventaire", lambda r: f"{r['fetch_s']:.2f}s/{r['fetch_calls']}"),
+        ("1er passage", lambda r: f"{r['tick_cold_s']:.2f}s"),
+        ("passage", lambda r: f"{r['tick_s']:.2f}s"),
+        ("max", lambda r: f"{r['tick_max_s']:.2f}s"),
+        ("req./passage", lambda r: f"{r['tick_calls']:.0f}"),
+        ("429", lambda r: f"{r['rate_limited']}"),
+        ("publication", lambda r: f"{r['post_first_s']:.2f}s/{r['post_first_calls']['send']}"),
+        ("màj", lambda r: f"{r['post_update_s']:.3f}s/{r['post_update_calls']['edit']}"),
+        ("mémoire", lambda r: f"{r['memory_mb']:.1f}Mo"),
+        ("pic", lambda r: f"{r['memory_peak_mb']:.1f}Mo"),
+        ("RSS", lambda r: f"{r['max_rss_mb']:.0f}Mo"),
+    ]
+    rows = [[header for header, _ in columns]] + [[cell(r) for _, cell in columns] for r in results]
+    widths = [max(len(row[i]) for row in rows) for i in range(len(columns))]
+    for row in rows:
+        print("  ".join(value.rjust(width) for value, width in zip(row, widths)))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la surveillance d'une flotte simulée")
+    parser.add_argument("--sizes", default="10,100,1000", help="tailles de flotte (séparées par des virgules)")
+    parser.add_argument("--latency", type=float, default=0.02, help="latence du panel par requête (secondes)")
+    parser.add_argument("--rate-limit", type=int, default=0, help="limite du panel en requêtes/minute (0: illimité)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="part de réponses 429 aléatoires")
+    parser.add_argument("--lines-per-second", type=float, default=2.0, help="trafic de console par serveur")
+    parser.add_argument("--discord-latency", type=float, default=0.0, help="latence simulée de l'API Discord")
+    parser.add_argument("--ticks", type=int, default=5, help="passages mesurés après le premier")
+    parser.add_argument("--tick-gap", type=float, default=1.0, help="attente entre deux passages (secondes)")
+    parser.add_argument("--streaming", action="store_true", help="suivre les consoles par websocket")
+    parser.add_argument("--stream-warmup", type=float, default=3.0, help="attente de connexion des websockets")
+    parser.add_argument("--dashboard", action="store_true", help="mode tableau de bord")
+    parser.add_argument("--wings", action="store_true", help="collecter les états par nœud Wings (WINGS_NODES)")
+    parser.add_argument("--json", help="enregistrer les résultats dans ce fichier")
+    # Options internes (processus du scénario)
+    parser.add_argument("--scenario", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--mode", default="time", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.scenario is not None:
+        asyncio.run(run_scenario(args))
+        return
+
+    results = []
+    for size in [int(size) for size in args.sizes.split(",") if size]:
+        print(f"⏳ Flotte de {size} serveurs...", file=sys.stderr)
+        results.append(run_size(args, size))
+    print_table(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+# Benchmark: moteur de détection compilé (PlayerEventMatcher) contre l'ancienne
+# fonction detect_player_event, sur un gros log de console synthétique.
+#
+# Vérifie d'abord que le fragment littéral de chaque expression (pré-filtre) est bien présent
+# dans les lignes qu'elle détecte, sinon des événements seraient silencieusement ignorés.
+#
+# Utilisation: python benchmarks/bench_player_matcher.py [nombre_de_lignes]
+import os
+import re
+import sys
+import time
+
+# Variables minimales pour pouvoir importer bot.py hors Docker
+os.environ.setdefault("PTERODACTYL_API_URL", "http://127.0.0.1")
+os.environ.setdefault("PTERODACTYL_API_KEY", "benchmark")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import bot  # noqa: E402
+from console_samples import EVENTS, generate_log  # noqa: E402
+
+# Ancienne implémentation (référence du benchmark)
+CONNECTION_PATTERNS = {
+    "minecraft": "joined the game",
+    "project_zomboid": "Player * connected",
+    "ark": "joined this ARK",
+    "valheim": "Got connection SteamID",
+    "rust": "joined [",
+    "general": "connected"
+}
+
+DISCONNECTION_PATTERNS = {
+    "minecraft": "left the game",
+    "project_zomboid": "Player * disconnected",
+    "ark": "left this ARK",
+    "valheim": "Closing socket",
+    "rust": "disconnected:",
+    "general": "disconnected"
+}
+
+def detect_player_event(log_text, patterns, server_type=None):
+    if server_type and server_type in patterns:
+        pattern = patterns[server_type]
+        if "*" in pattern:
+            before, after = pattern.split("*")
+            if before in log_text and after in log_text:
+                player_part = log_text.split(before)[1].split(after)[0].strip()
+                return player_part
+        elif pattern in log_text:
+            if server_type == "minecraft":
+                try:
+                    return log_text.split("[INFO]: ")[1].split(" " + pattern)[0]
+                except:
+                    pass
+            elif server_type == "ark":
+                try:
+                    return log_text.split(": ")[1].split(" " + pattern)[0]
+                except:
+                    pass
+    else:
+        for srv_type, pattern in patterns.items():
+            if "*" in pattern:
+                before, after = pattern.split("*")
+                if before in log_text and after in log_text:
+                    player_part = log_text.split(before)[1].split(after)[0].strip()
+                    return player_part
+            elif pattern in log_text:
+                if srv_type == "minecraft":
+                    try:
+                        return log_text.split("[INFO]: ")[1].split(" " + pattern)[0]
+                    except:
+                        pass
+                elif srv_type == "project_zomboid":
+                    try:
+                        return log_text.split("Player ")[1].split(" " + pattern.replace("Player * ", ""))[0]
+                    except:
+                        pass
+                elif srv_type == "ark":
+                    try:
+                        return log_text.split(": ")[1].split(" " + pattern)[0]
+                    except:
+                        pass
+    return None
+
+# Ancien chemin: deux appels à detect_player_event par ligne
+def run_legacy(lines, server_type):
+    events = 0
+    for line in lines:
+        if detect_player_event(line, CONNECTION_PATTERNS, server_type):
+            events += 1
+        if detect_player_event(line, DISCONNECTION_PATTERNS, server_type):
+            events += 1
+    return events
+
+def run_matcher(lines, server_type):
+    return len(bot.game_profiles.matcher.scan(lines, server_type))
+
+def timed(func, *args, repeat=3):
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+# Expressions piégeuses: quantificateur {m,n} et drapeaux en ligne
+HINT_CASES = [
+    (r"x{2}abc(?P<player>\w+)", "xxabcSteve"),
+    (r"a{1,3} joined (?P<player>\w+)", "aa joined Steve"),
+    (r"(?i)player (?P<player>\w+) joined", "PLAYER Steve JOINED"),
+    (r"(?x) player \s (?P<player>\w+) \s joined", "player Steve joined"),
+]
+
+# Fonction pour vérifier que le fragment littéral de chaque expression figure dans les lignes détectées
+def check_literal_hints():
+    cases = list(HINT_CASES)
+    for game, templates in EVENTS.items():
+        profile = bot.DEFAULT_GAME_PROFILES[game]
+        for expression in profile["join"] + profile["leave"]:
+            for template in templates:
+                line = template.format(player="Player1")
+                if re.search(expression, line):
+                    cases.append((expression, line))
+    for expression, line in cases:
+        hint = bot.regex_literal_hint(expression)
+        if not re.search(expression, line) or hint not in line:
+            sys.exit(f"Fragment littéral invalide pour {expression!r}: {hint!r} absent de {line!r}")
+    print(f"Fragments littéraux vérifiés: {len(cases)} expressions")
+
+def main():
+    check_literal_hints()
+    line_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    print(f"{'jeu':<18}{'type connu':<12}{'ancien (s)':>12}{'compilé (s)':>13}{'gain':>8}{'évén. anc.':>12}{'évén. comp.':>13}")
+    for game in EVENTS:
+        lines = generate_log(game, line_count)
+        for server_type in (game, None):
+            legacy_time, legacy_events = timed(run_legacy, lines, server_type)
+            matcher_time, matcher_events = timed(run_matcher, lines, server_type)
+            print(
+                f"{game:<18}{'oui' if server_type else 'non':<12}{legacy_time:>12.3f}{matcher_time:>13.3f}"
+                f"{legacy_time / matcher_time:>7.1f}x{legacy_events:>12}{matcher_events:>13}"
+            )
+
+if __name__ == "__main__":
+    main()
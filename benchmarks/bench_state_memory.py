@@ -0,0 +1,127 @@
+# Benchmark: mémoire de l'état des joueurs (sessions compactes contre dictionnaires + datetime)
+#
+# Remplit une flotte de N serveurs avec M joueurs connectés chacun, mesure la mémoire avec
+# tracemalloc, puis vérifie qu'elle redescend quand les serveurs s'arrêtent et quand les
+# sessions absentes des sondes des jeux expirent (PLAYER_SESSION_TTL). Une dernière phase simule
+# plusieurs jours de joueurs dont la déconnexion n'apparaît jamais dans la console.
+#
+# Utilisation: python benchmarks/bench_state_memory.py [--servers 1000] [--players 100] [--days 7]
+import argparse
+import asyncio
+import datetime
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# Variables minimales pour pouvoir importer bot.py hors Docker
+DATA_DIR = tempfile.mkdtemp(prefix="pterobot-bench-")
+os.environ.setdefault("PTERODACTYL_API_URL", "http://127.0.0.1")
+os.environ.setdefault("PTERODACTYL_API_KEY", "benchmark")
+os.environ.update({
+    "STATE_DB_FILE": os.path.join(DATA_DIR, "state.db"),
+    "GAME_PROFILES_FILE": os.path.join(DATA_DIR, "game_profiles.json"),
+    "PERF_FILE": "",
+    "LOG_LEVEL": "ERROR",
+})
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import bot  # noqa: E402
+from discord_stub import StubChannel  # noqa: E402
+
+# Fonction pour mesurer la mémoire allouée par une fonction (et conservée après son retour)
+def measure(build):
+    before = tracemalloc.get_traced_memory()[0]
+    kept = build()
+    return kept, (tracemalloc.get_traced_memory()[0] - before) / (1024 * 1024)
+
+# Ancienne structure: un dictionnaire et un datetime par joueur, copiés dans la fiche du serveur
+def legacy_players(server_ids, players, day=0):
+    state = {}
+    for server_id in server_ids:
+        state[server_id] = {f"joueur-{day}-{i}": {"connect_time": datetime.datetime.now()} for i in range(players)}
+    return state
+
+# Connexion de joueurs comme le fait process_player_events (sans les notifications Discord)
+def join_players(server_ids, players, day=0):
+    now = time.monotonic()
+    for server_id in server_ids:
+        sessions = bot.connected_players.setdefault(server_id, {})
+        for i in range(players):
+            sessions[f"joueur-{day}-{i}"] = bot.PlayerSession(now)
+        bot.fleet.update(server_id, players=bot.MappingProxyType(dict(sessions)))
+    bot.fleet.publish()
+
+def player_count():
+    return sum(len(sessions) for sessions in bot.connected_players.values())
+
+async def run(args):
+    channel = StubChannel()
+    server_ids = [f"{i:08x}" for i in range(args.servers)]
+    bot.fleet.replace({
+        # Serveurs sondés (GAME_QUERY_INTERVAL): seules leurs sessions peuvent expirer
+        server_id: {
+            "name": f"Serveur {i}", "status": "running", "resources": {"current_state": "running"},
+            "query": {"online": args.players, "max": args.players}
+        }
+        for i, server_id in enumerate(server_ids)
+    })
+    tracemalloc.start()
+    rows = []
+
+    legacy, legacy_mb = measure(lambda: legacy_players(server_ids, args.players))
+    rows.append(("dictionnaires + datetime", sum(len(players) for players in legacy.values()), legacy_mb))
+    del legacy
+
+    baseline = tracemalloc.get_traced_memory()[0]
+    _, sessions_mb = measure(lambda: join_players(server_ids, args.players))
+    rows.append(("sessions PlayerSession", player_count(), sessions_mb))
+
+    # Tous les serveurs s'arrêtent: leurs joueurs sont oubliés
+    started = time.perf_counter()
+    for server_id in server_ids:
+        await bot.update_server_status(channel, server_id, bot.fleet.get(server_id), "offline")
+    bot.fleet.publish()
+    offline_s = time.perf_counter() - started
+    await bot.state_store.flush()
+    rows.append(("après arrêt des serveurs", player_count(), (tracemalloc.get_traced_memory()[0] - baseline) / (1024 * 1024)))
+
+    # Plusieurs jours de joueurs jamais vus se déconnecter, expiration une fois par jour
+    for server_id in server_ids:
+        await bot.update_server_status(channel, server_id, bot.fleet.get(server_id), "running")
+    baseline = tracemalloc.get_traced_memory()[0]
+    peak_players, peak_mb, evict_s = 0, 0.0, 0.0
+    clock = time.monotonic()
+    for day in range(args.days):
+        join_players(server_ids, args.players, day)
+        peak_players = max(peak_players, player_count())
+        peak_mb = max(peak_mb, (tracemalloc.get_traced_memory()[0] - baseline) / (1024 * 1024))
+        clock += bot.PLAYER_SESSION_TTL + 1
+        started = time.perf_counter()
+        bot.evict_stale_players(now=clock)
+        evict_s = max(evict_s, time.perf_counter() - started)
+        await bot.state_store.flush()
+    rows.append((f"{args.days} jours avec expiration (pic)", peak_players, peak_mb))
+    _, legacy_days_mb = measure(lambda: [legacy_players(server_ids, args.players, day) for day in range(args.days)])
+    rows.append((f"{args.days} jours sans expiration", args.servers * args.players * args.days, legacy_days_mb))
+
+    tracemalloc.stop()
+    await bot.outbox.stop()
+    await bot.state_store.close()
+
+    print(f"{args.servers} serveurs × {args.players} joueurs")
+    width = max(len(label) for label, _, _ in rows)
+    for label, players, megabytes in rows:
+        print(f"  {label.ljust(width)}  {players:>8} joueurs  {megabytes:8.1f} Mo")
+    print(f"  arrêt de {args.servers} serveurs: {offline_s * 1000:.0f} ms, expiration la plus lente: {evict_s * 1000:.0f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la mémoire de l'état des joueurs")
+    parser.add_argument("--servers", type=int, default=1000, help="nombre de serveurs")
+    parser.add_argument("--players", type=int, default=100, help="joueurs connectés par serveur")
+    parser.add_argument("--days", type=int, default=7, help="jours simulés pour l'expiration des sessions")
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
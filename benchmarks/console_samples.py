@@ -0,0 +1,54 @@
+# Lignes de console synthétiques par jeu, partagées par les benchmarks
+# (détection des joueurs et panel Pterodactyl simulé).
+import random
+
+# Lignes de console typiques (bruit) et événements par jeu
+NOISE = {
+    "minecraft": [
+        "[12:00:00] [Server thread/INFO]: Saving chunks for level 'ServerLevel[world]'/minecraft:overworld",
+        "[12:00:01] [Server thread/WARN]: Can't keep up! Is the server overloaded? Running 2043ms or 40 ticks behind",
+        "[12:00:02] [Server thread/INFO]: <{player}> anyone up for the nether?",
+        "[12:00:03] [Server thread/INFO]: {player} has made the advancement [Stone Age]"
+    ],
+    "project_zomboid": [
+        "LOG  : General     , 1700000000000> 1,234,567> Saving map...",
+        "LOG  : Network     , 1700000000001> 1,234,568> [RakNet] \"new client connection\" from 10.0.0.4",
+        "LOG  : General     , 1700000000002> 1,234,569> Chat message from {player}"
+    ],
+    "ark": [
+        "[2023.01.01-12.00.00:000][  0]2023.01.01_12.00.00: SERVER: Autosave complete",
+        "[2023.01.01-12.00.01:000][  1]2023.01.01_12.00.01: {player} was killed by a Raptor"
+    ],
+    "valheim": [
+        "01/01/2023 12:00:00: Saving world",
+        "01/01/2023 12:00:01: Console: <color=orange>{player}</color>: <color=#FFEB04FF>I'm here</color>"
+    ],
+    "rust": [
+        "Saving complete",
+        "[Manifest] URI IS \"https://files.facepunch.com/rust/manifest.txt\"",
+        "{player}[123/76561198000000000] was killed by Scientist"
+    ]
+}
+
+EVENTS = {
+    "minecraft": ("[12:00:04] [INFO]: {player} joined the game", "[12:00:05] [INFO]: {player} left the game"),
+    "project_zomboid": ("Player {player} connected", "Player {player} disconnected"),
+    "ark": ("2023.01.01_12.00.02: {player} joined this ARK!", "2023.01.01_12.00.03: {player} left this ARK!"),
+    "valheim": ("01/01/2023 12:00:02: Got connection SteamID 76561198000000001", "01/01/2023 12:00:03: Closing socket 76561198000000001"),
+    "rust": ("10.0.0.5:61812/76561198000000002/{player} joined [windows/76561198000000002]",
+             "10.0.0.5:61812/76561198000000002/{player} disconnected: closing")
+}
+
+# Générer un log synthétique (environ 2% de lignes de connexion/déconnexion)
+def generate_log(game, line_count, seed=42):
+    rng = random.Random(seed)
+    players = [f"Player{i}" for i in range(50)]
+    lines = []
+    for _ in range(line_count):
+        player = rng.choice(players)
+        if rng.random() < 0.02:
+            template = rng.choice(EVENTS[game])
+        else:
+            template = rng.choice(NOISE[game])
+        lines.append(template.format(player=player))
+    return lines
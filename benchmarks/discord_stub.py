@@ -0,0 +1,55 @@
+# Canal Discord simulé pour les benchmarks
+# Remplace le canal de notification: compte les envois, modifications et suppressions
+# sans appel réseau (une latence optionnelle simule l'API Discord).
+import asyncio
+import itertools
+
+_message_ids = itertools.count(1)
+
+# Message Discord simulé (aussi utilisé comme message partiel)
+class StubMessage:
+    def __init__(self, channel, message_id=None, embeds=None):
+        self.channel = channel
+        self.id = message_id if message_id is not None else next(_message_ids)
+        self.embeds = embeds or []
+
+    async def edit(self, embed=None, embeds=None, content=None):
+        await self.channel._call("edit")
+        self.embeds = embeds if embeds is not None else ([embed] if embed is not None else self.embeds)
+        return self
+
+    async def delete(self):
+        await self.channel._call("delete")
+        self.channel.messages.pop(self.id, None)
+
+# Canal Discord simulé
+class StubChannel:
+    def __init__(self, channel_id=1, latency=0.0):
+        self.id = channel_id
+        self.name = "benchmark"
+        self.latency = latency
+        self.calls = {"send": 0, "edit": 0, "delete": 0, "bulk_delete": 0}
+        self.messages = {}
+
+    async def _call(self, kind):
+        self.calls[kind] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    async def send(self, content=None, embed=None, embeds=None, file=None):
+        await self._call("send")
+        message = StubMessage(self, embeds=embeds if embeds is not None else ([embed] if embed is not None else []))
+        self.messages[message.id] = message
+        return message
+
+    def get_partial_message(self, message_id):
+        return self.messages.get(message_id) or StubMessage(self, message_id)
+
+    async def delete_messages(self, messages):
+        await self._call("bulk_delete")
+        for message in messages:
+            self.messages.pop(message.id, None)
+
+    def reset_calls(self):
+        for kind in self.calls:
+            self.calls[kind] = 0
@@ -0,0 +1,334 @@
+# Panel Pterodactyl simulé pour les benchmarks (API client + websocket de console + Wings)
+#
+# Simule N serveurs de différents jeux avec une latence configurable, des réponses 429
+# (limite de requêtes par minute et/ou taux d'erreurs aléatoire), du trafic de console
+# réaliste et les transitions d'état déclenchées par /power.
+#
+# Utilisation: python benchmarks/mock_panel.py --servers 100 --port 8765 --latency 0.05
+# puis lancer le bot avec PTERODACTYL_API_URL=http://127.0.0.1:8765
+# Chaque nœud simulé répond aussi comme un démon Wings sur /wings/{nœud}/api/servers
+# (WINGS_NODES={"node-0": {"url": "http://127.0.0.1:8765/wings/node-0", "token": "wings"}, ...}).
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import deque
+
+from aiohttp import web, WSMsgType
+
+from console_samples import EVENTS, NOISE
+
+# Jeux simulés: nom de l'egg Pterodactyl correspondant au profil de jeu du bot
+GAMES = {
+    "minecraft": "Paper",
+    "project_zomboid": "Project Zomboid",
+    "ark": "Ark: Survival Evolved",
+    "valheim": "Valheim",
+    "rust": "Rust",
+}
+
+NODES = 8  # Nombre de nœuds Wings simulés
+LOG_BUFFER = 100  # Lignes renvoyées par /logs (comme le tampon de Wings)
+PLAYERS = [f"Player{i}" for i in range(50)]
+
+# Serveur de jeu simulé
+class MockServer:
+    def __init__(self, index, game, running, rng):
+        self.index = index
+        self.identifier = f"{index:08x}"
+        self.uuid = f"{index:08x}-0000-4000-8000-{index:012x}"
+        self.game = game
+        self.state = "running" if running else "offline"
+        self.started_at = time.monotonic()
+        self.rng = rng
+        self.logs = deque(maxlen=LOG_BUFFER)
+        self.logs_generated_at = time.monotonic()
+        self.sockets = set()
+
+    def attributes(self):
+        return {
+            "identifier": self.identifier,
+            "uuid": self.uuid,
+            "name": f"{self.game.replace('_', ' ').title()} {self.index}",
+            "node": f"node-{self.index % NODES}",
+            "description": "",
+            "server_owner": True,
+            "docker_image": f"ghcr.io/pterodactyl/games:{self.game}",
+            "limits": {"memory": 4096, "disk": 20480, "cpu": 200},
+            "relationships": {
+                "allocations": {"data": [{"attributes": {
+                    "ip": "10.0.0.1", "ip_alias": None, "port": 20000 + self.index, "is_default": True
+                }}]},
+                "egg": {"attributes": {"uuid": f"egg-{self.game}", "name": GAMES[self.game]}}
+            }
+        }
+
+    def console_line(self):
+        player = self.rng.choice(PLAYERS)
+        if self.rng.random() < 0.02:
+            template = self.rng.choice(EVENTS[self.game])
+        else:
+            template = self.rng.choice(NOISE[self.game])
+        return template.format(player=player)
+
+    # Ajouter au tampon les lignes produites depuis la dernière lecture
+    def advance_console(self, lines_per_second):
+        now = time.monotonic()
+        if self.state != "running":
+            self.logs_generated_at = now
+            return []
+        count = int((now - self.logs_generated_at) * lines_per_second)
+        if count <= 0:
+            return []
+        self.logs_generated_at = now
+        lines = [self.console_line() for _ in range(min(count, LOG_BUFFER))]
+        self.logs.extend(lines)
+        return lines
+
+    def resources(self):
+        running = self.state == "running"
+        return {
+            "current_state": self.state,
+            "is_suspended": False,
+            "resources": {
+                "memory_bytes": int((1024 + self.rng.random() * 2048) * 1024 * 1024) if running else 0,
+                "cpu_absolute": round(self.rng.random() * 150, 2) if running else 0,
+                "disk_bytes": (5 + self.index % 10) * 1024 ** 3,
+                "network_rx_bytes": int((time.monotonic() - self.started_at) * 50000) if running else 0,
+                "network_tx_bytes": int((time.monotonic() - self.started_at) * 80000) if running else 0,
+                "uptime": int((time.monotonic() - self.started_at) * 1000) if running else 0
+            }
+        }
+
+# Panel simulé
+class MockPanel:
+    def __init__(self, servers=10, latency=0.02, jitter=0.5, rate_limit=0, error_rate=0.0,
+                 lines_per_second=2.0, running_ratio=0.8, transition_delay=2.0, stats_interval=2.0, seed=42):
+        self.rng = random.Random(seed)
+        games = list(GAMES)
+        self.servers = {}
+        for i in range(servers):
+            server = MockServer(i, games[i % len(games)], self.rng.random() < running_ratio, random.Random(seed + i))
+            self.servers[server.identifier] = server
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit = rate_limit
+        self.error_rate = error_rate
+        self.lines_per_second = lines_per_second
+        self.transition_delay = transition_delay
+        self.stats_interval = stats_interval
+        self.requests = {}  # endpoint -> nombre de requêtes
+        self.rate_limited = 0
+        self._window = deque()  # horodatages des requêtes de la dernière minute
+
+    # Latence, comptage et limitation des requêtes (middleware)
+    @web.middleware
+    async def middleware(self, request, handler):
+        if request.path.startswith("/_stats") or request.path.startswith("/ws/"):
+            return await handler(request)
+
+        endpoint = request.match_info.route.resource.canonical if request.match_info.route.resource else request.path
+        self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+        if self.latency:
+            await asyncio.sleep(self.latency * (1 + self.rng.uniform(-self.jitter, self.jitter)))
+
+        now = time.monotonic()
+        while self._window and now - self._window[0] >= 60:
+            self._window.popleft()
+        limited = (self.rate_limit and len(self._window) >= self.rate_limit) or self.rng.random() < self.error_rate
+        if not limited:
+            self._window.append(now)
+
+        headers = {}
+        if self.rate_limit:
+            headers = {
+                "X-RateLimit-Limit": str(self.rate_limit),
+                "X-RateLimit-Remaining": str(max(0, self.rate_limit - len(self._window)))
+            }
+        if limited:
+            self.rate_limited += 1
+            retry_after = 60 - (now - self._window[0]) if self._window and self.rate_limit else 1
+            headers["Retry-After"] = str(max(1, int(retry_after)))
+            return web.json_response({"errors": [{"code": "TooManyRequestsHttpException"}]}, status=429, headers=headers)
+
+        response = await handler(request)
+        response.headers.update(headers)
+        return response
+
+    def _server(self, request):
+        server = self.servers.get(request.match_info["id"])
+        if server is None:
+            raise web.HTTPNotFound()
+        return server
+
+    async def list_servers(self, request):
+        page = int(request.query.get("page", "1"))
+        per_page = int(request.query.get("per_page", "50"))
+        servers = list(self.servers.values())
+        items = servers[(page - 1) * per_page:page * per_page]
+        return web.json_response({
+            "object": "list",
+            "data": [{"object": "server", "attributes": server.attributes()} for server in items],
+            "meta": {"pagination": {
+                "total": len(servers), "count": len(items), "per_page": per_page, "current_page": page,
+                "total_pages": max(1, (len(servers) + per_page - 1) // per_page)
+            }}
+        })
+
+    async def resources(self, request):
+        return web.json_response({"object": "stats", "attributes": self._server(request).resources()})
+
+    async def logs(self, request):
+        server = self._server(request)
+        server.advance_console(self.lines_per_second)
+        return web.json_response({"data": [{"attributes": {"content": line}} for line in server.logs]})
+
+    # GET /api/servers d'un démon Wings: tous les serveurs du nœud en une réponse
+    async def wings_servers(self, request):
+        if request.headers.get("Authorization") != "Bearer wings":
+            return web.json_response({"error": "unauthorized"}, status=401)
+        node = request.match_info["node"]
+        servers = []
+        for server in self.servers.values():
+            if f"node-{server.index % NODES}" != node:
+                continue
+            stats = server.resources()
+            usage = stats["resources"]
+            servers.append({
+                "state": server.state,
+                "is_suspended": False,
+                "utilization": {
+                    "memory_bytes": usage["memory_bytes"],
+                    "memory_limit_bytes": 4096 * 1024 * 1024,
+                    "cpu_absolute": usage["cpu_absolute"],
+                    "network": {"rx_bytes": usage["network_rx_bytes"], "tx_bytes": usage["network_tx_bytes"]},
+                    "uptime": usage["uptime"],
+                    "state": server.state,
+                    "disk_bytes": usage["disk_bytes"]
+                },
+                "configuration": {"uuid": server.uuid}
+            })
+        return web.json_response(servers)
+
+    async def websocket_credentials(self, request):
+        server = self._server(request)
+        socket = f"ws://{request.host}/ws/{server.identifier}"
+        return web.json_response({"data": {"token": f"token-{server.identifier}-{time.time()}", "socket": socket}})
+
+    # Transitions d'état après un signal d'alimentation
+    async def _transition(self, server, steps):
+        for state, delay in steps:
+            await asyncio.sleep(delay)
+            server.state = state
+            if state == "running":
+                server.started_at = time.monotonic()
+            for ws in list(server.sockets):
+                await ws.send_json({"event": "status", "args": [state]})
+
+    async def power(self, request):
+        server = self._server(request)
+        signal = (await request.json()).get("signal")
+        delay = self.transition_delay
+        steps = {
+            "start": [("starting", 0), ("running", delay)],
+            "stop": [("stopping", 0), ("offline", delay)],
+            "restart": [("stopping", 0), ("offline", delay / 2), ("starting", 0), ("running", delay)],
+            "kill": [("offline", 0)],
+        }.get(signal)
+        if steps is None:
+            return web.json_response({"errors": [{"code": "ValidationException"}]}, status=422)
+        asyncio.get_running_loop().create_task(self._transition(server, steps))
+        return web.Response(status=204)
+
+    # Websocket de console: console output, status et stats toutes les stats_interval secondes
+    async def websocket(self, request):
+        server = self._server(request)
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        pusher = None
+        try:
+            async for msg in ws:
+                if msg.type != WSMsgType.TEXT:
+                    continue
+                payload = json.loads(msg.data)
+                if payload.get("event") == "auth" and pusher is None:
+                    await ws.send_json({"event": "auth success"})
+                    await ws.send_json({"event": "status", "args": [server.state]})
+                    server.sockets.add(ws)
+                    pusher = asyncio.get_running_loop().create_task(self._push(server, ws))
+        finally:
+            server.sockets.discard(ws)
+            if pusher is not None:
+                pusher.cancel()
+        return ws
+
+    async def _push(self, server, ws):
+        while not ws.closed:
+            await asyncio.sleep(self.stats_interval)
+            lines = server.advance_console(self.lines_per_second)
+            if lines:
+                await ws.send_json({"event": "console output", "args": ["\n".join(lines)]})
+            stats = server.resources()
+            await ws.send_json({"event": "stats", "args": [json.dumps({
+                "memory_bytes": stats["resources"]["memory_bytes"],
+                "cpu_absolute": stats["resources"]["cpu_absolute"],
+                "disk_bytes": stats["resources"]["disk_bytes"],
+                "network": {"rx_bytes": stats["resources"]["network_rx_bytes"], "tx_bytes": stats["resources"]["network_tx_bytes"]},
+                "uptime": stats["resources"]["uptime"],
+                "state": server.state
+            })]})
+
+    # Compteurs de requêtes (GET /_stats, POST /_stats/reset)
+    async def stats(self, request):
+        return web.json_response({
+            "requests": self.requests,
+            "total": sum(self.requests.values()),
+            "rate_limited": self.rate_limited,
+            "sockets": sum(len(server.sockets) for server in self.servers.values())
+        })
+
+    async def reset_stats(self, request):
+        self.requests = {}
+        self.rate_limited = 0
+        return web.json_response({})
+
+    def app(self):
+        app = web.Application(middlewares=[self.middleware])
+        app.router.add_get("/api/client", self.list_servers)
+        app.router.add_get("/api/client/servers/{id}/resources", self.resources)
+        app.router.add_get("/api/client/servers/{id}/logs", self.logs)
+        app.router.add_get("/api/client/servers/{id}/websocket", self.websocket_credentials)
+        app.router.add_post("/api/client/servers/{id}/power", self.power)
+        app.router.add_get("/ws/{id}", self.websocket)
+        app.router.add_get("/wings/{node}/api/servers", self.wings_servers)
+        app.router.add_get("/_stats", self.stats)
+        app.router.add_post("/_stats/reset", self.reset_stats)
+        return app
+
+def main():
+    parser = argparse.ArgumentParser(description="Panel Pterodactyl simulé")
+    parser.add_argument("--servers", type=int, default=10)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.02, help="latence moyenne par requête (secondes)")
+    parser.add_argument("--rate-limit", type=int, default=0, help="requêtes par minute avant 429 (0: illimité)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="part de réponses 429 aléatoires")
+    parser.add_argument("--lines-per-second", type=float, default=2.0, help="trafic de console par serveur")
+    parser.add_argument("--running-ratio", type=float, default=0.8, help="part des serveurs en ligne")
+    parser.add_argument("--transition-delay", type=float, default=2.0, help="durée d'un démarrage/arrêt (secondes)")
+    args = parser.parse_args()
+
+    panel = MockPanel(
+        servers=args.servers,
+        latency=args.latency,
+        rate_limit=args.rate_limit,
+        error_rate=args.error_rate,
+        lines_per_second=args.lines_per_second,
+        running_ratio=args.running_ratio,
+        transition_delay=args.transition_delay
+    )
+    web.run_app(panel.app(), host=args.host, port=args.port, access_log=None, print=None)
+
+if __name__ == "__main__":
+    main()
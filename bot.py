@@ -1,6 +1,7 @@
 import discord
 from discord.ext import commands, tasks
-import requests
+import aiohttp
+from aiohttp import web
 import json
 import datetime
 import asyncio
@@ -8,6 +9,22 @@ import os
 from dotenv import load_dotenv
 import random
 import time
+import re
+import heapq
+import threading
+import contextlib
+import sqlite3
+import struct
+import zlib
+import io
+import sys
+import atexit
+import queue
+import logging
+import logging.handlers
+from array import array
+from types import MappingProxyType
+from collections import deque, namedtuple
 
 # Charger les variables d'environnement (pour le développement local)
 if os.path.exists(".env"):
@@ -22,78 +39,429 @@ CHECK_INTERVAL = int(os.environ.get("CHECK_INTERVAL", "60"))
 STATUS_UPDATE_INTERVAL = int(os.environ.get("STATUS_UPDATE_INTERVAL", "900"))  # 15 minutes par défaut
 SERVER_ICON = os.environ.get("SERVER_ICON", "https://i.imgur.com/YPVEOxC.png")  # Icône par défaut
 AUTO_POST_STATS = os.environ.get("AUTO_POST_STATS", "true").lower() == "true"  # Activer l'affichage automatique
+OUTBOX_WINDOW = float(os.environ.get("OUTBOX_WINDOW", "2"))  # Fenêtre de regroupement des notifications (secondes)
+OUTBOX_RATE = 5  # Notifications maximum par canal toutes les 5 secondes
+DASHBOARD_MODE = os.environ.get("DASHBOARD_MODE", "false").lower() == "true"  # Regrouper les statuts dans un tableau de bord paginé
+DASHBOARD_PAGE_SIZE = 10  # Serveurs par message du tableau de bord (10 embeds maximum par message Discord)
+STATUS_RESOURCE_BUCKET = 5  # Palier (en %) des ressources en dessous duquel un message de statut n'est pas modifié
 
+# Configuration du client HTTP Pterodactyl
+API_TIMEOUT = float(os.environ.get("API_TIMEOUT", "10"))  # Délai maximal d'une requête (secondes)
+API_BATCH_TIMEOUT = float(os.environ.get("API_BATCH_TIMEOUT", "45"))  # Délai maximal d'un lot de requêtes (secondes)
+API_MAX_CONNECTIONS = int(os.environ.get("API_MAX_CONNECTIONS", "20"))  # Connexions simultanées au total
+API_MAX_CONNECTIONS_PER_HOST = int(os.environ.get("API_MAX_CONNECTIONS_PER_HOST", "10"))  # Connexions simultanées par hôte
+API_RATE_LIMIT = int(os.environ.get("API_RATE_LIMIT", "240"))  # Requêtes par minute autorisées par le panel (ajusté via X-RateLimit-Limit)
+API_USER_RESERVE = 0.1  # Part du budget réservée aux actions des utilisateurs (démarrage, arrêt...)
+POWER_ACTION_TIMEOUT = int(os.environ.get("POWER_ACTION_TIMEOUT", "300"))  # Suivi maximal d'un démarrage/arrêt (secondes)
+POWER_POLL_INTERVAL = 3  # Relevé de l'état pendant une action d'alimentation sans websocket (secondes)
+WINGS_NODES = os.environ.get("WINGS_NODES", "")  # Nœuds Wings interrogés directement (JSON: nom -> url, token)
+GAME_QUERY_INTERVAL = int(os.environ.get("GAME_QUERY_INTERVAL", "0"))  # Sondes des jeux (liste des joueurs) toutes les N secondes (0: désactivé)
+GAME_QUERY_TIMEOUT = float(os.environ.get("GAME_QUERY_TIMEOUT", "3"))  # Délai maximal d'une sonde (secondes)
+PLAYER_SESSION_TTL = int(os.environ.get("PLAYER_SESSION_TTL", "86400"))  # Oubli d'un joueur absent des sondes des jeux (secondes, 0: jamais)
+GAME_QUERY_CONCURRENCY = 50  # Sondes simultanées
+BREAKER_THRESHOLD = int(os.environ.get("BREAKER_THRESHOLD", "3"))  # Échecs consécutifs avant de ne plus interroger un nœud
+BREAKER_RESET_TIMEOUT = int(os.environ.get("BREAKER_RESET_TIMEOUT", "30"))  # Attente avant une requête d'essai (secondes, doublée à chaque échec)
+BREAKER_MAX_RESET_TIMEOUT = 600  # Attente maximale entre deux requêtes d'essai (secondes)
+POLL_CONCURRENCY = int(os.environ.get("POLL_CONCURRENCY", "10"))  # Serveurs interrogés en parallèle à chaque vérification
+CONSOLE_STREAMING = os.environ.get("CONSOLE_STREAMING", "false").lower() == "true"  # Suivre la console en direct par websocket
+STREAM_RECONNECT_MAX_DELAY = int(os.environ.get("STREAM_RECONNECT_MAX_DELAY", "60"))  # Attente maximale entre deux reconnexions (secondes)
+LOG_CURSOR_ANCHOR = 5  # Nombre de lignes mémorisées pour retrouver la position dans les logs
+ADAPTIVE_POLLING = os.environ.get("ADAPTIVE_POLLING", "true").lower() == "true"  # Fréquence de vérification adaptée à chaque serveur
+SCHEDULER_TICK = int(os.environ.get("SCHEDULER_TICK", "5"))  # Réveil du planificateur adaptatif (secondes)
+OFFLINE_MAX_INTERVAL = int(os.environ.get("OFFLINE_MAX_INTERVAL", "600"))  # Intervalle maximal pour un serveur éteint (secondes)
+POLL_JITTER = 0.1  # Variation aléatoire des intervalles (±10 %)
+INVENTORY_PAGE_SIZE = 50  # Serveurs par page lors de la récupération de l'inventaire
+INVENTORY_TTL = int(os.environ.get("INVENTORY_TTL", "60"))  # Durée de validité de l'inventaire en cache (secondes)
+INVENTORY_MIN_AGE = 10  # Âge minimal de l'inventaire avant une actualisation forcée (!refresh)
+GAME_PROFILES_FILE = os.environ.get("GAME_PROFILES_FILE", "/app/data/game_profiles.json")  # Profils de jeux (détection des joueurs)
+STATE_DB_FILE = os.environ.get("STATE_DB_FILE", "/app/data/state.db")  # Base SQLite de l'état persistant
+STATE_FLUSH_INTERVAL = int(os.environ.get("STATE_FLUSH_INTERVAL", "5"))  # Délai d'écriture différée de l'état (secondes)
+METRICS_PORT = int(os.environ.get("METRICS_PORT", "0"))  # Port de l'endpoint Prometheus /metrics (0: désactivé)
+METRICS_HOST = os.environ.get("METRICS_HOST", "0.0.0.0")  # Adresse d'écoute de l'endpoint /metrics
+HISTORY_SAMPLE_INTERVAL = int(os.environ.get("HISTORY_SAMPLE_INTERVAL", "10"))  # Écart minimal entre deux mesures conservées (secondes)
+HISTORY_RAW_POINTS = 360  # Mesures brutes conservées par métrique (≈ 1 heure)
+HISTORY_MINUTE_POINTS = 1440  # Moyennes par minute conservées (24 heures)
+HISTORY_HOUR_POINTS = 720  # Moyennes par heure conservées (30 jours)
+PERF_WINDOW = 500  # Mesures conservées par phase pour le calcul des percentiles
+PERF_FILE = os.environ.get("PERF_FILE", "/app/data/perf.json")  # Fichier des mesures de performance (vide: désactivé)
+PERF_FILE_INTERVAL = 60  # Écart minimal entre deux écritures du fichier de performance (secondes)
+PROFILE_INTERVAL = 0.005  # Période d'échantillonnage du profileur (secondes)
+PROFILE_MAX_DURATION = 600  # Arrêt automatique de l'échantillonnage du profileur (secondes)
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()  # Niveau des logs (DEBUG, INFO, WARNING, ERROR)
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "json").lower()  # Format des logs: json (une ligne JSON par événement) ou text
+LOG_RATE_LIMIT = int(os.environ.get("LOG_RATE_LIMIT", "30"))  # Logs maximum par type d'événement et par minute (0: illimité)
+LOG_SAMPLING = os.environ.get("LOG_SAMPLING", "")  # Échantillonnage par type d'événement (ex: "poll.tick=0.1,poll.console=0.01")
 
-# Ajouter ces variables au début du fichier
-CONNECTION_PATTERNS = {
-    "minecraft": "joined the game",
-    "project_zomboid": "Player * connected",
-    "ark": "joined this ARK",
-    "valheim": "Got connection SteamID",
-    "rust": "joined [",
-    "general": "connected"  # Pattern générique
-}
+# Fonction pour obtenir la trace d'une exception d'un log (déjà mise en forme par la file, ou à mettre en forme)
+def format_record_exception(formatter, record):
+    exc = getattr(record, "exc", None)
+    if exc is None and record.exc_info:
+        exc = formatter.formatException(record.exc_info)
+    return exc
+
+# Mise en forme des logs en une ligne JSON par événement
+class JsonLogFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": datetime.datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "event": getattr(record, "event", None) or record.name,
+            "msg": record.getMessage()
+        }
+        entry.update(getattr(record, "fields", {}))
+        if getattr(record, "suppressed", 0):
+            entry["suppressed"] = record.suppressed
+        exc = format_record_exception(self, record)
+        if exc:
+            entry["exc"] = exc
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+# Mise en forme lisible (LOG_FORMAT=text)
+class TextLogFormatter(logging.Formatter):
+    def format(self, record):
+        line = f"{datetime.datetime.fromtimestamp(record.created).strftime('%H:%M:%S')} {record.levelname:<7} {record.getMessage()}"
+        fields = getattr(record, "fields", {})
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        if getattr(record, "suppressed", 0):
+            line += f" ({record.suppressed} message(s) similaire(s) ignoré(s))"
+        exc = format_record_exception(self, record)
+        if exc:
+            line += "\n" + exc
+        return line
+
+# Échantillonnage et limitation du débit des logs par type d'événement
+# Un type d'événement ne peut produire plus de `rate_limit` lignes par minute; le nombre de
+# lignes ignorées est indiqué sur la ligne suivante. Les erreurs ne sont jamais échantillonnées.
+class LogEventFilter(logging.Filter):
+    def __init__(self, rate_limit=LOG_RATE_LIMIT, sampling=None):
+        super().__init__()
+        self.rate_limit = rate_limit
+        self.sampling = sampling or {}
+        self._windows = {}  # événement -> [début de la fenêtre, lignes émises, lignes ignorées]
+
+    def filter(self, record):
+        event = getattr(record, "event", None)
+        if event is None:
+            return True
+        if record.levelno < logging.ERROR:
+            rate = self.sampling.get(event, 1.0)
+            if rate < 1.0 and random.random() >= rate:
+                return False
+        if not self.rate_limit:
+            return True
+        
+        now = time.monotonic()
+        window = self._windows.get(event)
+        if window is None or now - window[0] >= 60:
+            suppressed = window[2] if window else 0
+            window = self._windows[event] = [now, 0, 0]
+            if suppressed:
+                record.suppressed = suppressed
+        if window[1] >= self.rate_limit:
+            window[2] += 1
+            return False
+        window[1] += 1
+        return True
+
+# Fonction pour lire la configuration d'échantillonnage ("événement=taux,...")
+def parse_log_sampling(text):
+    sampling = {}
+    for item in text.split(","):
+        event, _, rate = item.partition("=")
+        try:
+            sampling[event.strip()] = float(rate)
+        except ValueError:
+            continue
+    return sampling
+
+# Dépôt des logs dans la file d'écriture
+# QueueHandler.prepare() insère la trace de l'exception dans le message et efface exc_info:
+# la trace est conservée à part (attribut `exc`) pour rester un champ séparé dans les logs JSON.
+class StructuredQueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = None
+        record.exc_text = None
+        return record
+
+# Fonction pour configurer les logs
+# Les lignes sont déposées dans une file et écrites par un thread dédié:
+# la boucle du bot n'attend jamais la sortie standard.
+def setup_logging():
+    formatter = JsonLogFormatter() if LOG_FORMAT == "json" else TextLogFormatter()
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(formatter)
+    
+    log_queue = queue.SimpleQueue()
+    queue_handler = StructuredQueueHandler(log_queue)
+    queue_handler.addFilter(LogEventFilter(LOG_RATE_LIMIT, parse_log_sampling(LOG_SAMPLING)))
+    listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(getattr(logging, LOG_LEVEL, logging.INFO))
+    # Les logs de discord.py en DEBUG sont trop volumineux
+    logging.getLogger("discord").setLevel(max(root.level, logging.INFO))
+    
+    listener.start()
+    atexit.register(listener.stop)
+    return logging.getLogger("pterobot")
+
+logger = setup_logging()
 
-DISCONNECTION_PATTERNS = {
-    "minecraft": "left the game",
-    "project_zomboid": "Player * disconnected",
-    "ark": "left this ARK",
-    "valheim": "Closing socket",
-    "rust": "disconnected:",
-    "general": "disconnected"  # Pattern générique
+# Fonction pour journaliser un événement (type d'événement + champs structurés)
+def log_event(level, event, message, exc_info=None, **fields):
+    if logger.isEnabledFor(level):
+        logger.log(level, message, exc_info=exc_info, extra={"event": event, "fields": fields})
+
+# Événement joueur détecté dans la console (kind: "join" ou "leave", timestamp: time.monotonic())
+PlayerEvent = namedtuple("PlayerEvent", ["kind", "player", "timestamp"])
+
+# Profils de jeux par défaut (utilisés si le fichier GAME_PROFILES_FILE n'existe pas encore)
+# - eggs: noms ou UUID des eggs Pterodactyl correspondant au jeu
+# - docker_images: fragments de l'image Docker du serveur
+# - name_keywords: mots du nom du serveur (dernier recours)
+# - join / leave: expressions régulières de détection, le groupe nommé `player` capture le nom
+# - player_name: règles de nettoyage (`strip`) et de validation (`valid`) du nom extrait
+# - query: sonde du jeu (`protocol`: minecraft, minecraft_query, a2s ou rcon) et son port
+#   (`port_variable`, `port` ou `port_offset`), utilisée si GAME_QUERY_INTERVAL > 0
+DEFAULT_GAME_PROFILES = {
+    "minecraft": {
+        "label": "Minecraft",
+        "eggs": ["Vanilla Minecraft", "Paper", "Forge Minecraft", "Sponge (SpongeVanilla)", "Bungeecord"],
+        "docker_images": [],
+        "name_keywords": ["minecraft"],
+        "join": [r"\]: (?P<player>[A-Za-z0-9_]{1,16}) joined the game"],
+        "leave": [r"\]: (?P<player>[A-Za-z0-9_]{1,16}) left the game"],
+        "player_name": {"valid": r"^[A-Za-z0-9_]{1,16}$"},
+        "query": {"protocol": "minecraft"}
+    },
+    "project_zomboid": {
+        "label": "Project Zomboid",
+        "eggs": ["Project Zomboid"],
+        "docker_images": [],
+        "name_keywords": ["zomboid"],
+        "join": [r"Player (?P<player>.+?) connected\b"],
+        "leave": [r"Player (?P<player>.+?) disconnected\b"],
+        "player_name": {"strip": "\"' "},
+        "query": {"protocol": "a2s"}
+    },
+    "ark": {
+        "label": "ARK: Survival Evolved",
+        "eggs": ["Ark: Survival Evolved"],
+        "docker_images": [],
+        "name_keywords": ["ark"],
+        "join": [r": (?P<player>.+?) joined this ARK"],
+        "leave": [r": (?P<player>.+?) left this ARK"],
+        "query": {"protocol": "a2s", "port_variable": "QUERY_PORT"}
+    },
+    "valheim": {
+        "label": "Valheim",
+        "eggs": ["Valheim", "Valheim Plus"],
+        "docker_images": [],
+        "name_keywords": ["valheim"],
+        "join": [r"Got connection SteamID (?P<player>\d+)"],
+        "leave": [r"Closing socket (?P<player>\d+)"],
+        "query": {"protocol": "a2s", "port_offset": 1, "names": False}
+    },
+    "rust": {
+        "label": "Rust",
+        "eggs": ["Rust"],
+        "docker_images": [],
+        "name_keywords": ["rust"],
+        "join": [r"/(?P<player>[^/]+?) joined \["],
+        "leave": [r"/(?P<player>[^/]+?) disconnect(?:ed|ing):"],
+        "query": {"protocol": "a2s", "port_variable": "QUERY_PORT"}
+    }
 }
-# Fonction pour détecter les connexions/déconnexions dans les logs
-def detect_player_event(log_text, patterns, server_type=None):
-    # Si le type de serveur est spécifié, utiliser uniquement ce pattern
-    if server_type and server_type in patterns:
-        pattern = patterns[server_type]
-        if "*" in pattern:  # Pattern avec extraction de nom au milieu
-            before, after = pattern.split("*")
-            if before in log_text and after in log_text:
-                player_part = log_text.split(before)[1].split(after)[0].strip()
-                return player_part
-        elif pattern in log_text:  # Pattern simple
-            # Extraire le nom selon le type de serveur
-            if server_type == "minecraft":
-                try:
-                    return log_text.split("[INFO]: ")[1].split(" " + pattern)[0]
-                except:
-                    pass
-            elif server_type == "ark":
-                try:
-                    return log_text.split(": ")[1].split(" " + pattern)[0]
-                except:
-                    pass
-            # Ajouter d'autres formats spécifiques ici
-            
-    # Sinon, essayer tous les patterns
-    else:
-        for srv_type, pattern in patterns.items():
-            if "*" in pattern:  # Pattern avec extraction de nom au milieu
-                before, after = pattern.split("*")
-                if before in log_text and after in log_text:
-                    player_part = log_text.split(before)[1].split(after)[0].strip()
-                    return player_part
-            elif pattern in log_text:  # Pattern simple
-                # Extraire le nom selon le type de serveur
-                if srv_type == "minecraft":
-                    try:
-                        return log_text.split("[INFO]: ")[1].split(" " + pattern)[0]
-                    except:
-                        pass
-                elif srv_type == "project_zomboid":
-                    try:
-                        return log_text.split("Player ")[1].split(" " + pattern.replace("Player * ", ""))[0]
-                    except:
-                        pass
-                elif srv_type == "ark":
-                    try:
-                        return log_text.split(": ")[1].split(" " + pattern)[0]
-                    except:
-                        pass
-                # Ajouter d'autres formats spécifiques
-                
-    return None  # Aucun joueur détecté
+
+# Extraire le plus long fragment littéral obligatoire d'une expression régulière
+# (ex: " joined the game"), utilisé comme pré-filtre rapide avant la regex.
+def regex_literal_hint(expression):
+    # Drapeaux (?i), (?x)...: le texte de l'expression ne correspond plus littéralement aux lignes
+    if re.match(r"\(\?[aiLmsux]", expression) or re.compile(expression).flags & ~re.UNICODE:
+        return ""
+    runs = []
+    current = ""
+    depth = 0
+    i = 0
+    while i < len(expression):
+        char = expression[i]
+        if char == "\\" and i + 1 < len(expression):
+            escaped = expression[i + 1]
+            i += 2
+            if depth == 0 and not escaped.isalnum():
+                current += escaped
+            else:
+                runs.append(current)
+                current = ""
+            continue
+        if char == "[":
+            # Ignorer la classe de caractères
+            i += 1
+            while i < len(expression) and expression[i] != "]":
+                i += 2 if expression[i] == "\\" else 1
+            runs.append(current)
+            current = ""
+        elif char == "(":
+            depth += 1
+            runs.append(current)
+            current = ""
+        elif char == ")":
+            depth -= 1
+        elif char == "|" and depth == 0:
+            # Alternative au premier niveau: aucun fragment n'est obligatoire
+            return ""
+        elif char in "*?{":
+            # Le caractère précédent devient optionnel (et le contenu de {m,n} n'est pas littéral)
+            if char == "{":
+                end = expression.find("}", i)
+                i = end if end != -1 else i
+            runs.append(current[:-1])
+            current = ""
+        elif char in "+.^$|":
+            runs.append(current)
+            current = ""
+        elif depth == 0:
+            current += char
+        i += 1
+    runs.append(current)
+    return max(runs, key=len)
+
+# Moteur de détection des événements joueurs
+# Les expressions sont compilées une seule fois (au démarrage ou au rechargement des profils).
+# Chaque ligne est analysée en une seule passe pour les connexions et les déconnexions:
+# un test de sous-chaîne (très rapide) sur le fragment littéral de chaque expression,
+# puis la regex uniquement sur les lignes candidates.
+class PlayerEventMatcher:
+    def __init__(self, profiles=DEFAULT_GAME_PROFILES):
+        self._by_game = {game: self._compile([game], profiles) for game in profiles}
+        # Type de serveur inconnu: toutes les expressions de tous les jeux
+        self._fallback = self._compile(list(profiles), profiles)
+
+    # Compiler les expressions de plusieurs jeux en une liste (fragment, regex, type, règles du nom)
+    @staticmethod
+    def _compile(games, profiles):
+        matchers = []
+        for game in games:
+            name_rules = profiles[game].get("player_name", {})
+            strip = name_rules.get("strip")
+            valid = re.compile(name_rules["valid"]).match if name_rules.get("valid") else None
+            for kind in ("join", "leave"):
+                for expression in profiles[game].get(kind, []):
+                    hint = regex_literal_hint(expression)
+                    matchers.append((hint if len(hint) >= 3 else "", re.compile(expression).search, kind, strip, valid))
+        return tuple(matchers)
+
+    # Analyser une ligne et retourner l'événement détecté (ou None)
+    def match(self, line, game=None):
+        events = self.scan([line], game)
+        return events[0] if events else None
+
+    # Analyser plusieurs lignes et retourner la liste des événements dans l'ordre
+    def scan(self, lines, game=None):
+        matchers = self._by_game.get(game, self._fallback)
+        events = []
+        for line in lines:
+            for hint, search, kind, strip, valid in matchers:
+                if hint in line:
+                    m = search(line)
+                    if m is not None:
+                        player = m.group("player").strip(strip)
+                        if player and (valid is None or valid(player)):
+                            events.append(PlayerEvent(kind, player, time.monotonic()))
+                            break
+        return events
+
+# Registre des profils de jeux, chargé depuis GAME_PROFILES_FILE et rechargé à chaud
+# lorsque le fichier change. Le profil de chaque serveur est déterminé à partir de son
+# egg Pterodactyl (puis de l'image Docker, puis du nom) et mis en cache.
+class GameProfileRegistry:
+    def __init__(self, path):
+        self.path = path
+        self.profiles = DEFAULT_GAME_PROFILES
+        self.matcher = PlayerEventMatcher(self.profiles)
+        self._mtime = None
+        self._resolved = {}  # server_id -> (clé de résolution, profil)
+        self._build_lookups()
+
+    def _build_lookups(self):
+        self._eggs = {}
+        for game, profile in self.profiles.items():
+            for egg in profile.get("eggs", []):
+                self._eggs[egg.lower()] = game
+        self._resolved.clear()
+
+    # Charger le fichier de profils (en le créant avec les profils par défaut s'il n'existe pas)
+    def load(self):
+        if not os.path.exists(self.path):
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                with open(self.path, "w") as f:
+                    json.dump(DEFAULT_GAME_PROFILES, f, indent=2)
+            except OSError as e:
+                log_event(logging.WARNING, "profiles.write_failed", f"⚠️ Impossible de créer le fichier de profils de jeux: {str(e)}", path=self.path)
+                return
+        
+        try:
+            mtime = os.path.getmtime(self.path)
+            with open(self.path, "r") as f:
+                profiles = json.load(f)
+            matcher = PlayerEventMatcher(profiles)
+        except Exception as e:
+            # Garder les profils actuels si le fichier est invalide
+            log_event(logging.ERROR, "profiles.invalid", f"❌ Fichier de profils de jeux invalide ({self.path}): {str(e)}", path=self.path)
+            self._mtime = os.path.getmtime(self.path) if os.path.exists(self.path) else None
+            return
+        
+        self.profiles = profiles
+        self.matcher = matcher
+        self._mtime = mtime
+        self._build_lookups()
+        log_event(logging.INFO, "profiles.loaded", f"🎮 {len(profiles)} profils de jeux chargés depuis {self.path}", path=self.path, count=len(profiles))
+
+    # Recharger les profils si le fichier a été modifié
+    def reload_if_changed(self):
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return
+        if mtime != self._mtime:
+            self.load()
+
+    # Déterminer le profil de jeu d'un serveur (None si inconnu)
+    def resolve(self, server_id, server_info):
+        egg = server_info.get("egg") or {}
+        key = (egg.get("uuid"), egg.get("name"), server_info.get("docker_image"), server_info.get("name"))
+        cached = self._resolved.get(server_id)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        
+        game = self._eggs.get((egg.get("uuid") or "").lower()) or self._eggs.get((egg.get("name") or "").lower())
+        if game is None:
+            docker_image = (server_info.get("docker_image") or "").lower()
+            name_words = set(re.findall(r"\w+", (server_info.get("name") or "").lower()))
+            for candidate, profile in self.profiles.items():
+                if docker_image and any(image.lower() in docker_image for image in profile.get("docker_images", [])):
+                    game = candidate
+                    break
+            if game is None:
+                for candidate, profile in self.profiles.items():
+                    if any(keyword.lower() in name_words for keyword in profile.get("name_keywords", [])):
+                        game = candidate
+                        break
+        
+        self._resolved[server_id] = (key, game)
+        return game
+
+# Registre des profils de jeux partagé
+game_profiles = GameProfileRegistry(GAME_PROFILES_FILE)
 
 # Couleurs pour les embeds
 COLORS = {
@@ -113,18 +481,110 @@ COLORS = {
 # Chemin vers le fichier de whitelist
 WHITELIST_FILE = "/app/data/whitelist.json"
 
-# Structure pour stocker les infos des serveurs
-servers_cache = {}
+# Instantané versionné et immuable de la flotte (inventaire et état d'exécution des serveurs)
+class FleetSnapshot:
+    __slots__ = ("version", "servers", "created_at")
+
+    def __init__(self, version, servers):
+        self.version = version
+        self.servers = MappingProxyType(servers)  # server_id -> fiche du serveur (lecture seule)
+        self.created_at = time.monotonic()
+
+# Flotte des serveurs
+# Les lecteurs (embeds, commandes, exporteurs) prennent `fleet.snapshot` (ou `fleet.servers`)
+# et le parcourent sans verrou ni copie, même à travers des `await`: ni la table ni les fiches
+# d'un instantané publié ne changent. Les écrivains préparent des modifications champ par
+# champ (`update`), appliquées d'un seul coup par `publish` qui remplace l'instantané
+# (une copie de la table par publication, pas par modification).
+class Fleet:
+    def __init__(self):
+        self.snapshot = FleetSnapshot(0, {})
+        self._pending = {}  # server_id -> {champ: valeur} en attente de publication
+
+    @property
+    def servers(self):
+        return self.snapshot.servers
+
+    # Fiche la plus récente d'un serveur, modifications en attente comprises (côté écrivains)
+    def get(self, server_id, default=None):
+        record = self.snapshot.servers.get(server_id)
+        if record is None:
+            return default
+        changes = self._pending.get(server_id)
+        return MappingProxyType({**record, **changes}) if changes else record
+
+    # Préparer la modification de champs d'un serveur (ignorée s'il a quitté l'inventaire)
+    def update(self, server_id, **changes):
+        if server_id in self.snapshot.servers:
+            self._pending.setdefault(server_id, {}).update(changes)
+
+    # Appliquer les modifications en attente dans un nouvel instantané
+    def publish(self):
+        if self._pending:
+            servers = dict(self.snapshot.servers)
+            for server_id, changes in self._pending.items():
+                if server_id in servers:
+                    servers[server_id] = MappingProxyType({**servers[server_id], **changes})
+            self._pending = {}
+            self.snapshot = FleetSnapshot(self.snapshot.version + 1, servers)
+        return self.snapshot
+
+    # Remplacer toute la table (nouvel inventaire construit à partir de `get`)
+    def replace(self, records):
+        self._pending = {}
+        self.snapshot = FleetSnapshot(self.snapshot.version + 1, {
+            server_id: MappingProxyType(record) for server_id, record in records.items()
+        })
+        return self.snapshot
+
+# Flotte partagée
+fleet = Fleet()
+
+# Message de statut posté (ou page du tableau de bord) et empreinte du contenu affiché
+class StatusMessage:
+    __slots__ = ("message", "fingerprint")
+
+    def __init__(self, message, fingerprint=None):
+        self.message = message
+        self.fingerprint = fingerprint
+
+# Session d'un joueur connecté
+# Horodatages monotones (time.monotonic()): insensibles aux changements d'heure du système.
+# `seen_at` est repoussé à chaque signe de présence (connexion, sonde du jeu).
+class PlayerSession:
+    __slots__ = ("connected_at", "seen_at")
+
+    def __init__(self, connected_at, seen_at=None):
+        self.connected_at = connected_at
+        self.seen_at = connected_at if seen_at is None else seen_at
 
-# Structure pour stocker les messages de statut postés
+    # Durée de la session en secondes
+    def duration(self, now=None):
+        return max(0, (time.monotonic() if now is None else now) - self.connected_at)
+
+# Fonction pour convertir un horodatage monotone en heure locale (affichage et enregistrement)
+def wall_clock(monotonic_time):
+    return datetime.datetime.now() - datetime.timedelta(seconds=time.monotonic() - monotonic_time)
+
+# Structure pour stocker les messages de statut postés (server_id -> StatusMessage)
 status_messages = {}
 
-# Structure pour stocker les joueurs connectés
+# Pages du tableau de bord (mode DASHBOARD_MODE): liste de StatusMessage
+dashboard_pages = []
+
+# Structure pour stocker les joueurs connectés (server_id -> {joueur: PlayerSession})
 connected_players = {}
 
 # Structure pour stocker l'état précédent des serveurs
 previous_server_states = {}
 
+# Inventaire: date de la dernière récupération réussie et récupération en cours
+inventory_fetched_at = None
+inventory_task = None
+
+# Passage de vérification en cours (lancé par une commande)
+status_check_task = None
+
 # Charger la whitelist depuis le fichier JSON ou l'environnement
 def load_whitelist():
     if os.path.exists(WHITELIST_FILE):
@@ -146,13 +606,464 @@ def save_whitelist(whitelist):
 # Liste des utilisateurs autorisés (ID Discord)
 WHITELIST = load_whitelist()
 
+# Stockage persistant de l'état du bot (SQLite dans /app/data)
+# Joueurs connectés, messages de statut, pages du tableau de bord et derniers états
+# sont restaurés au démarrage. Les modifications sont accumulées en mémoire puis
+# écrites par lots en arrière-plan: la boucle de vérification ne touche jamais le disque.
+class StateStore:
+    TABLES = {
+        "players": "CREATE TABLE IF NOT EXISTS players (server_id TEXT, player TEXT, connect_time REAL, PRIMARY KEY (server_id, player))",
+        "status_messages": "CREATE TABLE IF NOT EXISTS status_messages (server_id TEXT PRIMARY KEY, message_id INTEGER)",
+        "dashboard_pages": "CREATE TABLE IF NOT EXISTS dashboard_pages (page INTEGER PRIMARY KEY, message_id INTEGER)",
+        "server_states": "CREATE TABLE IF NOT EXISTS server_states (server_id TEXT PRIMARY KEY, status TEXT)",
+        "log_cursors": "CREATE TABLE IF NOT EXISTS log_cursors (server_id TEXT PRIMARY KEY, anchor TEXT)",
+        "metrics": "CREATE TABLE IF NOT EXISTS metrics (server_id TEXT, metric TEXT, resolution INTEGER, t INTEGER, value REAL, peak REAL, PRIMARY KEY (server_id, metric, resolution, t))",
+    }
+    # Durée de conservation des agrégats de l'historique (résolution en secondes -> durée en secondes)
+    METRICS_RETENTION = {60: HISTORY_MINUTE_POINTS * 60, 3600: HISTORY_HOUR_POINTS * 3600}
+
+    def __init__(self, path, flush_interval=STATE_FLUSH_INTERVAL):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.restored = False
+        self._pending = {}  # (table, clé) -> valeur à écrire (None: ligne à supprimer)
+        self._cleared = set()  # Tables à vider avant d'appliquer les écritures en attente
+        self._metric_rows = []  # Agrégats de l'historique à ajouter
+        self._conn = None
+        self._task = None
+        self._writing = None  # Écriture en cours dans un thread
+
+    def _connect(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            for statement in self.TABLES.values():
+                self._conn.execute(statement)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS metrics_age ON metrics (resolution, t)")
+            self._conn.commit()
+        return self._conn
+
+    # Lire tout l'état enregistré (appelé une seule fois, au démarrage)
+    def _read_all(self):
+        conn = self._connect()
+        data = {table: conn.execute(f"SELECT * FROM {table}").fetchall() for table in self.TABLES if table != "metrics"}
+        # Historique: seulement les agrégats qui tiennent dans les tampons circulaires
+        # (les plus récents de chaque série), pour borner la mémoire au démarrage
+        data["metrics"] = []
+        for resolution, retention in self.METRICS_RETENTION.items():
+            data["metrics"].extend(conn.execute(
+                "SELECT server_id, metric, resolution, t, value, peak FROM ("
+                "SELECT *, ROW_NUMBER() OVER (PARTITION BY server_id, metric ORDER BY t DESC) AS age "
+                "FROM metrics WHERE resolution = ?) WHERE age <= ? ORDER BY t",
+                (resolution, retention // resolution)
+            ))
+        return data
+
+    async def load(self):
+        try:
+            return await asyncio.to_thread(self._read_all)
+        except sqlite3.Error as e:
+            log_event(logging.WARNING, "state.load_failed", f"⚠️ Impossible de lire l'état enregistré ({self.path}): {str(e)}", path=self.path)
+            return {table: [] for table in self.TABLES}
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    # Enregistrements différés (la dernière valeur d'une même clé l'emporte)
+    def set_player(self, server_id, player, session):
+        self._pending[("players", (server_id, player))] = (wall_clock(session.connected_at).timestamp(),)
+
+    def remove_player(self, server_id, player):
+        self._pending[("players", (server_id, player))] = None
+
+    def set_status_message(self, server_id, message):
+        self._pending[("status_messages", (server_id,))] = (message.id,)
+
+    def set_dashboard_page(self, index, message):
+        self._pending[("dashboard_pages", (index,))] = (message.id,)
+
+    def set_server_state(self, server_id, status):
+        self._pending[("server_states", (server_id,))] = (status,)
+
+    def set_log_cursor(self, server_id, anchor):
+        self._pending[("log_cursors", (server_id,))] = (json.dumps(anchor),)
+
+    def add_metric_rows(self, rows):
+        self._metric_rows.extend(rows)
+
+    # Vider une table (ex: messages de statut republiés)
+    def clear(self, table):
+        self._pending = {key: value for key, value in self._pending.items() if key[0] != table}
+        self._cleared.add(table)
+
+    # Oublier tout ce qui concerne un serveur retiré de l'inventaire
+    def forget_server(self, server_id):
+        for table in ("players", "status_messages", "server_states", "log_cursors", "metrics"):
+            self._pending[(table, (server_id,))] = None
+
+    def _write(self, cleared, pending, metric_rows):
+        conn = self._connect()
+        with conn:
+            for table in cleared:
+                conn.execute(f"DELETE FROM {table}")
+            if metric_rows:
+                conn.executemany("INSERT OR REPLACE INTO metrics VALUES (?, ?, ?, ?, ?, ?)", metric_rows)
+                now = time.time()
+                for resolution, retention in self.METRICS_RETENTION.items():
+                    conn.execute("DELETE FROM metrics WHERE resolution = ? AND t < ?", (resolution, now - retention))
+            for (table, key), value in pending.items():
+                if value is not None:
+                    placeholders = ", ".join("?" * (len(key) + len(value)))
+                    conn.execute(f"INSERT OR REPLACE INTO {table} VALUES ({placeholders})", key + value)
+                elif table == "players" and len(key) == 1:
+                    conn.execute("DELETE FROM players WHERE server_id = ?", key)
+                else:
+                    column = "page" if table == "dashboard_pages" else "server_id"
+                    where = f"{column} = ?" + (" AND player = ?" if len(key) == 2 else "")
+                    conn.execute(f"DELETE FROM {table} WHERE {where}", key)
+
+    # Écrire les modifications en attente dans un thread
+    async def flush(self):
+        # Une seule écriture à la fois sur la connexion (elle continue même si l'appelant est annulé)
+        if self._writing is not None and not self._writing.done():
+            await asyncio.wait([self._writing])
+        if not self._pending and not self._cleared and not self._metric_rows:
+            return
+        cleared, pending, metric_rows = self._cleared, self._pending, self._metric_rows
+        self._cleared, self._pending, self._metric_rows = set(), {}, []
+        self._writing = asyncio.ensure_future(asyncio.to_thread(self._write, cleared, pending, metric_rows))
+        try:
+            await asyncio.shield(self._writing)
+        except Exception as e:
+            # Remettre les modifications en attente pour la prochaine tentative
+            # (sans écraser celles arrivées entre-temps)
+            pending = {key: value for key, value in pending.items() if key[0] not in self._cleared}
+            self._cleared = cleared | self._cleared
+            self._pending = {**pending, **self._pending}
+            self._metric_rows = metric_rows + self._metric_rows
+            log_event(logging.WARNING, "state.flush_failed", f"⚠️ Erreur lors de l'enregistrement de l'état: {str(e)}")
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                # Ne jamais arrêter l'écriture différée (disque plein, permissions...)
+                log_event(logging.ERROR, "state.flush_failed", f"❌ Erreur inattendue lors de l'enregistrement de l'état: {str(e)}", exc_info=True)
+
+# Stockage partagé
+state_store = StateStore(STATE_DB_FILE)
+
+# Fonction pour restaurer l'état enregistré (joueurs, messages de statut, derniers états)
+async def restore_state(channel):
+    data = await state_store.load()
+    
+    servers = fleet.servers
+    now, wall_now = time.monotonic(), time.time()
+    for server_id, player, connect_time in data["players"]:
+        if server_id in servers:
+            players = connected_players.setdefault(server_id, {})
+            players[player] = PlayerSession(now - max(0, wall_now - connect_time), now)
+            fleet.update(server_id, players=MappingProxyType(dict(players)))
+    fleet.publish()
+    
+    for server_id, status in data["server_states"]:
+        if server_id in servers:
+            previous_server_states[server_id] = status
+    
+    # Reprendre la lecture des consoles là où elle s'était arrêtée (pas de notification en double)
+    for server_id, anchor in data["log_cursors"]:
+        if server_id in servers:
+            log_cursors[server_id] = LogCursor(anchor=json.loads(anchor))
+    
+    resource_history.restore(row for row in data["metrics"] if row[0] in servers)
+    
+    # Messages déjà postés: les reprendre sans appel à l'API Discord
+    # (empreinte vide pour que leur contenu soit rafraîchi au prochain passage)
+    if channel:
+        for server_id, message_id in data["status_messages"]:
+            if server_id in servers:
+                status_messages[server_id] = StatusMessage(channel.get_partial_message(message_id))
+        for _, message_id in sorted(data["dashboard_pages"]):
+            dashboard_pages.append(StatusMessage(channel.get_partial_message(message_id)))
+    
+    state_store.restored = True
+    players = sum(len(players) for players in connected_players.values())
+    messages = len(status_messages) + len(dashboard_pages)
+    log_event(
+        logging.INFO, "state.restored",
+        f"💾 État restauré: {players} joueur(s), {messages} message(s) de statut, {len(previous_server_states)} état(s)",
+        players=players, messages=messages, states=len(previous_server_states)
+    )
+
+# Verrou de la restauration (créé à la première utilisation pour être lié à la boucle du bot)
+restore_lock = None
+
+# Fonction pour restaurer l'état une seule fois, dès que l'inventaire est disponible
+# (un inventaire vide, ex: panel injoignable au démarrage, écarterait toutes les lignes enregistrées).
+# L'écriture différée ne démarre qu'après la restauration pour ne rien écraser avant la lecture.
+async def restore_state_when_ready():
+    global restore_lock
+    if restore_lock is None:
+        restore_lock = asyncio.Lock()
+    async with restore_lock:
+        if state_store.restored or not fleet.servers:
+            return state_store.restored
+        await restore_state(bot.get_channel(NOTIFICATION_CHANNEL_ID))
+        state_store.start()
+        return True
+
 # Intents
 intents = discord.Intents.default()
 intents.message_content = True
 
-# Création du bot
-bot = commands.Bot(command_prefix='!', intents=intents)
-bot.remove_command('help')  # Supprimer la commande d'aide par défaut
+# Métriques internes au format Prometheus (compteurs et histogrammes)
+# Les jauges (ressources des serveurs, joueurs, file d'envoi...) sont calculées
+# par des collecteurs au moment de la lecture de /metrics.
+class MetricsRegistry:
+    DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+    def __init__(self):
+        self._families = {}  # nom -> {"type", "help", "buckets", "values": {labels: valeur}}
+        self._collectors = []
+
+    def declare(self, name, kind, help_text, buckets=None):
+        self._families[name] = {
+            "type": kind,
+            "help": help_text,
+            "buckets": tuple(buckets or self.DEFAULT_BUCKETS),
+            "values": {}
+        }
+
+    # Ajouter une fonction qui renvoie des jauges: [(nom, aide, [(labels, valeur)])]
+    def add_collector(self, collector):
+        self._collectors.append(collector)
+
+    def inc(self, name, value=1, **labels):
+        values = self._families[name]["values"]
+        key = tuple(sorted(labels.items()))
+        values[key] = values.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        family = self._families[name]
+        key = tuple(sorted(labels.items()))
+        state = family["values"].get(key)
+        if state is None:
+            # Compteurs par palier, puis somme et nombre d'observations
+            state = family["values"][key] = [0] * (len(family["buckets"]) + 2)
+        for i, bound in enumerate(family["buckets"]):
+            if value <= bound:
+                state[i] += 1
+        state[-2] += value
+        state[-1] += 1
+
+    @staticmethod
+    def _labels(labels):
+        if not labels:
+            return ""
+        escaped = (
+            f'{key}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34)).replace(chr(10), " ")}"'
+            for key, value in labels
+        )
+        return "{" + ",".join(escaped) + "}"
+
+    # Texte d'exposition Prometheus (format 0.0.4)
+    def render(self):
+        lines = []
+        for name, family in self._families.items():
+            lines.append(f"# HELP {name} {family['help']}")
+            lines.append(f"# TYPE {name} {family['type']}")
+            for labels, value in family["values"].items():
+                if family["type"] != "histogram":
+                    lines.append(f"{name}{self._labels(labels)} {value}")
+                    continue
+                for bound, count in zip(family["buckets"], value):
+                    lines.append(f"{name}_bucket{self._labels(labels + (('le', bound),))} {count}")
+                lines.append(f"{name}_bucket{self._labels(labels + (('le', '+Inf'),))} {value[-1]}")
+                lines.append(f"{name}_sum{self._labels(labels)} {value[-2]}")
+                lines.append(f"{name}_count{self._labels(labels)} {value[-1]}")
+        
+        for collector in self._collectors:
+            try:
+                gauges = collector()
+            except Exception as e:
+                log_event(logging.ERROR, "metrics.collect_failed", f"Erreur lors du calcul des métriques: {str(e)}", exc_info=True)
+                continue
+            for name, help_text, samples in gauges:
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} gauge")
+                for labels, value in samples:
+                    lines.append(f"{name}{self._labels(tuple(sorted(labels.items())))} {value}")
+        return "\n".join(lines) + "\n"
+
+# Registre partagé
+metrics = MetricsRegistry()
+metrics.declare("pterobot_api_request_duration_seconds", "histogram", "Durée des requêtes à l'API Pterodactyl par endpoint")
+metrics.declare("pterobot_api_errors_total", "counter", "Erreurs de l'API Pterodactyl par endpoint et code de statut")
+metrics.declare("pterobot_tick_duration_seconds", "histogram", "Durée d'un passage de vérification des serveurs")
+metrics.declare("pterobot_notifications_sent_total", "counter", "Notifications envoyées sur Discord")
+metrics.declare("pterobot_game_queries_total", "counter", "Sondes des jeux par résultat")
+
+# Mesures de performance par phase (fetch, wings_collect, parse, diff, notify, render, send)
+# `wings_collect` (une requête groupée par nœud Wings) est séparé de `fetch` (une requête par serveur)
+# pour ne pas fausser les percentiles des requêtes au panel.
+# Chaque phase garde ses PERF_WINDOW dernières durées (par serveur ou par envoi) pour
+# calculer des percentiles glissants. Les sommes par passage de vérification sont
+# conservées séparément, avec la durée totale du passage.
+class PerfStats:
+    PHASES = ("fetch", "wings_collect", "parse", "diff", "notify", "render", "send")
+
+    def __init__(self, window=PERF_WINDOW):
+        self.window = window
+        self.samples = {phase: deque(maxlen=window) for phase in self.PHASES}
+        self.ticks = deque(maxlen=window)  # {"duration", "servers", phase: somme}
+        self.last_by_server = {}  # server_id -> {phase: dernière durée}
+        self._tick = None
+        self._written_at = 0
+
+    def record(self, phase, duration, server_id=None):
+        self.samples[phase].append(duration)
+        if server_id is not None:
+            self.last_by_server.setdefault(server_id, {})[phase] = duration
+        if self._tick is not None:
+            self._tick[phase] = self._tick.get(phase, 0) + duration
+
+    @contextlib.contextmanager
+    def measure(self, phase, server_id=None):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(phase, time.perf_counter() - started, server_id)
+
+    def begin_tick(self):
+        self._tick = {}
+
+    def end_tick(self, duration, servers):
+        tick = self._tick or {}
+        self._tick = None
+        tick["duration"] = duration
+        tick["servers"] = servers
+        self.ticks.append(tick)
+
+    def forget(self, server_id):
+        self.last_by_server.pop(server_id, None)
+
+    @staticmethod
+    def percentiles(values):
+        if not values:
+            return None
+        ordered = sorted(values)
+        rank = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+        return {"count": len(ordered), "p50": rank(0.5), "p95": rank(0.95), "p99": rank(0.99), "max": ordered[-1]}
+
+    # Résumé des percentiles (secondes) par phase et par passage
+    def summary(self):
+        return {
+            "phases": {phase: self.percentiles(values) for phase, values in self.samples.items()},
+            "tick": self.percentiles([tick["duration"] for tick in self.ticks]),
+            "tick_phases": {
+                phase: self.percentiles([tick.get(phase, 0) for tick in self.ticks]) for phase in self.PHASES
+            } if self.ticks else {},
+            "slowest_servers": sorted(
+                ((server_id, phases.get("fetch", 0)) for server_id, phases in self.last_by_server.items()),
+                key=lambda item: item[1],
+                reverse=True
+            )[:5]
+        }
+
+    def _write(self, path, data):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        temporary = path + ".tmp"
+        with open(temporary, "w") as f:
+            json.dump(data, f, indent=2)
+        os.replace(temporary, path)
+
+    # Écrire le résumé dans PERF_FILE (au plus une fois par PERF_FILE_INTERVAL, dans un thread)
+    async def write_file(self, force=False):
+        if not PERF_FILE or (not force and time.monotonic() - self._written_at < PERF_FILE_INTERVAL):
+            return
+        self._written_at = time.monotonic()
+        data = {"updated_at": datetime.datetime.now().isoformat(timespec="seconds"), **self.summary()}
+        try:
+            await asyncio.to_thread(self._write, PERF_FILE, data)
+        except OSError as e:
+            log_event(logging.WARNING, "perf.write_failed", f"⚠️ Impossible d'écrire {PERF_FILE}: {str(e)}")
+
+# Mesures partagées
+perf = PerfStats()
+
+# Profileur par échantillonnage de la pile du thread de la boucle du bot
+# Un thread relève la pile toutes les PROFILE_INTERVAL secondes; le résultat est au
+# format « piles repliées » (une pile par ligne + nombre d'échantillons), lisible par
+# flamegraph.pl, speedscope ou inferno.
+class SamplingProfiler:
+    def __init__(self, interval=PROFILE_INTERVAL, max_duration=PROFILE_MAX_DURATION):
+        self.interval = interval
+        self.max_duration = max_duration
+        self.counts = {}
+        self.samples = 0
+        self.started_at = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return False
+        self.counts = {}
+        self.samples = 0
+        self.started_at = time.monotonic()
+        self._stop.clear()
+        target = threading.get_ident()
+        self._thread = threading.Thread(target=self._sample, args=(target,), name="profiler", daemon=True)
+        self._thread.start()
+        return True
+
+    def _sample(self, target):
+        while not self._stop.wait(self.interval):
+            if time.monotonic() - self.started_at > self.max_duration:
+                break
+            frame = sys._current_frames().get(target)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                key = ";".join(reversed(stack))
+                self.counts[key] = self.counts.get(key, 0) + 1
+                self.samples += 1
+
+    # Arrêter l'échantillonnage et renvoyer les piles repliées
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._thread = None
+        return "\n".join(f"{stack} {count}" for stack, count in sorted(self.counts.items())) + "\n"
+
+# Profileur partagé (démarré et arrêté avec !perf profile)
+profiler = SamplingProfiler()
 
 # Headers pour les requêtes API Pterodactyl
 headers = {
@@ -161,25 +1072,389 @@ headers = {
     'Authorization': 'Bearer ' + PTERODACTYL_API_KEY
 }
 
+# Réponse de l'API Pterodactyl (interface proche de celle de requests)
+class ApiResponse:
+    def __init__(self, status_code, data=None, text="", headers=None):
+        self.status_code = status_code
+        self.data = data
+        self.text = text
+        self.headers = headers or {}
+
+    def json(self):
+        if self.data is None:
+            raise ValueError("Réponse sans contenu JSON")
+        return self.data
+
+# Échéance d'un lot de requêtes atteinte avant l'envoi (la dépendance n'est pas en cause)
+class DeadlineExceeded(asyncio.TimeoutError):
+    pass
+
+# Priorités des requêtes à l'API (les actions des utilisateurs passent avant la surveillance)
+PRIORITY_USER = 0
+PRIORITY_BACKGROUND = 1
+
+# Régulateur de débit pour l'API Pterodactyl (seau à jetons)
+# Le budget suit les en-têtes X-RateLimit-* renvoyés par le panel et respecte Retry-After
+# après une réponse 429. Une partie du budget est réservée aux actions des utilisateurs:
+# la surveillance en arrière-plan attend avant de l'entamer.
+class RateLimitGovernor:
+    def __init__(self, limit_per_minute=API_RATE_LIMIT, user_reserve=API_USER_RESERVE):
+        self.limit = limit_per_minute
+        self.user_reserve = user_reserve
+        self.tokens = float(limit_per_minute)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.remaining = None  # Dernière valeur de X-RateLimit-Remaining
+        self.recent = deque()  # Horodatage des requêtes de la dernière minute
+        self.waits = 0  # Requêtes retardées par le régulateur
+        self.rate_limited = 0  # Réponses 429 reçues
+        self._users_waiting = 0
+
+    def _refill(self, now):
+        self.tokens = min(self.limit, self.tokens + (now - self.updated) * self.limit / 60)
+        self.updated = now
+        # Oublier les requêtes de plus d'une minute (à chaque requête, pas seulement à la lecture)
+        while self.recent and now - self.recent[0] > 60:
+            self.recent.popleft()
+
+    # Attendre un jeton (lève asyncio.TimeoutError si l'échéance est dépassée)
+    async def acquire(self, priority=PRIORITY_BACKGROUND, deadline=None):
+        loop = asyncio.get_running_loop()
+        is_user = priority == PRIORITY_USER
+        reserve = 0 if is_user else self.limit * self.user_reserve
+        waited = False
+        if is_user:
+            self._users_waiting += 1
+        try:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self.blocked_until and self.tokens >= 1 + reserve and (is_user or not self._users_waiting):
+                    self.tokens -= 1
+                    self.recent.append(now)
+                    return
+                
+                if not waited:
+                    waited = True
+                    self.waits += 1
+                wait = max(self.blocked_until - now, (1 + reserve - self.tokens) * 60 / self.limit, 0.05)
+                if deadline is not None:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        raise DeadlineExceeded("Délai dépassé en attente du budget API")
+                    wait = min(wait, remaining)
+                await asyncio.sleep(min(wait, 1))
+        finally:
+            if is_user:
+                self._users_waiting -= 1
+
+    # Mettre à jour le budget d'après une réponse du panel
+    def observe(self, status_code, response_headers):
+        limit = response_headers.get("X-RateLimit-Limit")
+        remaining = response_headers.get("X-RateLimit-Remaining")
+        if limit and limit.isdigit() and int(limit) > 0:
+            self.limit = int(limit)
+        if remaining and remaining.isdigit():
+            self.remaining = int(remaining)
+            self.tokens = min(self.tokens, float(self.remaining))
+        
+        if status_code == 429:
+            self.rate_limited += 1
+            retry_after = response_headers.get("Retry-After", "")
+            delay = float(retry_after) if retry_after.replace(".", "", 1).isdigit() else 60.0
+            self.blocked_until = max(self.blocked_until, time.monotonic() + delay)
+            self.tokens = 0.0
+            log_event(logging.WARNING, "api.rate_limited", f"⚠️ Limite de requêtes du panel atteinte, pause de {delay:.0f} secondes", delay=round(delay, 1))
+
+    # Utilisation actuelle du budget
+    def snapshot(self):
+        now = time.monotonic()
+        self._refill(now)
+        return {
+            "limit": self.limit,
+            "used_last_minute": len(self.recent),
+            "available": int(self.tokens),
+            "remaining": self.remaining,
+            "blocked_for": max(0.0, self.blocked_until - now),
+            "waits": self.waits,
+            "rate_limited": self.rate_limited
+        }
+
+# Client HTTP asynchrone partagé pour l'API Pterodactyl
+# Une seule session aiohttp (connexions keep-alive réutilisées) pour tout le bot,
+# afin de ne jamais bloquer la boucle d'événements de discord.py.
+class PterodactylClient:
+    def __init__(self, base_url, default_headers, timeout=API_TIMEOUT, batch_timeout=API_BATCH_TIMEOUT,
+                 max_connections=API_MAX_CONNECTIONS, max_connections_per_host=API_MAX_CONNECTIONS_PER_HOST):
+        self.base_url = (base_url or "").rstrip("/")
+        self.default_headers = dict(default_headers)
+        self.timeout = timeout
+        self.batch_timeout = batch_timeout
+        self.max_connections = max_connections
+        self.max_connections_per_host = max_connections_per_host
+        self._session = None
+        self._ws_session = None
+        self.governor = RateLimitGovernor()
+
+    # Créer la session à la première utilisation (elle doit vivre dans la boucle du bot)
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                limit_per_host=self.max_connections_per_host,
+                keepalive_timeout=60,
+                ttl_dns_cache=300
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers=self.default_headers,
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+        return self._session
+
+    # Échéance d'un lot de requêtes (à passer en `deadline` à chaque requête du lot)
+    def batch_deadline(self, timeout=None):
+        return asyncio.get_running_loop().time() + (timeout if timeout is not None else self.batch_timeout)
+
+    # Délai effectif d'une requête: le plus court entre le délai par requête et l'échéance du lot
+    def _effective_timeout(self, timeout, deadline):
+        timeout = timeout if timeout is not None else self.timeout
+        if deadline is not None:
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                raise DeadlineExceeded("Délai du lot de requêtes dépassé")
+            timeout = min(timeout, remaining)
+        return timeout
+
+    # Envoyer une requête et lire la réponse complète
+    # Les requêtes des utilisateurs (PRIORITY_USER) sont réessayées une fois après un 429.
+    async def request(self, method, path, json_data=None, params=None, timeout=None, deadline=None,
+                      priority=PRIORITY_BACKGROUND):
+        attempts = 2 if priority == PRIORITY_USER else 1
+        endpoint = re.sub(r"/servers/[^/]+", "/servers/{server}", path)
+        for attempt in range(attempts):
+            await self.governor.acquire(priority, deadline)
+            started = time.monotonic()
+            try:
+                response = await self._send(method, path, json_data, params, timeout, deadline)
+            except asyncio.TimeoutError:
+                metrics.inc("pterobot_api_errors_total", endpoint=endpoint, status="timeout")
+                raise
+            except aiohttp.ClientError:
+                metrics.inc("pterobot_api_errors_total", endpoint=endpoint, status="connection")
+                raise
+            metrics.observe("pterobot_api_request_duration_seconds", time.monotonic() - started, endpoint=endpoint)
+            if response.status_code >= 400:
+                metrics.inc("pterobot_api_errors_total", endpoint=endpoint, status=str(response.status_code))
+            self.governor.observe(response.status_code, response.headers)
+            if response.status_code != 429:
+                break
+        return response
+
+    async def _send(self, method, path, json_data, params, timeout, deadline):
+        session = self._get_session()
+        total = self._effective_timeout(timeout, deadline)
+        try:
+            async with session.request(
+                method,
+                f"{self.base_url}{path}",
+                json=json_data,
+                params=params,
+                timeout=aiohttp.ClientTimeout(total=total)
+            ) as response:
+                text = await response.text()
+                data = None
+                if text:
+                    try:
+                        data = json.loads(text)
+                    except ValueError:
+                        pass
+                return ApiResponse(response.status, data, text, response.headers.copy())
+        except asyncio.TimeoutError as e:
+            # Requête coupée par l'échéance du lot et non par son propre délai: la dépendance n'est pas en cause
+            if total < (timeout if timeout is not None else self.timeout):
+                raise DeadlineExceeded("Délai du lot de requêtes dépassé") from e
+            raise
+
+    async def get(self, path, **kwargs):
+        return await self.request("GET", path, **kwargs)
+
+    async def post(self, path, json_data=None, **kwargs):
+        return await self.request("POST", path, json_data=json_data, **kwargs)
+
+    # Ouvrir un websocket (session dédiée, sans la clé API du panel dans les en-têtes)
+    async def ws_connect(self, url, **kwargs):
+        if self._ws_session is None or self._ws_session.closed:
+            self._ws_session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=None, connect=self.timeout))
+        return await self._ws_session.ws_connect(url, **kwargs)
+
+    async def close(self):
+        for session in (self._session, self._ws_session):
+            if session is not None and not session.closed:
+                await session.close()
+        self._session = None
+        self._ws_session = None
+
+# Client partagé par tout le bot
+api = PterodactylClient(PTERODACTYL_API_URL, headers)
+
+# Fonction pour lire la configuration des nœuds Wings (WINGS_NODES)
+# Format JSON: {"nom du nœud": {"url": "https://node1.exemple.fr:8080", "token": "...", "verify_ssl": true}}
+def parse_wings_nodes(text):
+    if not text.strip():
+        return {}
+    try:
+        nodes = json.loads(text)
+    except ValueError as e:
+        log_event(logging.ERROR, "wings.config_invalid", f"❌ WINGS_NODES n'est pas un JSON valide: {str(e)}")
+        return {}
+    valid = {}
+    for name, node in (nodes.items() if isinstance(nodes, dict) else ()):
+        if isinstance(node, dict) and node.get("url") and node.get("token"):
+            valid[name] = node
+        else:
+            log_event(logging.ERROR, "wings.config_invalid", f"❌ Nœud Wings {name} ignoré: « url » et « token » sont requis", node=name)
+    return valid
+
+# Collecteur des états par nœud directement auprès des démons Wings
+# Un seul GET /api/servers par nœud renvoie l'état et les ressources de tous ses serveurs,
+# au lieu d'un /resources par serveur via le panel. Les serveurs d'un nœud non configuré
+# ou injoignable continuent d'être interrogés par l'API client.
+class WingsCollector:
+    def __init__(self, nodes, timeout=API_TIMEOUT):
+        self.nodes = nodes
+        self.timeout = timeout
+        self._session = None
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.timeout))
+        return self._session
+
+    # Convertir un serveur renvoyé par Wings au format de /api/client/servers/{id}/resources
+    @staticmethod
+    def to_resources(server):
+        usage = server.get("utilization", {})
+        network = usage.get("network", {})
+        return {
+            "current_state": server.get("state") or usage.get("state"),
+            "is_suspended": server.get("is_suspended", False),
+            "resources": {
+                "memory_bytes": usage.get("memory_bytes", 0),
+                "cpu_absolute": usage.get("cpu_absolute", 0),
+                "disk_bytes": usage.get("disk_bytes", 0),
+                "network_rx_bytes": network.get("rx_bytes", 0),
+                "network_tx_bytes": network.get("tx_bytes", 0),
+                "uptime": usage.get("uptime", 0)
+            }
+        }
+
+    # Récupérer l'état de tous les serveurs d'un nœud (uuid -> ressources)
+    async def fetch_node(self, name, deadline=None):
+        node = self.nodes[name]
+        timeout = self.timeout
+        if deadline is not None:
+            timeout = min(timeout, deadline - asyncio.get_running_loop().time())
+            if timeout <= 0:
+                raise DeadlineExceeded("Délai du lot de requêtes dépassé")
+        endpoint = "wings:/api/servers"
+        started = time.monotonic()
+        try:
+            async with self._get_session().get(
+                f"{node['url'].rstrip('/')}/api/servers",
+                headers={"Authorization": f"Bearer {node['token']}", "Accept": "application/json"},
+                ssl=None if node.get("verify_ssl", True) else False,
+                timeout=aiohttp.ClientTimeout(total=timeout)
+            ) as response:
+                if response.status != 200:
+                    metrics.inc("pterobot_api_errors_total", endpoint=endpoint, status=str(response.status))
+                    raise RuntimeError(f"code {response.status}")
+                servers = await response.json(content_type=None)
+        except asyncio.TimeoutError:
+            metrics.inc("pterobot_api_errors_total", endpoint=endpoint, status="timeout")
+            raise
+        except aiohttp.ClientError:
+            metrics.inc("pterobot_api_errors_total", endpoint=endpoint, status="connection")
+            raise
+        metrics.observe("pterobot_api_request_duration_seconds", time.monotonic() - started, endpoint=endpoint)
+        return {
+            server.get("configuration", {}).get("uuid"): self.to_resources(server)
+            for server in servers or []
+        }
+
+    # Ressources des serveurs donnés dont le nœud est configuré (server_id -> ressources)
+    async def collect(self, servers, deadline=None):
+        by_node = {}
+        for server_id, server_info in servers:
+            # Nœud injoignable (disjoncteur ouvert): ses serveurs sont marqués injoignables par le poller
+            if server_info.get("node") in self.nodes and server_info.get("uuid") and get_node_breaker(server_info["node"]).ready():
+                by_node.setdefault(server_info["node"], []).append((server_id, server_info["uuid"]))
+        if not by_node:
+            return {}
+        
+        started = time.perf_counter()
+        names = list(by_node)
+        snapshots = await asyncio.gather(*[self.fetch_node(name, deadline) for name in names], return_exceptions=True)
+        perf.record("wings_collect", time.perf_counter() - started)
+        
+        collected = {}
+        for name, snapshot in zip(names, snapshots):
+            if isinstance(snapshot, BaseException):
+                log_event(
+                    logging.WARNING, "wings.error",
+                    f"Erreur lors de la récupération des serveurs du nœud {name}: {str(snapshot) or type(snapshot).__name__} (repli sur l'API du panel)",
+                    node=name
+                )
+                continue
+            # Les échecs ne comptent pas pour le disjoncteur (le panel peut encore joindre le nœud)
+            get_node_breaker(name).record_success()
+            for server_id, uuid in by_node[name]:
+                if uuid in snapshot:
+                    collected[server_id] = snapshot[uuid]
+        return collected
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+# Collecteur partagé (inactif si WINGS_NODES est vide)
+wings = WingsCollector(parse_wings_nodes(WINGS_NODES))
+
+# Bot qui ferme la session HTTP partagée à l'arrêt
+class PteroBot(commands.Bot):
+    async def close(self):
+        await console_streams.stop_all()
+        await outbox.stop()
+        await state_store.close()
+        await stop_metrics_server()
+        await wings.close()
+        await api.close()
+        await super().close()
+
+# Création du bot
+bot = PteroBot(command_prefix='!', intents=intents)
+bot.remove_command('help')  # Supprimer la commande d'aide par défaut
+
 # Fonction pour vérifier si un utilisateur est dans la whitelist
 def is_whitelisted(ctx):
     return ctx.author.id in WHITELIST
 
 # Fonction d'envoi sécurisé de messages
-async def safe_send(ctx, content=None, embed=None):
+async def safe_send(ctx, content=None, embed=None, file=None):
     try:
-        return await ctx.send(content=content, embed=embed)
+        return await ctx.send(content=content, embed=embed, file=file)
     except discord.Forbidden:
-        print(f"Erreur de permission: Impossible d'envoyer un message dans le canal {ctx.channel.id}")
+        log_event(logging.WARNING, "discord.forbidden", f"Erreur de permission: Impossible d'envoyer un message dans le canal {ctx.channel.id}", channel=ctx.channel.id)
         try:
             await ctx.author.send(
                 f"Je n'ai pas la permission d'envoyer des messages dans le canal {ctx.channel.name}. "
                 f"Veuillez vérifier mes permissions ou contactez un administrateur."
             )
         except:
-            print(f"Impossible d'envoyer un message privé à {ctx.author.id}")
+            log_event(logging.WARNING, "discord.dm_failed", f"Impossible d'envoyer un message privé à {ctx.author.id}", user=ctx.author.id)
     except Exception as e:
-        print(f"Erreur lors de l'envoi d'un message: {str(e)}")
+        log_event(logging.ERROR, "discord.send_failed", f"Erreur lors de l'envoi d'un message: {str(e)}")
 
 # Fonction pour obtenir un emoji selon le statut du serveur
 def get_status_emoji(status):
@@ -189,6 +1464,8 @@ def get_status_emoji(status):
         return "🟡"
     elif status == "stopping":
         return "🟠"
+    elif status == "unknown":
+        return "⚪"
     else:
         return "🔴"
 
@@ -204,81 +1481,252 @@ def format_size(bytes_size):
         gb_size = mb_size / 1024
         return f"{gb_size:.2f} GB"
 
+# Champs d'inventaire d'un serveur (le reste du cache est de l'état d'exécution)
+INVENTORY_FIELDS = (
+    "name", "node", "uuid", "description", "allocations", "limits",
+    "is_owner", "egg", "docker_image"
+)
+
+# Fonction pour extraire les informations d'inventaire d'un serveur de l'API
+def parse_server_attributes(attributes):
+    # Extraire les allocations
+    allocations = []
+    allocs_data = attributes.get("relationships", {}).get("allocations", {}).get("data", [])
+    for alloc in allocs_data:
+        alloc_attr = alloc.get("attributes", {})
+        allocations.append({
+            "ip": alloc_attr.get("ip", ""),
+            "alias": alloc_attr.get("ip_alias", ""),
+            "port": alloc_attr.get("port", 0),
+            "is_default": alloc_attr.get("is_default", False)
+        })
+    
+    # Egg Pterodactyl (sert à déterminer le profil de jeu)
+    egg_attr = attributes.get("relationships", {}).get("egg", {}).get("attributes", {})
+    
+    return {
+        "name": attributes.get("name", "Serveur sans nom"),
+        "node": attributes.get("node", "Nœud inconnu"),
+        "uuid": attributes.get("uuid", ""),
+        "description": attributes.get("description", ""),
+        "allocations": allocations,
+        "limits": attributes.get("limits", {}),
+        "is_owner": attributes.get("server_owner", False),
+        "egg": {"uuid": egg_attr.get("uuid", ""), "name": egg_attr.get("name", "")},
+        "docker_image": attributes.get("docker_image", "")
+    }
+
+# Fonction pour journaliser le détail d'une réponse d'erreur de l'API
+def log_api_error(response):
+    if response.status_code == 401:
+        log_event(logging.WARNING, "api.auth_failed", "⚠️ Erreur d'authentification. Vérifiez votre clé API.")
+    elif response.status_code == 404:
+        log_event(logging.WARNING, "api.not_found", "⚠️ URL de l'API introuvable. Vérifiez l'URL du panel.")
+    
+    # Détail complet de la réponse uniquement en DEBUG
+    log_event(logging.DEBUG, "api.error_details", "Détails de l'erreur", status=response.status_code, body=response.text[:2000])
+
+# Fonction pour récupérer une page de l'inventaire des serveurs
+async def fetch_inventory_page(page, deadline):
+    response = await api.get(
+        "/api/client",
+        params={"include": "egg", "page": page, "per_page": INVENTORY_PAGE_SIZE},
+        deadline=deadline
+    )
+    if response.status_code != 200:
+        log_event(
+            logging.ERROR, "inventory.page_failed",
+            f"❌ Erreur lors de la récupération des serveurs (page {page}): {response.status_code}",
+            page=page, status=response.status_code
+        )
+        log_api_error(response)
+        return None
+    return response.json()
+
 # Fonction pour récupérer tous les serveurs disponibles
+# L'inventaire est paginé par Pterodactyl: la première page donne le nombre total de pages,
+# les suivantes sont récupérées en parallèle. Le résultat est comparé à l'instantané actuel
+# pour conserver l'état d'exécution (statut, ressources, joueurs) des serveurs inchangés,
+# puis la nouvelle table remplace l'instantané d'un seul coup.
 async def fetch_servers():
-    global servers_cache
     try:
-        print(f"Récupération des serveurs depuis {PTERODACTYL_API_URL}/api/client...")
-        response = requests.get(
-            f"{PTERODACTYL_API_URL}/api/client",
-            headers=headers,
-            timeout=10
-        )
+        log_event(logging.DEBUG, "inventory.fetch", f"Récupération des serveurs depuis {PTERODACTYL_API_URL}/api/client...")
+        deadline = api.batch_deadline()
+        
+        first_page = await fetch_inventory_page(1, deadline)
+        if first_page is None:
+            return {}
         
-        if response.status_code == 200:
-            data = response.json()
-            servers = data.get("data", [])
+        pages = [first_page]
+        total_pages = first_page.get("meta", {}).get("pagination", {}).get("total_pages", 1)
+        if total_pages > 1:
+            semaphore = asyncio.Semaphore(POLL_CONCURRENCY)
+            
+            async def fetch_page(page):
+                async with semaphore:
+                    return await fetch_inventory_page(page, deadline)
             
-            # Mettre à jour le cache des serveurs
-            temp_cache = {}
-            for server in servers:
+            pages += await asyncio.gather(*[fetch_page(page) for page in range(2, total_pages + 1)])
+            if any(page is None for page in pages):
+                # Inventaire incomplet: ne pas considérer les serveurs manquants comme supprimés
+                log_event(logging.WARNING, "inventory.incomplete", "⚠️ Inventaire incomplet, le cache des serveurs n'a pas été modifié")
+                return {}
+        
+        # Comparer avec l'instantané actuel (sans `await` jusqu'au remplacement)
+        current = fleet.publish().servers
+        new_records = {}
+        added, changed = [], []
+        for page in pages:
+            for server in page.get("data", []):
                 attributes = server.get("attributes", {})
                 server_id = attributes.get("identifier", "")
+                if not server_id:
+                    continue
                 
-                if server_id:
-                    # Extraire les allocations
-                    allocations = []
-                    allocs_data = attributes.get("relationships", {}).get("allocations", {}).get("data", [])
-                    for alloc in allocs_data:
-                        alloc_attr = alloc.get("attributes", {})
-                        allocations.append({
-                            "ip": alloc_attr.get("ip", ""),
-                            "alias": alloc_attr.get("ip_alias", ""),
-                            "port": alloc_attr.get("port", 0),
-                            "is_default": alloc_attr.get("is_default", False)
-                        })
-                    
-                    # Stocker les informations du serveur
-                    temp_cache[server_id] = {
-                        "name": attributes.get("name", "Serveur sans nom"),
-                        "node": attributes.get("node", "Nœud inconnu"),
-                        "uuid": attributes.get("uuid", ""),
-                        "description": attributes.get("description", ""),
-                        "allocations": allocations,
-                        "limits": attributes.get("limits", {}),
-                        "is_owner": attributes.get("server_owner", False),
-                        "status": None,  # Sera mis à jour par check_server_status
-                        "resources": {}  # Sera mis à jour par check_server_status
-                    }
-            
-            # Mettre à jour la cache
-            servers_cache = temp_cache
-            print(f"✅ {len(servers_cache)} serveurs récupérés avec succès")
-            return servers_cache
-        else:
-            print(f"❌ Erreur lors de la récupération des serveurs: {response.status_code}")
-            if response.status_code == 401:
-                print("⚠️ Erreur d'authentification. Vérifiez votre clé API.")
-            elif response.status_code == 404:
-                print("⚠️ URL de l'API introuvable. Vérifiez l'URL du panel.")
-            
-            try:
-                error_details = response.json()
-                print(f"Détails de l'erreur: {json.dumps(error_details, indent=2)}")
-            except:
-                print(f"Réponse: {response.text[:200]}")
+                inventory = parse_server_attributes(attributes)
+                previous = current.get(server_id)
                 
-            return {}
+                if previous is None:
+                    # Nouveau serveur
+                    record = dict(inventory)
+                    record["status"] = None  # Sera mis à jour par check_server_status
+                    record["resources"] = {}  # Sera mis à jour par check_server_status
+                    added.append(server_id)
+                else:
+                    record = dict(previous)
+                    if any(previous.get(field) != inventory[field] for field in INVENTORY_FIELDS):
+                        # Serveur modifié: mettre à jour l'inventaire en gardant l'état d'exécution
+                        record.update(inventory)
+                        changed.append(server_id)
+                
+                new_records[server_id] = record
+        
+        removed = [server_id for server_id in current if server_id not in new_records]
+        initial_sync = not current
+        
+        # Publier le nouvel inventaire
+        servers = fleet.replace(new_records).servers
+        log_event(
+            logging.INFO if added or removed or changed else logging.DEBUG, "inventory.synced",
+            f"✅ {len(servers)} serveurs récupérés avec succès "
+            f"({len(added)} ajouté(s), {len(removed)} retiré(s), {len(changed)} modifié(s))",
+            servers=len(servers), added=len(added), removed=len(removed), changed=len(changed)
+        )
+        
+        # Signaler les changements d'inventaire (événement discord.py `on_inventory_change`)
+        if not initial_sync and (added or removed or changed):
+            bot.dispatch("inventory_change", added, removed, changed)
+        
+        return servers
     except Exception as e:
-        print(f"❌ Exception lors de la récupération des serveurs: {str(e)}")
+        log_event(logging.ERROR, "inventory.failed", f"❌ Exception lors de la récupération des serveurs: {str(e)}", exc_info=True)
         return {}
 
+# Fonction pour actualiser l'inventaire (une seule récupération à la fois)
+# Les appels simultanés partagent la même requête en cours.
+async def refresh_inventory():
+    global inventory_task
+    if inventory_task is None or inventory_task.done():
+        inventory_task = asyncio.create_task(fetch_inventory_and_stamp())
+    return await asyncio.shield(inventory_task)
+
+async def fetch_inventory_and_stamp():
+    global inventory_fetched_at
+    servers = await fetch_servers()
+    if servers:
+        inventory_fetched_at = time.monotonic()
+    return servers
+
+# Fonction pour savoir si l'inventaire en cache est plus vieux que `max_age` secondes
+def inventory_is_stale(max_age=INVENTORY_TTL):
+    return inventory_fetched_at is None or time.monotonic() - inventory_fetched_at >= max_age
+
+# Fonction pour obtenir l'inventaire, depuis le cache s'il a moins de `max_age` secondes
+async def get_servers(max_age=INVENTORY_TTL):
+    if fleet.servers and not inventory_is_stale(max_age):
+        return fleet.servers
+    return await refresh_inventory()
+
+# Actualisations de l'inventaire lancées en arrière-plan (référence gardée jusqu'à leur fin)
+inventory_background_tasks = set()
+
+# Fonction pour actualiser l'inventaire en arrière-plan s'il est périmé
+def revalidate_inventory_in_background(max_age=INVENTORY_TTL):
+    if inventory_is_stale(max_age) and (inventory_task is None or inventory_task.done()):
+        task = asyncio.create_task(refresh_inventory())
+        inventory_background_tasks.add(task)
+        task.add_done_callback(finish_inventory_revalidation)
+
+# Callback: fin d'une actualisation en arrière-plan (l'erreur éventuelle est journalisée)
+def finish_inventory_revalidation(task):
+    inventory_background_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        error = task.exception()
+        log_event(
+            logging.WARNING, "inventory.revalidate_failed",
+            f"⚠️ Échec de l'actualisation de l'inventaire en arrière-plan: {str(error) or type(error).__name__}"
+        )
+
+# Fonction pour vérifier l'état des serveurs (les appels simultanés partagent le même passage)
+async def run_status_check():
+    global status_check_task
+    if status_check_task is None or status_check_task.done():
+        status_check_task = asyncio.create_task(check_server_status(full=True))
+    await asyncio.shield(status_check_task)
+
 # Fonction pour générer une barre de progression
 def progress_bar(percent):
     filled = "█" * int(percent / 10)
     empty = "░" * (10 - int(percent / 10))
     return f"{filled}{empty} {percent}%"
 
+# Fonction pour obtenir l'adresse (allocation par défaut) d'un serveur
+def get_server_address(server_info):
+    for alloc in server_info.get("allocations", []):
+        if alloc.get("is_default", False):
+            ip = alloc.get("alias") or alloc.get("ip", "")
+            port = alloc.get("port", "")
+            if ip and port:
+                return f"{ip}:{port}"
+    return "Non disponible"
+
+# Fonction pour créer un embed compact de statut (tableau de bord, plusieurs serveurs par message)
+def create_server_compact_embed(server_id, server_info):
+    resources = server_info.get("resources", {})
+    status = resources.get("current_state", "offline")
+    status_text = {
+        "running": "En ligne",
+        "starting": "En démarrage",
+        "stopping": "En arrêt",
+        "offline": "Hors ligne",
+        "unknown": "Injoignable"
+    }.get(status, status)
+    
+    lines = [f"**État**: {status_text} · `{get_server_address(server_info)}` · ID `{server_id}`"]
+    
+    if status == "running" and resources.get("resources"):
+        res = resources["resources"]
+        limits = server_info.get("limits", {})
+        memory_max = f" / {limits['memory']} MB" if limits.get("memory") else ""
+        disk_max = f" / {limits['disk']} MB" if limits.get("disk") else ""
+        lines.append(
+            f"🔄 {res.get('cpu_absolute', 0):.0f}% · 💾 {format_size(res.get('memory_bytes', 0))}{memory_max}"
+            f" · 💿 {format_size(res.get('disk_bytes', 0))}{disk_max}"
+        )
+        
+        players = list(server_info.get("players", {}))
+        if players:
+            shown = ", ".join(players[:10]) + (f" (+{len(players) - 10})" if len(players) > 10 else "")
+            lines.append(f"👥 **{len(players)}**: {shown}")
+        else:
+            lines.append("👥 Aucun joueur connecté")
+    
+    return discord.Embed(
+        title=f"{get_status_emoji(status)} {server_info['name']}",
+        description="\n".join(lines),
+        color=COLORS[status if status in COLORS else "info"]
+    )
+
 # Fonction pour créer un embed de statut du serveur
 def create_server_status_embed(server_id, server_info, resources):
     status = resources.get("current_state", "offline")
@@ -287,18 +1735,12 @@ def create_server_status_embed(server_id, server_info, resources):
         "running": "En ligne",
         "starting": "En démarrage",
         "stopping": "En arrêt",
-        "offline": "Hors ligne"
+        "offline": "Hors ligne",
+        "unknown": "Injoignable"
     }.get(status, status)
     
     # Adresse du serveur
-    server_address = "Non disponible"
-    for alloc in server_info.get("allocations", []):
-        if alloc.get("is_default", False):
-            ip = alloc.get("alias") or alloc.get("ip", "")
-            port = alloc.get("port", "")
-            if ip and port:
-                server_address = f"{ip}:{port}"
-                break
+    server_address = get_server_address(server_info)
     
     # Création de l'embed
     embed = discord.Embed(
@@ -356,21 +1798,23 @@ def create_server_status_embed(server_id, server_info, resources):
         # Joueurs connectés
         players = server_info.get("players", {})
         player_count = len(players)
+        query = server_info.get("query")
         if player_count > 0:
             player_list = []
-            for player_name, player_data in players.items():
-                connect_time = player_data.get("connect_time", datetime.datetime.now())
-                duration = datetime.datetime.now() - connect_time
-                hours, remainder = divmod(duration.seconds, 3600)
+            for player_name, session in players.items():
+                hours, remainder = divmod(int(session.duration()), 3600)
                 minutes, seconds = divmod(remainder, 60)
                 
                 player_list.append(f"• **{player_name}** - Connecté depuis {hours:02}:{minutes:02}:{seconds:02}")
             
             embed.add_field(
-                name=f"👥 Joueurs ({player_count})",
+                name=f"👥 Joueurs ({player_count}{'/' + str(query['max']) if query and query['max'] else ''})",
                 value="\n".join(player_list) if player_list else "Aucun joueur connecté",
                 inline=False
             )
+        elif query and query["online"]:
+            # Joueurs annoncés par la sonde du jeu mais absents de la console (noms inconnus)
+            embed.add_field(name="👥 Joueurs", value=f"{query['online']}/{query['max'] or '?'} joueur(s) en ligne", inline=False)
         else:
             embed.add_field(name="👥 Joueurs", value="Aucun joueur connecté", inline=False)
     
@@ -382,134 +1826,137 @@ def create_server_status_embed(server_id, server_info, resources):
 # Event: Bot prêt
 @bot.event
 async def on_ready():
-    print(f'🚀 {bot.user.name} est connecté à Discord!')
-    print(f'👥 Whitelist: {WHITELIST}')
+    log_event(logging.INFO, "bot.ready", f"🚀 {bot.user.name} est connecté à Discord!", user=str(bot.user))
+    log_event(logging.INFO, "bot.whitelist", f"👥 Whitelist: {WHITELIST}", users=len(WHITELIST))
+    
+    # Charger les profils de jeux
+    game_profiles.load()
     
     # Récupérer la liste des serveurs
-    await fetch_servers()
+    await refresh_inventory()
+    
+    # Reprendre l'état enregistré avant le redémarrage (sinon au premier inventaire non vide)
+    if not await restore_state_when_ready():
+        log_event(logging.WARNING, "state.restore_deferred", "⚠️ Inventaire vide: restauration de l'état reportée à la prochaine récupération des serveurs")
     
     # Afficher les serveurs disponibles
-    if servers_cache:
-        print(f"Serveurs disponibles:")
-        for server_id, server_info in servers_cache.items():
-            print(f"  • {server_info['name']} (ID: {server_id})")
+    if fleet.servers:
+        log_event(logging.INFO, "bot.servers", f"Serveurs disponibles: {len(fleet.servers)}", servers=len(fleet.servers))
+        for server_id, server_info in fleet.servers.items():
+            log_event(logging.DEBUG, "bot.server", f"  • {server_info['name']} (ID: {server_id})", server=server_id)
     else:
-        print("⚠️ Aucun serveur n'a été détecté. Vérifiez vos identifiants API.")
+        log_event(logging.WARNING, "bot.no_servers", "⚠️ Aucun serveur n'a été détecté. Vérifiez vos identifiants API.")
     
     # Définir un statut personnalisé pour le bot
     await bot.change_presence(
         activity=discord.Activity(
             type=discord.ActivityType.watching, 
-            name=f"{len(servers_cache)} serveur(s)"
+            name=f"{len(fleet.servers)} serveur(s)"
         )
     )
     
     # Démarrer les tâches
+    await start_metrics_server()
+    outbox.start()
     check_server_status.start()
     if AUTO_POST_STATS:
         post_server_status.start()
     refresh_servers_list.start()
+    if GAME_QUERY_INTERVAL > 0:
+        query_game_servers.start()
+    if GAME_QUERY_INTERVAL > 0 and PLAYER_SESSION_TTL > 0:
+        expire_player_sessions.start()
 
-# Commande: Démarrer le serveur
-@bot.command(name="start", help="Démarre le serveur de jeu")
-async def start_server(ctx, server_id=None):
-    if not is_whitelisted(ctx):
-        embed = discord.Embed(
-            title="⛔ Accès refusé",
-            description="Vous n'êtes pas autorisé à utiliser cette commande.",
-            color=COLORS["error"]
-        )
-        await safe_send(ctx, embed=embed)
-        return
+# Event: Changement de l'inventaire des serveurs (émis par fetch_servers)
+@bot.event
+async def on_inventory_change(added, removed, changed):
+    # Oublier l'état d'exécution des serveurs retirés
+    stale_messages = []
+    for server_id in removed:
+        entry = status_messages.pop(server_id, None)
+        if entry is not None:
+            stale_messages.append(entry.message)
+        connected_players.pop(server_id, None)
+        previous_server_states.pop(server_id, None)
+        log_cursors.pop(server_id, None)
+        resource_history.forget(server_id)
+        perf.forget(server_id)
+        state_store.forget_server(server_id)
+        poll_scheduler.forget(server_id)
+        game_queries.forget(server_id)
     
-    # Vérifier si un ID a été spécifié ou s'il y a un seul serveur
-    if server_id is None:
-        if len(servers_cache) == 1:
-            server_id = next(iter(servers_cache.keys()))
-        else:
-            servers_list = "\n".join([f"• **{info['name']}** - `!start {id}`" for id, info in servers_cache.items()])
-            embed = discord.Embed(
-                title="❓ Serveur non spécifié",
-                description="Veuillez préciser l'ID du serveur à démarrer:",
-                color=COLORS["warning"]
-            )
-            embed.add_field(name="Serveurs disponibles", value=servers_list, inline=False)
-            await safe_send(ctx, embed=embed)
-            return
+    channel = bot.get_channel(NOTIFICATION_CHANNEL_ID)
+    if not channel or not (added or removed):
+        return
     
-    # Vérifier si le serveur existe
-    if server_id not in servers_cache:
-        await fetch_servers()  # Rafraîchir la liste des serveurs
-        
-        if server_id not in servers_cache:
-            embed = discord.Embed(
-                title="❌ Serveur introuvable",
-                description=f"Le serveur avec l'ID `{server_id}` n'a pas été trouvé.",
-                color=COLORS["error"]
-            )
-            await safe_send(ctx, embed=embed)
-            return
+    # Supprimer les messages de statut des serveurs retirés
+    await bulk_delete_messages(channel, stale_messages)
     
-    # Message de chargement
     embed = discord.Embed(
-        title="⏳ Démarrage en cours...",
-        description=f"Tentative de démarrage du serveur {servers_cache[server_id]['name']}",
-        color=COLORS["warning"]
+        title="🗂️ Inventaire des serveurs modifié",
+        color=COLORS["info"],
+        timestamp=datetime.datetime.now()
     )
-    embed.set_thumbnail(url=SERVER_ICON)
-    embed.set_footer(text=f"Demandé par {ctx.author.display_name}", icon_url=ctx.author.display_avatar.url)
-    message = await safe_send(ctx, embed=embed)
-    
-    try:
-        # Animation de chargement
-        for i in range(3):
-            embed.title = f"⏳ Démarrage en cours{'.' * (i + 1)}"
-            await message.edit(embed=embed)
-            await asyncio.sleep(1)
-        
-        response = requests.post(
-            f"{PTERODACTYL_API_URL}/api/client/servers/{server_id}/power",
-            headers=headers,
-            json={"signal": "start"}
+    if added:
+        embed.add_field(
+            name=f"➕ Ajouté(s) ({len(added)})",
+            value="\n".join(f"• **{fleet.servers[server_id]['name']}** (`{server_id}`)" for server_id in added[:20]),
+            inline=False
         )
-        
-        if response.status_code == 204:
-            success_embed = discord.Embed(
-                title="✅ Serveur démarré",
-                description=f"Le serveur **{servers_cache[server_id]['name']}** a été démarré avec succès!",
-                color=COLORS["success"],
-                timestamp=datetime.datetime.now()
-            )
-            success_embed.set_thumbnail(url=SERVER_ICON)
-            success_embed.add_field(name="État", value="🟡 En démarrage", inline=True)
-            success_embed.add_field(name="Temps estimé", value="≈ 30-60 secondes", inline=True)
-            success_embed.set_footer(text=f"Demandé par {ctx.author.display_name}", icon_url=ctx.author.display_avatar.url)
-            await message.edit(embed=success_embed)
-        else:
-            error_embed = discord.Embed(
-                title="❌ Erreur de démarrage",
-                description=f"Erreur lors du démarrage du serveur: Code {response.status_code}",
-                color=COLORS["error"],
-                timestamp=datetime.datetime.now()
-            )
-            error_embed.set_thumbnail(url=SERVER_ICON)
-            error_embed.set_footer(text=f"Demandé par {ctx.author.display_name}", icon_url=ctx.author.display_avatar.url)
-            await message.edit(embed=error_embed)
-    
-    except Exception as e:
-        error_embed = discord.Embed(
-            title="❌ Erreur de démarrage",
-            description=f"Une erreur s'est produite: {str(e)}",
-            color=COLORS["error"],
-            timestamp=datetime.datetime.now()
+    if removed:
+        embed.add_field(
+            name=f"➖ Retiré(s) ({len(removed)})",
+            value="\n".join(f"• `{server_id}`" for server_id in removed[:20]),
+            inline=False
         )
-        error_embed.set_thumbnail(url=SERVER_ICON)
-        error_embed.set_footer(text=f"Demandé par {ctx.author.display_name}", icon_url=ctx.author.display_avatar.url)
-        await message.edit(embed=error_embed)
+    embed.set_thumbnail(url=SERVER_ICON)
+    outbox.enqueue(channel, None, "inventory", embed)
 
-# Commande: Redémarrer le serveur
-@bot.command(name="restart", help="Redémarre le serveur de jeu")
-async def restart_server(ctx, server_id=None):
+# Actions d'alimentation: signal envoyé, état attendu et textes affichés
+POWER_ACTIONS = {
+    "start": {
+        "command": "start",
+        "target": "running",
+        "infinitive": "démarrer",
+        "noun": "démarrage",
+        "done": "✅ Serveur démarré",
+        "already": "Le serveur est déjà en ligne."
+    },
+    "restart": {
+        "command": "restart",
+        "target": "running",
+        "infinitive": "redémarrer",
+        "noun": "redémarrage",
+        "done": "✅ Serveur redémarré",
+        "already": None
+    },
+    "stop": {
+        "command": "stop",
+        "target": "offline",
+        "infinitive": "arrêter",
+        "noun": "arrêt",
+        "done": "✅ Serveur arrêté",
+        "already": "Le serveur est déjà arrêté."
+    }
+}
+
+# Libellés des états Pterodactyl
+STATE_LABELS = {
+    "running": "En ligne",
+    "starting": "En démarrage",
+    "stopping": "En arrêt",
+    "offline": "Hors ligne",
+    "unknown": "Injoignable"
+}
+
+# Files des actions d'alimentation en cours (server_id -> files recevant chaque état observé)
+power_watchers = {}
+
+# Suivis d'actions d'alimentation en cours (références conservées jusqu'à leur fin)
+power_tasks = set()
+
+# Fonction pour vérifier l'accès et déterminer le serveur visé par une action d'alimentation
+async def resolve_power_target(ctx, server_id, action):
     if not is_whitelisted(ctx):
         embed = discord.Embed(
             title="⛔ Accès refusé",
@@ -517,137 +1964,257 @@ async def restart_server(ctx, server_id=None):
             color=COLORS["error"]
         )
         await safe_send(ctx, embed=embed)
-        return
+        return None
     
     # Vérifier si un ID a été spécifié ou s'il y a un seul serveur
     if server_id is None:
-        if len(servers_cache) == 1:
-            server_id = next(iter(servers_cache.keys()))
-        else:
-            servers_list = "\n".join([f"• **{info['name']}** - `!restart {id}`" for id, info in servers_cache.items()])
-            embed = discord.Embed(
-                title="❓ Serveur non spécifié",
-                description="Veuillez préciser l'ID du serveur à redémarrer:",
-                color=COLORS["warning"]
-            )
-            embed.add_field(name="Serveurs disponibles", value=servers_list, inline=False)
-            await safe_send(ctx, embed=embed)
-            return
+        if len(fleet.servers) == 1:
+            return next(iter(fleet.servers.keys()))
+        servers_list = "\n".join([f"• **{info['name']}** - `!{action['command']} {id}`" for id, info in fleet.servers.items()])
+        embed = discord.Embed(
+            title="❓ Serveur non spécifié",
+            description=f"Veuillez préciser l'ID du serveur à {action['infinitive']}:",
+            color=COLORS["warning"]
+        )
+        embed.add_field(name="Serveurs disponibles", value=servers_list[:1024] or "Aucun", inline=False)
+        await safe_send(ctx, embed=embed)
+        return None
     
     # Vérifier si le serveur existe
-    if server_id not in servers_cache:
-        await fetch_servers()  # Rafraîchir la liste des serveurs
+    if server_id not in fleet.servers:
+        await get_servers()  # Rafraîchir la liste des serveurs (si le cache est périmé)
         
-        if server_id not in servers_cache:
+        if server_id not in fleet.servers:
             embed = discord.Embed(
                 title="❌ Serveur introuvable",
                 description=f"Le serveur avec l'ID `{server_id}` n'a pas été trouvé.",
                 color=COLORS["error"]
             )
             await safe_send(ctx, embed=embed)
-            return
+            return None
     
-    # Message de chargement
-    embed = discord.Embed(
-        title="⏳ Redémarrage en cours...",
-        description=f"Tentative de redémarrage du serveur {servers_cache[server_id]['name']}",
-        color=COLORS["warning"]
-    )
+    return server_id
+
+# Fonction pour construire l'embed de suivi d'une action d'alimentation
+def create_power_embed(ctx, title, description, color, states=None, started=None):
+    embed = discord.Embed(title=title, description=description, color=color, timestamp=datetime.datetime.now())
     embed.set_thumbnail(url=SERVER_ICON)
+    if states:
+        embed.add_field(
+            name="États",
+            value=" → ".join(f"{get_status_emoji(state)} {STATE_LABELS.get(state, state)}" for state in states),
+            inline=False
+        )
+    if started is not None:
+        embed.add_field(name="Durée", value=f"{time.monotonic() - started:.0f} s", inline=True)
     embed.set_footer(text=f"Demandé par {ctx.author.display_name}", icon_url=ctx.author.display_avatar.url)
-    message = await safe_send(ctx, embed=embed)
+    return embed
+
+# Fonction pour envoyer un signal d'alimentation puis suivre le serveur en arrière-plan
+async def run_power_action(ctx, server_id, signal, message=None):
+    action = POWER_ACTIONS[signal]
+    server_info = fleet.get(server_id)
+    initial_state = server_info.get("status")
+    
+    embed = create_power_embed(
+        ctx,
+        f"⏳ {action['noun'].capitalize()} demandé",
+        f"Envoi du signal `{signal}` au serveur **{server_info['name']}**...",
+        COLORS["warning"]
+    )
+    if message is None:
+        message = await safe_send(ctx, embed=embed)
+        if message is None:
+            return
+    else:
+        await message.edit(embed=embed)
+    
+    # État pas encore connu (premier passage, serveur injoignable): le relever avant l'envoi
+    if initial_state in (None, "unknown"):
+        initial_state = await poll_power_state(server_id) or initial_state
     
+    # S'abonner aux changements d'état avant l'envoi pour ne manquer aucune transition
+    watcher = asyncio.Queue()
+    power_watchers.setdefault(server_id, []).append(watcher)
     try:
-        # Animation de chargement
-        for i in range(3):
-            embed.title = f"⏳ Redémarrage en cours{'.' * (i + 1)}"
-            await message.edit(embed=embed)
-            await asyncio.sleep(1)
-        
-        response = requests.post(
-            f"{PTERODACTYL_API_URL}/api/client/servers/{server_id}/power",
-            headers=headers,
-            json={"signal": "restart"}
+        response = await api.post(
+            f"/api/client/servers/{server_id}/power",
+            json_data={"signal": signal},
+            priority=PRIORITY_USER
         )
-        
-        if response.status_code == 204:
-            success_embed = discord.Embed(
-                title="✅ Serveur redémarré",
-                description=f"Le serveur **{servers_cache[server_id]['name']}** a été redémarré avec succès!",
-                color=COLORS["success"],
-                timestamp=datetime.datetime.now()
-            )
-            success_embed.set_thumbnail(url=SERVER_ICON)
-            success_embed.add_field(name="État", value="🟡 En redémarrage", inline=True)
-            success_embed.add_field(name="Temps estimé", value="≈ 30-60 secondes", inline=True)
-            success_embed.set_footer(text=f"Demandé par {ctx.author.display_name}", icon_url=ctx.author.display_avatar.url)
-            await message.edit(embed=success_embed)
-        else:
-            error_embed = discord.Embed(
-                title="❌ Erreur de redémarrage",
-                description=f"Erreur lors du redémarrage du serveur: Code {response.status_code}",
-                color=COLORS["error"],
-                timestamp=datetime.datetime.now()
-            )
-            error_embed.set_thumbnail(url=SERVER_ICON)
-            error_embed.set_footer(text=f"Demandé par {ctx.author.display_name}", icon_url=ctx.author.display_avatar.url)
-            await message.edit(embed=error_embed)
+    except Exception as e:
+        remove_power_watcher(server_id, watcher)
+        await message.edit(embed=create_power_embed(
+            ctx, f"❌ Erreur de {action['noun']}", f"Une erreur s'est produite: {str(e)}", COLORS["error"]
+        ))
+        return
+    
+    if response.status_code != 204:
+        remove_power_watcher(server_id, watcher)
+        await message.edit(embed=create_power_embed(
+            ctx,
+            f"❌ Erreur de {action['noun']}",
+            f"Erreur lors du {action['noun']} du serveur: Code {response.status_code}",
+            COLORS["error"]
+        ))
+        return
+    
+    task = asyncio.create_task(track_power_action(ctx, message, server_id, action, initial_state, watcher))
+    power_tasks.add(task)
+    task.add_done_callback(power_tasks.discard)
+
+# Fonction pour désabonner une action d'alimentation (et oublier le serveur s'il n'en a plus)
+def remove_power_watcher(server_id, watcher):
+    watchers = power_watchers.get(server_id, [])
+    if watcher in watchers:
+        watchers.remove(watcher)
+    if not watchers:
+        power_watchers.pop(server_id, None)
+
+# Fonction pour suivre les transitions d'état après un signal d'alimentation
+# Les états arrivent du websocket de console ou de la vérification périodique; sans flux
+# en direct, le serveur est interrogé toutes les POWER_POLL_INTERVAL secondes.
+# Le message n'est modifié qu'à chaque changement d'état réel.
+async def track_power_action(ctx, message, server_id, action, initial_state, watcher):
+    server_info = fleet.get(server_id, {"name": server_id})
+    started = time.monotonic()
+    deadline = started + POWER_ACTION_TIMEOUT
+    states = [initial_state] if initial_state else []
+    # État initial inconnu: ne conclure qu'après une transition observée (ou une remise à zéro de la durée de fonctionnement)
+    initial_known = initial_state not in (None, "unknown")
+    left_initial = action["already"] is not None and initial_known and initial_state != action["target"]
+    first_poll = True
     
+    try:
+        while time.monotonic() < deadline:
+            try:
+                state = await asyncio.wait_for(watcher.get(), timeout=min(POWER_POLL_INTERVAL, deadline - time.monotonic()))
+            except asyncio.TimeoutError:
+                if not console_streams.is_live(server_id):
+                    await poll_power_state(server_id)
+                server_info = fleet.get(server_id, server_info)
+                # Redémarrage plus rapide que l'intervalle de relevé: la durée de fonctionnement a été remise à zéro
+                uptime = server_info.get("resources", {}).get("resources", {}).get("uptime")
+                restarted = (
+                    action["target"] == "running" and server_info.get("status") == "running"
+                    and uptime is not None and uptime / 1000 < time.monotonic() - started
+                )
+                # Aucune transition depuis le signal et déjà dans l'état visé
+                if (
+                    first_poll and action["already"] and not restarted
+                    and (initial_state == action["target"] or not initial_known)
+                    and server_info.get("status") == action["target"]
+                ):
+                    await message.edit(embed=create_power_embed(
+                        ctx, action["done"], action["already"], COLORS["info"], states, started
+                    ))
+                    return
+                first_poll = False
+                if restarted:
+                    left_initial = True
+                    state = "running"
+                else:
+                    continue
+            
+            if not state:
+                continue
+            if states and states[-1] == state and not (state == action["target"] and left_initial):
+                continue
+            if not states or states[-1] != state:
+                states.append(state)
+            if state != action["target"]:
+                left_initial = True
+            
+            # Arrivé à l'état visé après être passé par un autre état
+            if state == action["target"] and left_initial:
+                await message.edit(embed=create_power_embed(
+                    ctx,
+                    action["done"],
+                    f"Le serveur **{server_info['name']}** est maintenant **{STATE_LABELS.get(state, state).lower()}**.",
+                    COLORS["success"],
+                    states,
+                    started
+                ))
+                return
+            
+            # Démarrage interrompu: le serveur est retombé hors ligne
+            if action["target"] == "running" and state == "offline" and "starting" in states:
+                await message.edit(embed=create_power_embed(
+                    ctx,
+                    f"❌ Échec du {action['noun']}",
+                    f"Le serveur **{server_info['name']}** s'est arrêté pendant le démarrage.",
+                    COLORS["error"],
+                    states,
+                    started
+                ))
+                return
+            
+            await message.edit(embed=create_power_embed(
+                ctx,
+                f"{get_status_emoji(state)} {action['noun'].capitalize()} en cours",
+                f"Le serveur **{server_info['name']}** est **{STATE_LABELS.get(state, state).lower()}**.",
+                COLORS["warning"],
+                states,
+                started
+            ))
+        
+        await message.edit(embed=create_power_embed(
+            ctx,
+            "⏱️ Délai dépassé",
+            f"Le serveur **{server_info['name']}** n'a pas atteint l'état **{STATE_LABELS[action['target']].lower()}** "
+            f"après {POWER_ACTION_TIMEOUT} secondes.",
+            COLORS["warning"],
+            states,
+            started
+        ))
+    except discord.HTTPException as e:
+        log_event(logging.WARNING, "power.message_failed", f"Impossible de modifier le suivi de {server_id}: {str(e)}", server=server_id)
+    finally:
+        remove_power_watcher(server_id, watcher)
+
+# Fonction pour relever l'état d'un serveur pendant une action d'alimentation (retourne l'état relevé, None en cas d'échec)
+async def poll_power_state(server_id):
+    try:
+        response = await api.get(f"/api/client/servers/{server_id}/resources", priority=PRIORITY_USER)
     except Exception as e:
-        error_embed = discord.Embed(
-            title="❌ Erreur de redémarrage",
-            description=f"Une erreur s'est produite: {str(e)}",
-            color=COLORS["error"],
-            timestamp=datetime.datetime.now()
-        )
-        error_embed.set_thumbnail(url=SERVER_ICON)
-        error_embed.set_footer(text=f"Demandé par {ctx.author.display_name}", icon_url=ctx.author.display_avatar.url)
-        await message.edit(embed=error_embed)
+        log_event(logging.WARNING, "power.poll_failed", f"Erreur lors du suivi du serveur {server_id}: {str(e) or type(e).__name__}", server=server_id)
+        return None
+    if response.status_code != 200:
+        return None
+    resources = response.json().get("attributes", {})
+    server_info = fleet.get(server_id)
+    channel = bot.get_channel(NOTIFICATION_CHANNEL_ID)
+    if server_info is not None and channel:
+        fleet.update(server_id, resources=resources)
+        await update_server_status(channel, server_id, fleet.get(server_id), resources.get("current_state"))
+        fleet.publish()
+    return resources.get("current_state")
+
+# Commande: Démarrer le serveur
+@bot.command(name="start", help="Démarre le serveur de jeu")
+async def start_server(ctx, server_id=None):
+    server_id = await resolve_power_target(ctx, server_id, POWER_ACTIONS["start"])
+    if server_id is not None:
+        await run_power_action(ctx, server_id, "start")
+
+# Commande: Redémarrer le serveur
+@bot.command(name="restart", help="Redémarre le serveur de jeu")
+async def restart_server(ctx, server_id=None):
+    server_id = await resolve_power_target(ctx, server_id, POWER_ACTIONS["restart"])
+    if server_id is not None:
+        await run_power_action(ctx, server_id, "restart")
 
 # Commande: Éteindre le serveur
 @bot.command(name="stop", help="Éteint le serveur de jeu")
 async def stop_server(ctx, server_id=None):
-    if not is_whitelisted(ctx):
-        embed = discord.Embed(
-            title="⛔ Accès refusé",
-            description="Vous n'êtes pas autorisé à utiliser cette commande.",
-            color=COLORS["error"]
-        )
-        await safe_send(ctx, embed=embed)
-        return
-    
-    # Vérifier si un ID a été spécifié ou s'il y a un seul serveur
+    server_id = await resolve_power_target(ctx, server_id, POWER_ACTIONS["stop"])
     if server_id is None:
-        if len(servers_cache) == 1:
-            server_id = next(iter(servers_cache.keys()))
-        else:
-            servers_list = "\n".join([f"• **{info['name']}** - `!stop {id}`" for id, info in servers_cache.items()])
-            embed = discord.Embed(
-                title="❓ Serveur non spécifié",
-                description="Veuillez préciser l'ID du serveur à arrêter:",
-                color=COLORS["warning"]
-            )
-            embed.add_field(name="Serveurs disponibles", value=servers_list, inline=False)
-            await safe_send(ctx, embed=embed)
-            return
-    
-    # Vérifier si le serveur existe
-    if server_id not in servers_cache:
-        await fetch_servers()  # Rafraîchir la liste des serveurs
-        
-        if server_id not in servers_cache:
-            embed = discord.Embed(
-                title="❌ Serveur introuvable",
-                description=f"Le serveur avec l'ID `{server_id}` n'a pas été trouvé.",
-                color=COLORS["error"]
-            )
-            await safe_send(ctx, embed=embed)
-            return
+        return
     
     # Message de confirmation
     confirm_embed = discord.Embed(
         title="⚠️ Confirmation d'arrêt",
-        description=f"Êtes-vous sûr de vouloir arrêter le serveur **{servers_cache[server_id]['name']}**?\nCela déconnectera tous les joueurs actuellement en ligne.",
+        description=f"Êtes-vous sûr de vouloir arrêter le serveur **{fleet.servers[server_id]['name']}**?\nCela déconnectera tous les joueurs actuellement en ligne.",
         color=COLORS["warning"]
     )
     confirm_embed.set_thumbnail(url=SERVER_ICON)
@@ -663,62 +2230,6 @@ async def stop_server(ctx, server_id=None):
     
     try:
         reaction, user = await bot.wait_for("reaction_add", timeout=30.0, check=check)
-        
-        if str(reaction.emoji) == "❌":
-            cancel_embed = discord.Embed(
-                title="🛑 Arrêt annulé",
-                description="L'arrêt du serveur a été annulé.",
-                color=COLORS["info"]
-            )
-            cancel_embed.set_thumbnail(url=SERVER_ICON)
-            cancel_embed.set_footer(text=f"Demandé par {ctx.author.display_name}", icon_url=ctx.author.display_avatar.url)
-            await confirm_message.edit(embed=cancel_embed)
-            return
-        
-        # Message de chargement
-        loading_embed = discord.Embed(
-            title="⏳ Arrêt en cours...",
-            description=f"Tentative d'arrêt du serveur {servers_cache[server_id]['name']}",
-            color=COLORS["warning"]
-        )
-        loading_embed.set_thumbnail(url=SERVER_ICON)
-        loading_embed.set_footer(text=f"Demandé par {ctx.author.display_name}", icon_url=ctx.author.display_avatar.url)
-        await confirm_message.edit(embed=loading_embed)
-        
-        # Animation de chargement
-        for i in range(3):
-            loading_embed.title = f"⏳ Arrêt en cours{'.' * (i + 1)}"
-            await confirm_message.edit(embed=loading_embed)
-            await asyncio.sleep(1)
-        
-        response = requests.post(
-            f"{PTERODACTYL_API_URL}/api/client/servers/{server_id}/power",
-            headers=headers,
-            json={"signal": "stop"}
-        )
-        
-        if response.status_code == 204:
-            success_embed = discord.Embed(
-                title="✅ Serveur arrêté",
-                description=f"Le serveur **{servers_cache[server_id]['name']}** a été arrêté avec succès!",
-                color=COLORS["success"],
-                timestamp=datetime.datetime.now()
-            )
-            success_embed.set_thumbnail(url=SERVER_ICON)
-            success_embed.add_field(name="État", value="🔴 Hors ligne", inline=True)
-            success_embed.set_footer(text=f"Demandé par {ctx.author.display_name}", icon_url=ctx.author.display_avatar.url)
-            await confirm_message.edit(embed=success_embed)
-        else:
-            error_embed = discord.Embed(
-                title="❌ Erreur d'arrêt",
-                description=f"Erreur lors de l'arrêt du serveur: Code {response.status_code}",
-                color=COLORS["error"],
-                timestamp=datetime.datetime.now()
-            )
-            error_embed.set_thumbnail(url=SERVER_ICON)
-            error_embed.set_footer(text=f"Demandé par {ctx.author.display_name}", icon_url=ctx.author.display_avatar.url)
-            await confirm_message.edit(embed=error_embed)
-    
     except asyncio.TimeoutError:
         timeout_embed = discord.Embed(
             title="⏱️ Délai expiré",
@@ -728,17 +2239,20 @@ async def stop_server(ctx, server_id=None):
         timeout_embed.set_thumbnail(url=SERVER_ICON)
         timeout_embed.set_footer(text=f"Demandé par {ctx.author.display_name}", icon_url=ctx.author.display_avatar.url)
         await confirm_message.edit(embed=timeout_embed)
+        return
     
-    except Exception as e:
-        error_embed = discord.Embed(
-            title="❌ Erreur d'arrêt",
-            description=f"Une erreur s'est produite: {str(e)}",
-            color=COLORS["error"],
-            timestamp=datetime.datetime.now()
+    if str(reaction.emoji) == "❌":
+        cancel_embed = discord.Embed(
+            title="🛑 Arrêt annulé",
+            description="L'arrêt du serveur a été annulé.",
+            color=COLORS["info"]
         )
-        error_embed.set_thumbnail(url=SERVER_ICON)
-        error_embed.set_footer(text=f"Demandé par {ctx.author.display_name}", icon_url=ctx.author.display_avatar.url)
-        await confirm_message.edit(embed=error_embed)
+        cancel_embed.set_thumbnail(url=SERVER_ICON)
+        cancel_embed.set_footer(text=f"Demandé par {ctx.author.display_name}", icon_url=ctx.author.display_avatar.url)
+        await confirm_message.edit(embed=cancel_embed)
+        return
+    
+    await run_power_action(ctx, server_id, "stop", message=confirm_message)
 
 # Commande: Afficher tous les serveurs disponibles
 @bot.command(name="servers", aliases=["serveurs", "list"], help="Liste tous les serveurs disponibles")
@@ -752,18 +2266,23 @@ async def list_servers(ctx):
         await safe_send(ctx, embed=embed)
         return
     
-    # Message de chargement
-    loading_embed = discord.Embed(
-        title="⏳ Récupération des serveurs...",
-        description="Récupération de la liste des serveurs disponibles",
-        color=COLORS["info"]
-    )
-    message = await safe_send(ctx, embed=loading_embed)
-    
-    # Actualiser la liste des serveurs
-    await fetch_servers()
+    if fleet.servers:
+        # Répondre immédiatement depuis le cache et l'actualiser en arrière-plan s'il est périmé
+        message = None
+        revalidate_inventory_in_background()
+    else:
+        # Message de chargement
+        loading_embed = discord.Embed(
+            title="⏳ Récupération des serveurs...",
+            description="Récupération de la liste des serveurs disponibles",
+            color=COLORS["info"]
+        )
+        message = await safe_send(ctx, embed=loading_embed)
+        
+        # Récupérer la liste des serveurs
+        await get_servers()
     
-    if not servers_cache:
+    if not fleet.servers:
         no_servers_embed = discord.Embed(
             title="❌ Aucun serveur trouvé",
             description="Aucun serveur n'a été trouvé. Vérifiez votre clé API et les permissions associées.",
@@ -776,24 +2295,17 @@ async def list_servers(ctx):
     # Créer l'embed avec la liste des serveurs
     servers_embed = discord.Embed(
         title="🖥️ Serveurs disponibles",
-        description=f"**{len(servers_cache)}** serveur(s) trouvé(s)",
+        description=f"**{len(fleet.servers)}** serveur(s) trouvé(s)",
         color=COLORS["info"],
         timestamp=datetime.datetime.now()
     )
     
-    for server_id, server_info in servers_cache.items():
+    for server_id, server_info in fleet.servers.items():
         status = server_info.get("status")
         status_emoji = get_status_emoji(status) if status else "⚪"
         
         # Rechercher l'adresse du serveur
-        address = "Non disponible"
-        for alloc in server_info.get("allocations", []):
-            if alloc.get("is_default", False):
-                ip = alloc.get("alias") or alloc.get("ip", "")
-                port = alloc.get("port", "")
-                if ip and port:
-                    address = f"{ip}:{port}"
-                    break
+        address = get_server_address(server_info)
         
         # Créer la description du serveur
         server_desc = [
@@ -810,7 +2322,10 @@ async def list_servers(ctx):
         )
     
     servers_embed.set_footer(text=f"Demandé par {ctx.author.display_name}", icon_url=ctx.author.display_avatar.url)
-    await message.edit(embed=servers_embed)
+    if message:
+        await message.edit(embed=servers_embed)
+    else:
+        await safe_send(ctx, embed=servers_embed)
 
 # Commande: Afficher l'aide
 @bot.command(name="aide", aliases=["commands", "help"], help="Affiche la liste des commandes disponibles")
@@ -838,7 +2353,9 @@ async def custom_help(ctx):
     info_commands = [
         ("!servers", "Liste tous les serveurs disponibles"),
         ("!refresh", "Force une actualisation des informations des serveurs"),
-        ("!poststats", "Publie l'état actuel de tous les serveurs")
+        ("!poststats", "Publie l'état actuel de tous les serveurs"),
+        ("!budget", "Affiche l'utilisation du budget de requêtes de l'API"),
+        ("!graph <id> [métrique] [durée]", "Affiche l'historique d'une ressource (ex: `!graph abc123 memory 24h`)")
     ]
     
     info_commands_text = "\n".join([f"`{cmd}` - {desc}" for cmd, desc in info_commands])
@@ -849,7 +2366,8 @@ async def custom_help(ctx):
         admin_commands = [
             ("!adduser <id>", "Ajoute un utilisateur à la whitelist"),
             ("!removeuser <id>", "Retire un utilisateur de la whitelist"),
-            ("!whitelist", "Affiche la liste des utilisateurs autorisés")
+            ("!whitelist", "Affiche la liste des utilisateurs autorisés"),
+            ("!perf [profile start|stop]", "Affiche les durées de chaque phase ou pilote le profileur")
         ]
         
         admin_commands_text = "\n".join([f"`{cmd}` - {desc}" for cmd, desc in admin_commands])
@@ -879,15 +2397,15 @@ async def force_refresh(ctx):
     
     message = await ctx.send("⏳ Actualisation des serveurs en cours...")
     
-    # Actualiser la liste des serveurs
-    servers = await fetch_servers()
+    # Actualiser la liste des serveurs (partagé avec les actualisations déjà en cours)
+    servers = await get_servers(max_age=INVENTORY_MIN_AGE)
     
     if not servers:
         await message.edit(content="❌ Aucun serveur trouvé ou erreur lors de l'actualisation.")
         return
     
     # Actualiser les statuts
-    await check_server_status()
+    await run_status_check()
     
     await message.edit(content=f"✅ {len(servers)} serveurs ont été actualisés avec succès!")
 
@@ -1076,9 +2594,25 @@ async def show_whitelist(ctx):
     
     await safe_send(ctx, embed=embed)
 
-# Commande: Forcer la publication des statistiques des serveurs
-@bot.command(name="poststats", help="Publie immédiatement les statistiques des serveurs")
-async def force_post_stats(ctx):
+# Fonction pour estimer les requêtes par minute de la surveillance et l'intervalle minimal conseillé
+def estimate_poll_budget():
+    per_minute = 0.0
+    per_pass = 0
+    for server_id, server_info in fleet.servers.items():
+        requests_per_check = 1
+        if server_info.get("status") == "running" and not console_streams.is_live(server_id):
+            requests_per_check += 1  # /logs
+        per_pass += requests_per_check
+        interval = poll_scheduler.interval_for(server_id, server_info) if ADAPTIVE_POLLING else CHECK_INTERVAL
+        per_minute += requests_per_check * 60 / interval
+    
+    background_budget = api.governor.limit * (1 - API_USER_RESERVE)
+    min_interval = per_pass * 60 / background_budget if background_budget else 0
+    return per_minute, per_pass, min_interval
+
+# Commande: Afficher l'utilisation du budget de requêtes de l'API Pterodactyl
+@bot.command(name="budget", aliases=["ratelimit"], help="Affiche l'utilisation du budget de requêtes de l'API")
+async def show_api_budget(ctx):
     if not is_whitelisted(ctx):
         embed = discord.Embed(
             title="⛔ Accès refusé",
@@ -1088,221 +2622,1862 @@ async def force_post_stats(ctx):
         await safe_send(ctx, embed=embed)
         return
     
-    message = await ctx.send("⏳ Publication des statistiques en cours...")
-    
-    # Actualiser les serveurs et publier les stats
-    await fetch_servers()
-    await check_server_status()
-    result = await post_server_status_now()
+    usage = api.governor.snapshot()
+    per_minute, per_pass, min_interval = estimate_poll_budget()
+    usage_percent = min(int(usage["used_last_minute"] * 100 / usage["limit"]), 100) if usage["limit"] else 0
     
-    if result:
-        await message.edit(content=f"✅ Statistiques publiées avec succès!")
-    else:
-        await message.edit(content="❌ Erreur lors de la publication des statistiques.")
+    embed = discord.Embed(
+        title="📶 Budget de l'API Pterodactyl",
+        description=f"```{progress_bar(usage_percent)}```\n**{usage['used_last_minute']}** / {usage['limit']} requêtes sur la dernière minute",
+        color=COLORS["warning"] if usage_percent >= 80 else COLORS["info"],
+        timestamp=datetime.datetime.now()
+    )
+    embed.add_field(name="Jetons disponibles", value=f"`{usage['available']}`", inline=True)
+    embed.add_field(
+        name="Restant (panel)",
+        value=f"`{usage['remaining']}`" if usage["remaining"] is not None else "Inconnu",
+        inline=True
+    )
+    embed.add_field(
+        name="Pause en cours",
+        value=f"{usage['blocked_for']:.0f} s" if usage["blocked_for"] else "Aucune",
+        inline=True
+    )
+    embed.add_field(name="Requêtes retardées", value=f"`{usage['waits']}`", inline=True)
+    embed.add_field(name="Réponses 429", value=f"`{usage['rate_limited']}`", inline=True)
+    embed.add_field(
+        name="🔄 Surveillance",
+        value=(
+            f"≈ **{per_minute:.0f}** requêtes/min estimées\n"
+            f"{per_pass} requêtes pour vérifier tous les serveurs\n"
+            f"`CHECK_INTERVAL` conseillé: ≥ **{int(min_interval) + 1}** s (actuel: {CHECK_INTERVAL} s)"
+        ),
+        inline=False
+    )
+    embed.set_footer(text=f"Demandé par {ctx.author.display_name}", icon_url=ctx.author.display_avatar.url)
+    await safe_send(ctx, embed=embed)
 
-# Task: Vérifier l'état des serveurs
-@tasks.loop(seconds=CHECK_INTERVAL)
-async def check_server_status():
-    global previous_server_states, servers_cache, connected_players
+# Fonction pour convertir une durée ("30m", "6h", "7d") en secondes
+def parse_period(text):
+    match = re.fullmatch(r"(\d+)\s*([mhdj])", text.strip().lower())
+    if not match:
+        return None
+    return int(match.group(1)) * {"m": 60, "h": 3600, "d": 86400, "j": 86400}[match.group(2)]
+
+# Commande: Afficher le graphique de l'historique d'une ressource
+@bot.command(name="graph", aliases=["graphique"], help="Affiche l'historique d'une ressource d'un serveur")
+async def show_graph(ctx, server_id=None, metric="cpu", period="1h"):
+    if not is_whitelisted(ctx):
+        embed = discord.Embed(
+            title="⛔ Accès refusé",
+            description="Vous n'êtes pas autorisé à utiliser cette commande.",
+            color=COLORS["error"]
+        )
+        await safe_send(ctx, embed=embed)
+        return
     
-    try:
-        channel = bot.get_channel(NOTIFICATION_CHANNEL_ID)
-        if not channel:
-            print(f"❌ Canal de notification introuvable (ID: {NOTIFICATION_CHANNEL_ID})")
-            return
-        
-        print(f"Vérification de l'état des serveurs ({len(servers_cache)} serveurs)...")
-        
-        # Parcourir tous les serveurs
-        for server_id, server_info in servers_cache.items():
-            try:
-                # Récupérer les ressources du serveur
-                resources_response = requests.get(
-                    f"{PTERODACTYL_API_URL}/api/client/servers/{server_id}/resources",
-                    headers=headers,
-                    timeout=10
-                )
-                
-                if resources_response.status_code == 200:
-                    resources_data = resources_response.json()
-                    resources = resources_data.get("attributes", {})
-                    
-                    # Mettre à jour les ressources dans le cache
-                    servers_cache[server_id]["resources"] = resources
-                    
-                    # Récupérer le statut actuel
-                    current_status = resources.get("current_state")
-                    servers_cache[server_id]["status"] = current_status
-                    
-                    # Vérifier si le statut a changé
-                    previous_status = previous_server_states.get(server_id)
-                    
-                    if previous_status is not None and previous_status != current_status:
-                        # Le statut a changé, envoyer une notification
-                        status_emoji = get_status_emoji(current_status)
-                        status_text = {
-                            "running": "En ligne",
-                            "starting": "En démarrage",
-                            "stopping": "En arrêt",
-                            "offline": "Hors ligne"
-                        }.get(current_status, current_status)
-                        
-                        embed = discord.Embed(
-                            title=f"{status_emoji} État du serveur modifié",
-                            description=f"Le serveur **{server_info['name']}** est maintenant **{status_text}**",
-                            color=COLORS[current_status if current_status in COLORS else "info"],
-                            timestamp=datetime.datetime.now()
-                        )
-                        embed.set_thumbnail(url=SERVER_ICON)
-                        await channel.send(embed=embed)
-                    
-                    # Mettre à jour l'état précédent
-                    previous_server_states[server_id] = current_status
-                    
-                    # Si le serveur est en ligne, vérifier les joueurs connectés
-                    if current_status == "running":
-                        # Récupérer les logs du serveur pour détecter les connexions/déconnexions
-                        logs_response = requests.get(
-                            f"{PTERODACTYL_API_URL}/api/client/servers/{server_id}/logs",
-                            headers=headers,
-                            timeout=10
-                        )
-                        
-                        if logs_response.status_code == 200:
-                            logs_data = logs_response.json()
-                            logs = logs_data.get("data", [])
-                            
-                            # Initialiser le dictionnaire des joueurs pour ce serveur s'il n'existe pas
-                            if server_id not in connected_players:
-                                connected_players[server_id] = {}
-                            
-                            # Déterminer le type de serveur (pour optimiser la détection)
-                            server_type = None
-                            if "zomboid" in server_info.get("name", "").lower():
-                                server_type = "project_zomboid"
-                            elif "minecraft" in server_info.get("name", "").lower():
-                                server_type = "minecraft"
-                            # Vous pouvez ajouter d'autres détections basées sur le nom
-                            
-                            # Afficher quelques logs pour débogage
-                            print(f"--- Logs du serveur {server_info['name']} ---")
-                            for i, log in enumerate(logs[:3]):  # Analyser les 3 premiers logs
-                                log_text = log.get("attributes", {}).get("content", "")
-                                print(f"LOG {i+1}: {log_text}")
-                            
-                            # Analyser les logs pour détecter les connexions/déconnexions
-                            for log in logs:
-                                log_text = log.get("attributes", {}).get("content", "")
-                                
-                                # Détection des connexions
-                                player_name = detect_player_event(log_text, CONNECTION_PATTERNS, server_type)
-                                if player_name:
-                                    # Si le joueur n'est pas déjà enregistré comme connecté
-                                    if player_name not in connected_players[server_id]:
-                                        connect_time = datetime.datetime.now()
-                                        connected_players[server_id][player_name] = {"connect_time": connect_time}
-                                        
-                                        # Mettre à jour l'info dans le cache du serveur
-                                        servers_cache[server_id]["players"] = connected_players[server_id]
-                                        
-                                        # Envoyer une notification de connexion
-                                        embed = discord.Embed(
-                                            title="🟢 Nouvelle connexion",
-                                            description=f"**{player_name}** s'est connecté au serveur **{server_info['name']}**",
-                                            color=COLORS["connection"],
-                                            timestamp=connect_time
-                                        )
-                                        embed.set_thumbnail(url=SERVER_ICON)
-                                        embed.add_field(name="Heure de connexion", value=connect_time.strftime("%H:%M:%S"), inline=True)
-                                        embed.add_field(name="Joueurs en ligne", value=f"{len(connected_players[server_id])} joueur(s)", inline=True)
-                                        await channel.send(embed=embed)
-                                        print(f"✅ Détecté connexion de {player_name} sur {server_info['name']}")
-                                
-                                # Détection des déconnexions
-                                player_name = detect_player_event(log_text, DISCONNECTION_PATTERNS, server_type)
-                                if player_name:
-                                    # Si le joueur était enregistré comme connecté
-                                    if player_name in connected_players[server_id]:
-                                        connect_time = connected_players[server_id][player_name]["connect_time"]
-                                        disconnect_time = datetime.datetime.now()
-                                        duration = disconnect_time - connect_time
-                                        hours, remainder = divmod(duration.seconds, 3600)
-                                        minutes, seconds = divmod(remainder, 60)
-                                        
-                                        # Supprimer le joueur de la liste des connectés
-                                        del connected_players[server_id][player_name]
-                                        
-                                        # Mettre à jour l'info dans le cache du serveur
-                                        servers_cache[server_id]["players"] = connected_players[server_id]
-                                        
-                                        # Envoyer une notification de déconnexion
-                                        embed = discord.Embed(
-                                            title="🔴 Déconnexion",
-                                            description=f"**{player_name}** s'est déconnecté du serveur **{server_info['name']}**",
-                                            color=COLORS["disconnection"],
-                                            timestamp=disconnect_time
-                                        )
-                                        embed.set_thumbnail(url=SERVER_ICON)
-                                        embed.add_field(
-                                            name="Durée de session",
-                                            value=f"{hours:02}:{minutes:02}:{seconds:02}",
-                                            inline=False
-                                        )
-                                        embed.add_field(
-                                            name="Connecté à",
-                                            value=connect_time.strftime("%H:%M:%S"),
-                                            inline=True
-                                        )
-                                        embed.add_field(
-                                            name="Déconnecté à",
-                                            value=disconnect_time.strftime("%H:%M:%S"),
-                                            inline=True
-                                        )
-                                        embed.add_field(
-                                            name="Joueurs restants",
-                                            value=f"{len(connected_players[server_id])} joueur(s)",
-                                            inline=False
-                                        )
-                                        await channel.send(embed=embed)
-                                        print(f"✅ Détecté déconnexion de {player_name} sur {server_info['name']}")
-                        
-                        else:
-                            print(f"Erreur lors de la récupération des logs du serveur {server_id}: {logs_response.status_code}")
-                else:
-                    print(f"Erreur lors de la récupération des ressources du serveur {server_id}: {resources_response.status_code}")
-            
-            except Exception as e:
-                print(f"Erreur lors de la vérification du serveur {server_id}: {str(e)}")
+    seconds = parse_period(period)
+    if server_id not in fleet.servers or metric not in HISTORY_METRICS or not seconds:
+        embed = discord.Embed(
+            title="❓ Utilisation",
+            description=(
+                "`!graph <id> <métrique> <durée>`\n"
+                f"Métriques: {', '.join(f'`{name}`' for name in HISTORY_METRICS)}\n"
+                "Durée: `30m`, `6h`, `7d`... (30 jours maximum)"
+            ),
+            color=COLORS["warning"]
+        )
+        await safe_send(ctx, embed=embed)
+        return
     
-    except Exception as e:
-        print(f"Erreur lors de la vérification des serveurs: {str(e)}")
-
+    server_info = fleet.servers[server_id]
+    label, _, unit, _ = HISTORY_METRICS[metric]
+    resolution, points = resource_history.query(server_id, metric, seconds)
+    if len(points) < 2:
+        embed = discord.Embed(
+            title="📉 Pas encore assez de données",
+            description=f"L'historique **{label}** de **{server_info['name']}** sur `{period}` est encore vide.",
+            color=COLORS["warning"]
+        )
+        await safe_send(ctx, embed=embed)
+        return
+    
+    try:
+        # Le rendu est fait dans un thread pour ne pas bloquer le bot
+        chart = await asyncio.to_thread(
+            render_history_chart, f"{server_info['name']} · {label} ({period})", unit, resolution, points
+        )
+    except ImportError:
+        embed = discord.Embed(
+            title="❌ Graphiques indisponibles",
+            description="Le module `matplotlib` n'est pas installé.",
+            color=COLORS["error"]
+        )
+        await safe_send(ctx, embed=embed)
+        return
+    
+    values = [value for _, value, _ in points]
+    embed = discord.Embed(
+        title=f"📈 {label} · {server_info['name']}",
+        color=COLORS["resources"],
+        timestamp=datetime.datetime.now()
+    )
+    embed.add_field(name="Moyenne", value=f"{sum(values) / len(values):.1f} {unit}", inline=True)
+    embed.add_field(name="Pic", value=f"{max(peak for _, _, peak in points):.1f} {unit}", inline=True)
+    embed.add_field(
+        name="Résolution",
+        value={0: "Mesures brutes", 60: "1 minute", 3600: "1 heure"}[resolution],
+        inline=True
+    )
+    embed.set_image(url="attachment://graph.png")
+    embed.set_footer(text=f"Demandé par {ctx.author.display_name}", icon_url=ctx.author.display_avatar.url)
+    await safe_send(ctx, embed=embed, file=discord.File(chart, filename="graph.png"))
+
+# Fonction pour formatter une durée en millisecondes
+def format_ms(seconds):
+    return f"{seconds * 1000:.1f}" if seconds < 10 else f"{seconds * 1000:.0f}"
+
+# Fonction pour écrire un fichier texte (appelée dans un thread)
+def write_text_file(path, text):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
+
+# Commande: Afficher les mesures de performance ou piloter le profileur
+@bot.command(name="perf", help="Affiche les durées de chaque phase de la surveillance")
+async def show_perf(ctx, action=None, toggle=None):
+    if not is_whitelisted(ctx):
+        embed = discord.Embed(
+            title="⛔ Accès refusé",
+            description="Vous n'êtes pas autorisé à utiliser cette commande.",
+            color=COLORS["error"]
+        )
+        await safe_send(ctx, embed=embed)
+        return
+    
+    # !perf profile start|stop: échantillonnage de la pile de la boucle du bot
+    if action == "profile":
+        if toggle == "start":
+            if profiler.start():
+                await safe_send(ctx, content=f"🔬 Profileur démarré (arrêt automatique après {PROFILE_MAX_DURATION} s). `!perf profile stop` pour récupérer les piles.")
+            else:
+                await safe_send(ctx, content="🔬 Le profileur est déjà en cours.")
+        elif toggle == "stop":
+            if profiler.started_at is None:
+                await safe_send(ctx, content="🔬 Le profileur n'a pas été démarré.")
+                return
+            folded = profiler.stop()
+            samples = profiler.samples
+            profiler.started_at = None
+            path = os.path.join(os.path.dirname(PERF_FILE) or "/app/data", f"profile-{datetime.datetime.now().strftime('%Y%m%d-%H%M%S')}.folded")
+            try:
+                await asyncio.to_thread(write_text_file, path, folded)
+            except OSError as e:
+                log_event(logging.WARNING, "perf.write_failed", f"⚠️ Impossible d'écrire {path}: {str(e)}")
+            data = folded.encode()
+            file = discord.File(io.BytesIO(data), filename=os.path.basename(path)) if len(data) < 7 * 1024 * 1024 else None
+            await safe_send(ctx, content=f"🔬 {samples} échantillons enregistrés dans `{path}` (format flamegraph)", file=file)
+        else:
+            await safe_send(ctx, content="Utilisation: `!perf profile start` ou `!perf profile stop`")
+        return
+    
+    summary = perf.summary()
+    embed = discord.Embed(
+        title="⏱️ Performance de la surveillance",
+        description="Percentiles glissants (ms) sur les dernières mesures",
+        color=COLORS["info"],
+        timestamp=datetime.datetime.now()
+    )
+    
+    tick = summary["tick"]
+    if tick:
+        lines = [f"**Durée:** p50 `{format_ms(tick['p50'])}` · p95 `{format_ms(tick['p95'])}` · max `{format_ms(tick['max'])}` ({tick['count']} passages)"]
+        for phase, stats in summary["tick_phases"].items():
+            if stats and stats["max"]:
+                lines.append(f"{phase}: p50 `{format_ms(stats['p50'])}` · p95 `{format_ms(stats['p95'])}` (cumulé)")
+        embed.add_field(name="🔄 Par passage", value="\n".join(lines), inline=False)
+    
+    phase_lines = []
+    for phase, stats in summary["phases"].items():
+        if stats:
+            phase_lines.append(
+                f"**{phase}** p50 `{format_ms(stats['p50'])}` · p95 `{format_ms(stats['p95'])}` · "
+                f"p99 `{format_ms(stats['p99'])}` · max `{format_ms(stats['max'])}` (n={stats['count']})"
+            )
+    embed.add_field(name="🧩 Par phase et par serveur", value="\n".join(phase_lines) or "Aucune mesure", inline=False)
+    
+    if summary["slowest_servers"]:
+        embed.add_field(
+            name="🐢 Serveurs les plus lents (dernière requête)",
+            value="\n".join(
+                f"`{server_id}` {fleet.servers.get(server_id, {}).get('name', '?')}: {format_ms(duration)} ms"
+                for server_id, duration in summary["slowest_servers"]
+            ),
+            inline=False
+        )
+    
+    if profiler.running:
+        embed.add_field(name="🔬 Profileur", value=f"En cours ({profiler.samples} échantillons)", inline=False)
+    
+    embed.set_footer(text=f"Demandé par {ctx.author.display_name}", icon_url=ctx.author.display_avatar.url)
+    await safe_send(ctx, embed=embed)
+    await perf.write_file(force=True)
+
+# Commande: Forcer la publication des statistiques des serveurs
+@bot.command(name="poststats", help="Publie immédiatement les statistiques des serveurs")
+async def force_post_stats(ctx):
+    if not is_whitelisted(ctx):
+        embed = discord.Embed(
+            title="⛔ Accès refusé",
+            description="Vous n'êtes pas autorisé à utiliser cette commande.",
+            color=COLORS["error"]
+        )
+        await safe_send(ctx, embed=embed)
+        return
+    
+    message = await ctx.send("⏳ Publication des statistiques en cours...")
+    
+    # Actualiser les serveurs et publier les stats
+    await get_servers()
+    await run_status_check()
+    result = await post_server_status_now()
+    
+    if result:
+        await message.edit(content=f"✅ Statistiques publiées avec succès!")
+    else:
+        await message.edit(content="❌ Erreur lors de la publication des statistiques.")
+
+# Disjoncteur d'une dépendance du poller (un nœud Wings ou le panel lui-même)
+# Fermé: requêtes normales. Ouvert après BREAKER_THRESHOLD échecs consécutifs: plus aucune
+# requête pendant `reset_timeout` secondes. Semi-ouvert: une seule requête d'essai, qui
+# referme le disjoncteur si elle aboutit ou le rouvre (délai doublé) si elle échoue.
+class CircuitBreaker:
+    def __init__(self, name, threshold=BREAKER_THRESHOLD, reset_timeout=BREAKER_RESET_TIMEOUT):
+        self.name = name
+        self.threshold = threshold
+        self.base_reset_timeout = reset_timeout
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0
+        self.last_error = None
+        self.notified = False  # Notification « injoignable » envoyée
+
+    # Une requête serait-elle autorisée (sans réserver l'essai du mode semi-ouvert)
+    def ready(self):
+        return self.state == "closed" or (self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout)
+
+    # Autoriser une requête (passe en semi-ouvert à la fin du délai: un seul essai)
+    def allow(self):
+        if not self.ready():
+            return False
+        if self.state == "open":
+            self.state = "half_open"
+        return True
+
+    def record_success(self):
+        if self.state != "closed":
+            log_event(logging.INFO, "breaker.closed", f"✅ {self.name} répond de nouveau", target=self.name)
+        self.state = "closed"
+        self.failures = 0
+        self.reset_timeout = self.base_reset_timeout
+
+    def record_failure(self, error):
+        self.failures += 1
+        self.last_error = error
+        if self.state == "half_open":
+            self.reset_timeout = min(self.reset_timeout * 2, BREAKER_MAX_RESET_TIMEOUT)
+        elif self.state == "open" or self.failures < self.threshold:
+            return
+        self.state = "open"
+        self.opened_at = time.monotonic()
+        log_event(
+            logging.WARNING, "breaker.open",
+            f"🔌 {self.name} injoignable après {self.failures} échec(s), nouvel essai dans {self.reset_timeout} s: {error}",
+            target=self.name, failures=self.failures, retry_in=self.reset_timeout
+        )
+
+    # Requête d'essai abandonnée sans réponse (échéance du lot, limite de requêtes)
+    def release(self):
+        if self.state == "half_open":
+            self.state = "open"
+
+# Disjoncteurs du panel et de chaque nœud
+panel_breaker = CircuitBreaker("Le panel")
+node_breakers = {}
+
+# Fonction pour obtenir le disjoncteur du nœud d'un serveur
+def get_node_breaker(node):
+    if node not in node_breakers:
+        node_breakers[node] = CircuitBreaker(f"Le nœud {node}")
+    return node_breakers[node]
+
+# Fonction pour réserver une requête auprès du panel et du nœud d'un serveur
+# Retourne le disjoncteur du nœud, ou None si l'un des deux est ouvert.
+def acquire_breakers(server_info):
+    node_breaker = get_node_breaker(server_info.get("node"))
+    if not (panel_breaker.ready() and node_breaker.ready()):
+        return None
+    panel_breaker.allow()
+    node_breaker.allow()
+    return node_breaker
+
+# Fonction pour enregistrer l'issue d'une requête du poller auprès des disjoncteurs
+# (connexion au panel impossible: panel; délai dépassé ou erreur 5xx: nœud;
+# échéance du lot, annulation ou limite de requêtes: aucun verdict)
+def record_breakers(node_breaker, response=None, error=None):
+    if isinstance(error, (DeadlineExceeded, asyncio.CancelledError)) or (response is not None and response.status_code == 429):
+        panel_breaker.release()
+        node_breaker.release()
+    elif isinstance(error, aiohttp.ClientConnectionError):
+        panel_breaker.record_failure(str(error) or type(error).__name__)
+        node_breaker.release()
+    elif error is not None or response.status_code >= 500:
+        panel_breaker.record_success()
+        node_breaker.record_failure((str(error) or type(error).__name__) if error is not None else f"code {response.status_code}")
+    else:
+        panel_breaker.record_success()
+        node_breaker.record_success()
+
+# Fonction pour marquer un serveur comme injoignable sans modifier son dernier état connu
+def mark_server_unknown(server_id):
+    resources = fleet.get(server_id, {}).get("resources") or {}
+    fleet.update(server_id, status="unknown", resources={**resources, "current_state": "unknown"})
+
+# Fonction pour notifier l'ouverture et la fermeture des disjoncteurs (une notification par panne)
+def report_breakers(channel):
+    for breaker in [panel_breaker] + list(node_breakers.values()):
+        is_panel = breaker is panel_breaker
+        affected = len(fleet.servers) if is_panel else sum(
+            1 for server_info in fleet.servers.values() if get_node_breaker(server_info.get("node")) is breaker
+        )
+        
+        if breaker.state != "closed" and not breaker.notified:
+            breaker.notified = True
+            embed = discord.Embed(
+                title=f"🔌 {'Panel' if is_panel else 'Nœud'} injoignable",
+                description=(
+                    f"{breaker.name} ne répond plus ({breaker.failures} échecs consécutifs). "
+                    f"**{affected}** serveur(s) sont marqués injoignables et ne sont plus interrogés "
+                    f"jusqu'au retour de la connexion."
+                ),
+                color=COLORS["error"],
+                timestamp=datetime.datetime.now()
+            )
+            embed.add_field(name="Dernière erreur", value=str(breaker.last_error)[:1024] or "Inconnue", inline=False)
+            embed.add_field(name="Nouvel essai", value=f"dans {breaker.reset_timeout} s", inline=True)
+            embed.set_thumbnail(url=SERVER_ICON)
+            outbox.enqueue(channel, f"breaker:{breaker.name}", "breaker", embed)
+        
+        elif breaker.state == "closed" and breaker.notified:
+            breaker.notified = False
+            downtime = int(time.monotonic() - breaker.opened_at)
+            embed = discord.Embed(
+                title=f"✅ {'Panel' if is_panel else 'Nœud'} de nouveau joignable",
+                description=f"{breaker.name} répond de nouveau, la surveillance de ses {affected} serveur(s) reprend.",
+                color=COLORS["success"],
+                timestamp=datetime.datetime.now()
+            )
+            embed.add_field(name="Durée de la panne", value=f"{downtime // 60} min {downtime % 60:02} s", inline=True)
+            embed.set_thumbnail(url=SERVER_ICON)
+            outbox.enqueue(channel, f"breaker:{breaker.name}", "breaker", embed)
+
+# Verrou pour éviter que deux passages de vérification se chevauchent (tâche + !refresh)
+# Créé à la première utilisation pour être lié à la boucle du bot
+poll_lock = None
+
+# Fonction pour récupérer l'état d'un serveur (ressources, puis logs s'il est en ligne)
+async def poll_server(server_id, semaphore, deadline, resources=None):
+    result = {"resources": resources, "logs": None, "error": None, "unknown": False}
+    if resources is not None and (resources.get("current_state") != "running" or console_streams.is_live(server_id)):
+        # État déjà fourni par le nœud Wings et aucun log à lire
+        return result
+    async with semaphore:
+        started = time.perf_counter()
+        try:
+            # Récupérer les ressources du serveur (sauf si le nœud Wings les a déjà fournies)
+            if resources is None:
+                # Panel ou nœud injoignable: ne pas attendre un délai dépassé de plus
+                node_breaker = acquire_breakers(fleet.servers.get(server_id, {}))
+                if node_breaker is None:
+                    result["unknown"] = True
+                    return result
+                try:
+                    resources_response = await api.get(
+                        f"/api/client/servers/{server_id}/resources",
+                        deadline=deadline
+                    )
+                except BaseException as e:
+                    # Y compris l'annulation du passage: l'essai du mode semi-ouvert doit être libéré
+                    record_breakers(node_breaker, error=e)
+                    raise
+                record_breakers(node_breaker, resources_response)
+                
+                if resources_response.status_code != 200:
+                    result["error"] = f"Erreur lors de la récupération des ressources du serveur {server_id}: {resources_response.status_code}"
+                    return result
+                
+                resources = resources_response.json().get("attributes", {})
+                result["resources"] = resources
+            
+            # Si le serveur est en ligne, récupérer les logs pour détecter les connexions/déconnexions
+            # (inutile si la console est déjà suivie en direct par websocket)
+            if resources.get("current_state") == "running" and not console_streams.is_live(server_id):
+                logs_response = await api.get(
+                    f"/api/client/servers/{server_id}/logs",
+                    deadline=deadline
+                )
+                
+                if logs_response.status_code == 200:
+                    result["logs"] = logs_response.json().get("data", [])
+                else:
+                    result["error"] = f"Erreur lors de la récupération des logs du serveur {server_id}: {logs_response.status_code}"
+        
+        except Exception as e:
+            result["error"] = f"Erreur lors de la vérification du serveur {server_id}: {str(e) or type(e).__name__}"
+        finally:
+            perf.record("fetch", time.perf_counter() - started, server_id)
+    
+    return result
+
+# Boîte d'envoi des notifications
+# Les notifications sont mises en file sans attendre Discord: un envoyeur en arrière-plan
+# regroupe les événements d'une courte fenêtre (ex: « 5 joueurs se sont connectés »),
+# conserve l'ordre des événements de chaque serveur et limite le rythme d'envoi par canal.
+class NotificationOutbox:
+    def __init__(self, window=OUTBOX_WINDOW):
+        self.window = window
+        self.queue = None
+        self.sent = 0
+        self._task = None
+        self._send_times = {}  # channel_id -> deque des derniers envois
+
+    def start(self):
+        if self.queue is None:
+            self.queue = asyncio.Queue()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    # Nombre de notifications en attente
+    def depth(self):
+        return self.queue.qsize() if self.queue is not None else 0
+
+    # Ajouter une notification (ne bloque jamais l'appelant)
+    def enqueue(self, channel, server_id, kind, embed, **details):
+        self.start()
+        self.queue.put_nowait({"channel": channel, "server_id": server_id, "kind": kind, "embed": embed, **details})
+
+    async def _run(self):
+        while True:
+            batch = [await self.queue.get()]
+            # Laisser arriver les événements de la même fenêtre
+            await asyncio.sleep(self.window)
+            while not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            
+            for channel, embed in self._coalesce(batch):
+                try:
+                    await self._pace(channel)
+                    with perf.measure("send"):
+                        await channel.send(embed=embed)
+                    self.sent += 1
+                    metrics.inc("pterobot_notifications_sent_total")
+                except Exception as e:
+                    log_event(logging.ERROR, "outbox.send_failed", f"Erreur lors de l'envoi d'une notification: {str(e)}")
+
+    # Respecter le rythme d'envoi de Discord sur un canal (OUTBOX_RATE messages / 5 secondes)
+    async def _pace(self, channel):
+        sends = self._send_times.setdefault(channel.id, deque())
+        now = time.monotonic()
+        while sends and now - sends[0] > 5:
+            sends.popleft()
+        if len(sends) >= OUTBOX_RATE:
+            await asyncio.sleep(5 - (now - sends[0]))
+            sends.popleft()
+        sends.append(time.monotonic())
+
+    # Regrouper les événements consécutifs de même type d'un même serveur
+    # (les serveurs sont traités dans l'ordre de leur premier événement)
+    def _coalesce(self, batch):
+        groups = {}
+        for event in batch:
+            groups.setdefault((event["channel"].id, event["server_id"]), []).append(event)
+        
+        messages = []
+        for events in groups.values():
+            runs = []
+            for event in events:
+                if runs and runs[-1][0]["kind"] == event["kind"] and event["kind"] in ("join", "leave", "status"):
+                    runs[-1].append(event)
+                else:
+                    runs.append([event])
+            for run in runs:
+                embed = run[0]["embed"] if len(run) == 1 else self._merge(run)
+                messages.append((run[0]["channel"], embed))
+        return messages
+
+    # Construire un embed unique pour plusieurs événements de même type
+    @staticmethod
+    def _merge(run):
+        kind = run[0]["kind"]
+        server_name = run[-1].get("server_name", "")
+        
+        if kind == "status":
+            steps = " → ".join(
+                f"{get_status_emoji(event['status'])} {event['status']}" for event in run
+            )
+            embed = discord.Embed(
+                title=f"{get_status_emoji(run[-1]['status'])} État du serveur modifié",
+                description=f"Le serveur **{server_name}**: {steps}",
+                color=COLORS[run[-1]["status"] if run[-1]["status"] in COLORS else "info"],
+                timestamp=datetime.datetime.now()
+            )
+        else:
+            players = list(dict.fromkeys(event["player"] for event in run))
+            joined = kind == "join"
+            embed = discord.Embed(
+                title=f"{'🟢' if joined else '🔴'} {len(players)} {'connexions' if joined else 'déconnexions'}",
+                description=(
+                    f"**{len(players)}** joueurs se sont {'connectés au' if joined else 'déconnectés du'} serveur **{server_name}**"
+                ),
+                color=COLORS["connection" if joined else "disconnection"],
+                timestamp=datetime.datetime.now()
+            )
+            shown = "\n".join(f"• **{player}**" for player in players[:25])
+            if len(players) > 25:
+                shown += f"\n… et {len(players) - 25} autre(s)"
+            embed.add_field(name="Joueurs", value=shown, inline=False)
+            embed.add_field(name="Joueurs en ligne", value=f"{run[-1].get('online', 0)} joueur(s)", inline=True)
+        
+        embed.set_thumbnail(url=SERVER_ICON)
+        return embed
+
+# Boîte d'envoi partagée
+outbox = NotificationOutbox()
+
+# Fonction pour notifier un changement d'état d'un serveur
+async def notify_status_change(channel, server_id, server_info, current_status):
+    status_emoji = get_status_emoji(current_status)
+    status_text = {
+        "running": "En ligne",
+        "starting": "En démarrage",
+        "stopping": "En arrêt",
+        "offline": "Hors ligne",
+        "unknown": "Injoignable"
+    }.get(current_status, current_status)
+    
+    embed = discord.Embed(
+        title=f"{status_emoji} État du serveur modifié",
+        description=f"Le serveur **{server_info['name']}** est maintenant **{status_text}**",
+        color=COLORS[current_status if current_status in COLORS else "info"],
+        timestamp=datetime.datetime.now()
+    )
+    embed.set_thumbnail(url=SERVER_ICON)
+    outbox.enqueue(channel, server_id, "status", embed, server_name=server_info["name"], status=current_status)
+
+# Fonction pour analyser des lignes de console et notifier les connexions/déconnexions
+async def process_log_lines(channel, server_id, server_info, lines):
+    # Initialiser le dictionnaire des joueurs pour ce serveur s'il n'existe pas
+    if server_id not in connected_players:
+        connected_players[server_id] = {}
+    
+    # Utiliser uniquement les expressions du jeu de ce serveur
+    with perf.measure("parse", server_id):
+        game = game_profiles.resolve(server_id, server_info)
+        events = game_profiles.matcher.scan(lines, game)
+    
+    await process_player_events(channel, server_id, server_info, events)
+
+# Fonction pour appliquer des événements joueurs (console ou sonde du jeu) et les notifier
+async def process_player_events(channel, server_id, server_info, events):
+    if server_id not in connected_players:
+        connected_players[server_id] = {}
+    
+    notify_started = time.perf_counter()
+    for event in events:
+        player_name = event.player
+        
+        # Détection des connexions
+        if event.kind == "join":
+            # Session du joueur s'il est déjà enregistré comme connecté
+            session = connected_players[server_id].get(player_name)
+            if session is not None:
+                # Connexion déjà connue: simple signe de présence
+                session.seen_at = event.timestamp
+            else:
+                session = PlayerSession(event.timestamp)
+                connected_players[server_id][player_name] = session
+                state_store.set_player(server_id, player_name, session)
+                connect_time = wall_clock(session.connected_at)
+                
+                # Mettre à jour la fiche du serveur (copie figée pour l'instantané)
+                fleet.update(server_id, players=MappingProxyType(dict(connected_players[server_id])))
+                
+                # Envoyer une notification de connexion
+                embed = discord.Embed(
+                    title="🟢 Nouvelle connexion",
+                    description=f"**{player_name}** s'est connecté au serveur **{server_info['name']}**",
+                    color=COLORS["connection"],
+                    timestamp=connect_time
+                )
+                embed.set_thumbnail(url=SERVER_ICON)
+                embed.add_field(name="Heure de connexion", value=connect_time.strftime("%H:%M:%S"), inline=True)
+                embed.add_field(name="Joueurs en ligne", value=f"{len(connected_players[server_id])} joueur(s)", inline=True)
+                outbox.enqueue(
+                    channel, server_id, "join", embed,
+                    server_name=server_info["name"], player=player_name, online=len(connected_players[server_id])
+                )
+                log_event(
+                    logging.INFO, "player.join", f"✅ Détecté connexion de {player_name} sur {server_info['name']}",
+                    server=server_id, player=player_name
+                )
+        
+        # Détection des déconnexions
+        elif event.kind == "leave":
+            # Si le joueur était enregistré comme connecté
+            if player_name in connected_players[server_id]:
+                session = connected_players[server_id][player_name]
+                duration = session.duration(event.timestamp)
+                connect_time = wall_clock(session.connected_at)
+                disconnect_time = wall_clock(event.timestamp)
+                hours, remainder = divmod(int(duration), 3600)
+                minutes, seconds = divmod(remainder, 60)
+                
+                # Supprimer le joueur de la liste des connectés
+                del connected_players[server_id][player_name]
+                state_store.remove_player(server_id, player_name)
+                
+                # Mettre à jour la fiche du serveur (copie figée pour l'instantané)
+                fleet.update(server_id, players=MappingProxyType(dict(connected_players[server_id])))
+                
+                # Envoyer une notification de déconnexion
+                embed = discord.Embed(
+                    title="🔴 Déconnexion",
+                    description=f"**{player_name}** s'est déconnecté du serveur **{server_info['name']}**",
+                    color=COLORS["disconnection"],
+                    timestamp=disconnect_time
+                )
+                embed.set_thumbnail(url=SERVER_ICON)
+                embed.add_field(
+                    name="Durée de session",
+                    value=f"{hours:02}:{minutes:02}:{seconds:02}",
+                    inline=False
+                )
+                embed.add_field(
+                    name="Connecté à",
+                    value=connect_time.strftime("%H:%M:%S"),
+                    inline=True
+                )
+                embed.add_field(
+                    name="Déconnecté à",
+                    value=disconnect_time.strftime("%H:%M:%S"),
+                    inline=True
+                )
+                embed.add_field(
+                    name="Joueurs restants",
+                    value=f"{len(connected_players[server_id])} joueur(s)",
+                    inline=False
+                )
+                outbox.enqueue(
+                    channel, server_id, "leave", embed,
+                    server_name=server_info["name"], player=player_name, online=len(connected_players[server_id])
+                )
+                log_event(
+                    logging.INFO, "player.leave", f"✅ Détecté déconnexion de {player_name} sur {server_info['name']}",
+                    server=server_id, player=player_name, session=int(duration)
+                )
+    
+    if events:
+        perf.record("notify", time.perf_counter() - notify_started, server_id)
+
+# Fonction pour enregistrer le statut d'un serveur et notifier s'il a changé
+async def update_server_status(channel, server_id, server_info, current_status):
+    fleet.update(server_id, status=current_status)
+    
+    # Vérifier si le statut a changé
+    previous_status = previous_server_states.get(server_id)
+    if previous_status is not None and previous_status != current_status:
+        # Le statut a changé, envoyer une notification
+        await notify_status_change(channel, server_id, server_info, current_status)
+    
+    # Serveur arrêté ou redémarré (y compris après un plantage): plus aucun joueur n'est connecté
+    if current_status in ("offline", "starting") and connected_players.get(server_id):
+        count = clear_players(server_id)
+        log_event(
+            logging.INFO, "player.cleared",
+            f"🧹 {count} joueur(s) de {server_info['name']} retiré(s): serveur {STATE_LABELS.get(current_status, current_status).lower()}",
+            server=server_id, players=count, status=current_status
+        )
+    
+    # Mettre à jour l'état précédent
+    if previous_status != current_status:
+        state_store.set_server_state(server_id, current_status)
+    previous_server_states[server_id] = current_status
+    
+    # Transmettre l'état aux actions d'alimentation en cours (!start, !stop, !restart)
+    for watcher in power_watchers.get(server_id, ()):
+        watcher.put_nowait(current_status)
+
+# Fonction pour oublier des joueurs connectés sans notification (tous si `players` est None)
+def clear_players(server_id, players=None):
+    sessions = connected_players.get(server_id)
+    if not sessions:
+        return 0
+    players = list(sessions) if players is None else players
+    for player in players:
+        del sessions[player]
+        state_store.remove_player(server_id, player)
+    if not sessions:
+        del connected_players[server_id]
+    fleet.update(server_id, players=MappingProxyType(dict(sessions)))
+    return len(players)
+
+# Fonction pour oublier les joueurs sans signe de présence depuis PLAYER_SESSION_TTL secondes
+# (déconnexion absente de la console, bot arrêté pendant la déconnexion...)
+# Seuls les serveurs sondés sont concernés: sans sonde du jeu, rien ne confirme qu'un joueur
+# connecté depuis longtemps est toujours là, sa session est gardée jusqu'à sa déconnexion.
+def evict_stale_players(now=None):
+    cutoff = (time.monotonic() if now is None else now) - PLAYER_SESSION_TTL
+    servers = fleet.servers
+    evicted = 0
+    for server_id in list(connected_players):
+        if not connected_players[server_id]:
+            del connected_players[server_id]
+            continue
+        if servers.get(server_id, {}).get("query") is None:
+            continue
+        stale = [player for player, session in connected_players[server_id].items() if session.seen_at < cutoff]
+        if stale:
+            evicted += clear_players(server_id, stale)
+            log_event(
+                logging.INFO, "player.expired",
+                f"⌛ {len(stale)} joueur(s) absent(s) des sondes oublié(s) sur le serveur {server_id}",
+                server=server_id, players=stale
+            )
+    fleet.publish()
+    return evicted
+
+# Fonction pour calculer l'empreinte d'une ligne de console
+# (stable d'un processus à l'autre, contrairement à hash(): le curseur est enregistré)
+def line_hash(line):
+    return zlib.crc32(line.encode("utf-8", "replace"))
+
+# Curseur de lecture des logs d'un serveur
+# Mémorise l'empreinte des dernières lignes déjà analysées pour ne traiter, au passage
+# suivant, que les lignes apparues depuis. La recherche part de la fin du tampon:
+# le coût est proportionnel au nombre de nouvelles lignes, pas à la taille du tampon.
+# Le curseur est enregistré avec l'état du bot pour reprendre au même endroit après un redémarrage.
+class LogCursor:
+    def __init__(self, anchor_size=LOG_CURSOR_ANCHOR, anchor=None):
+        self.anchor_size = anchor_size
+        self.anchor = list(anchor or [])[-anchor_size:]  # Empreintes des dernières lignes vues (de la plus ancienne à la plus récente)
+
+    # Position de la première ligne non encore vue (0 si aucun recouvrement trouvé)
+    def _find_new_start(self, lines):
+        last = self.anchor[-1]
+        for i in range(len(lines) - 1, -1, -1):
+            if line_hash(lines[i]) != last:
+                continue
+            # Vérifier les lignes précédentes pour ne pas se tromper sur une ligne répétée
+            depth = min(len(self.anchor), i + 1)
+            if all(line_hash(lines[i - j]) == self.anchor[-1 - j] for j in range(1, depth)):
+                return i + 1
+        return 0
+
+    # Marquer des lignes comme vues (ex: lignes reçues par websocket)
+    def mark_seen(self, lines):
+        self.anchor = (self.anchor + [line_hash(line) for line in lines[-self.anchor_size:]])[-self.anchor_size:]
+
+    # Retourner uniquement les nouvelles lignes du tampon et avancer le curseur
+    def advance(self, lines):
+        if not lines:
+            return []
+        start = self._find_new_start(lines) if self.anchor else 0
+        if start == 0:
+            # Premier passage ou tampon entièrement renouvelé: tout est nouveau
+            self.anchor = []
+        new_lines = lines[start:]
+        self.mark_seen(new_lines)
+        return new_lines
+
+# Curseurs de logs par serveur
+log_cursors = {}
+
+# Tampon circulaire compact (tableaux typés) de points (horodatage, moyenne, pic)
+# La mémoire est réservée au fil des ajouts puis ne dépasse jamais la capacité.
+class RingBuffer:
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.times = array("I")
+        self.values = array("f")
+        self.peaks = array("f")
+        self.start = 0  # Position du point le plus ancien une fois le tampon plein
+
+    def __len__(self):
+        return len(self.times)
+
+    def append(self, t, value, peak):
+        if len(self.times) < self.capacity:
+            self.times.append(int(t))
+            self.values.append(value)
+            self.peaks.append(peak)
+        else:
+            self.times[self.start] = int(t)
+            self.values[self.start] = value
+            self.peaks[self.start] = peak
+            self.start = (self.start + 1) % self.capacity
+
+    # Points à partir de l'horodatage since, du plus ancien au plus récent
+    def since(self, since):
+        size = len(self.times)
+        points = []
+        for i in range(size):
+            index = (self.start + i) % size
+            if self.times[index] >= since:
+                points.append((self.times[index], self.values[index], self.peaks[index]))
+        return points
+
+# Métriques conservées: nom -> (libellé, clé dans /resources, unité, compteur cumulé)
+HISTORY_METRICS = {
+    "cpu": ("CPU", "cpu_absolute", "%", False),
+    "memory": ("Mémoire", "memory_bytes", "Mo", False),
+    "disk": ("Disque", "disk_bytes", "Mo", False),
+    "network_rx": ("Réseau (réception)", "network_rx_bytes", "Ko/s", True),
+    "network_tx": ("Réseau (émission)", "network_tx_bytes", "Ko/s", True),
+}
+
+# Historique des ressources des serveurs
+# Chaque métrique garde les mesures brutes récentes, des moyennes par minute et par heure
+# (tampons circulaires de taille fixe). Les agrégats terminés sont enregistrés sur disque
+# par le stockage d'état et rechargés au démarrage.
+class ResourceHistory:
+    RESOLUTIONS = ((60, HISTORY_MINUTE_POINTS), (3600, HISTORY_HOUR_POINTS))
+
+    def __init__(self, store, sample_interval=HISTORY_SAMPLE_INTERVAL):
+        self.store = store
+        self.sample_interval = sample_interval
+        self._series = {}  # (server_id, métrique) -> {résolution (0: brut): RingBuffer}
+        self._buckets = {}  # (server_id, métrique, résolution) -> [début, somme, nombre, pic]
+        self._counters = {}  # (server_id, métrique) -> (horodatage, valeur) des compteurs cumulés
+        self._last_sample = {}  # server_id -> horodatage de la dernière mesure conservée
+
+    def _rings(self, server_id, metric):
+        rings = self._series.get((server_id, metric))
+        if rings is None:
+            rings = {0: RingBuffer(HISTORY_RAW_POINTS)}
+            for resolution, capacity in self.RESOLUTIONS:
+                rings[resolution] = RingBuffer(capacity)
+            self._series[(server_id, metric)] = rings
+        return rings
+
+    # Enregistrer une mesure (dictionnaire "resources" renvoyé par /resources)
+    def record(self, server_id, resources, now=None):
+        now = time.time() if now is None else now
+        if now - self._last_sample.get(server_id, 0) < self.sample_interval:
+            return
+        self._last_sample[server_id] = now
+        
+        rows = []
+        for metric, (_, key, unit, cumulative) in HISTORY_METRICS.items():
+            value = resources.get(key)
+            if value is None:
+                continue
+            if cumulative:
+                # Compteur cumulé: convertir en débit depuis la mesure précédente
+                previous = self._counters.get((server_id, metric))
+                self._counters[(server_id, metric)] = (now, value)
+                if previous is None or value < previous[1] or now <= previous[0]:
+                    continue
+                value = (value - previous[1]) / (now - previous[0]) / 1024
+            elif unit == "Mo":
+                value = value / (1024 * 1024)
+            
+            rings = self._rings(server_id, metric)
+            rings[0].append(now, value, value)
+            rows.extend(self._roll_up(server_id, metric, rings, now, value, value, 1))
+        
+        if rows:
+            self.store.add_metric_rows(rows)
+
+    # Ajouter une mesure aux agrégats en cours et clôturer ceux dont la période est finie
+    def _roll_up(self, server_id, metric, rings, now, total, peak, count):
+        rows = []
+        for resolution, _ in self.RESOLUTIONS:
+            start = int(now // resolution) * resolution
+            bucket = self._buckets.get((server_id, metric, resolution))
+            if bucket is not None and bucket[0] != start:
+                average = bucket[1] / bucket[2]
+                rings[resolution].append(bucket[0], average, bucket[3])
+                rows.append((server_id, metric, resolution, bucket[0], average, bucket[3]))
+                bucket = None
+            if bucket is None:
+                self._buckets[(server_id, metric, resolution)] = [start, total, count, peak]
+            else:
+                bucket[1] += total
+                bucket[2] += count
+                bucket[3] = max(bucket[3], peak)
+        return rows
+
+    # Recharger les agrégats enregistrés (lignes triées par horodatage)
+    def restore(self, rows):
+        for server_id, metric, resolution, t, value, peak in rows:
+            if metric not in HISTORY_METRICS:
+                continue
+            rings = self._rings(server_id, metric)
+            if resolution in rings:
+                rings[resolution].append(t, value, peak)
+
+    # Points d'une métrique sur une période (résolution choisie selon la durée)
+    def query(self, server_id, metric, period, now=None):
+        now = time.time() if now is None else now
+        rings = self._series.get((server_id, metric))
+        if rings is None:
+            return 0, []
+        if period <= HISTORY_RAW_POINTS * self.sample_interval:
+            resolution = 0
+        elif period <= HISTORY_MINUTE_POINTS * 60:
+            resolution = 60
+        else:
+            resolution = 3600
+        return resolution, rings[resolution].since(now - period)
+
+    def forget(self, server_id):
+        for key in [key for key in self._series if key[0] == server_id]:
+            del self._series[key]
+            self._counters.pop(key, None)
+        for key in [key for key in self._buckets if key[0] == server_id]:
+            del self._buckets[key]
+        self._last_sample.pop(server_id, None)
+
+# Historique partagé
+resource_history = ResourceHistory(state_store)
+
+# Fonction pour dessiner un graphique d'historique (appelée dans un thread)
+def render_history_chart(title, unit, resolution, points):
+    # Import différé: matplotlib n'est chargé qu'au premier graphique
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import matplotlib.dates as mdates
+    
+    times = [datetime.datetime.fromtimestamp(t) for t, _, _ in points]
+    figure, axis = plt.subplots(figsize=(8, 3.5), dpi=100)
+    try:
+        axis.plot(times, [value for _, value, _ in points], color="#5865F2", linewidth=1.5, label="Moyenne")
+        if resolution:
+            axis.plot(times, [peak for _, _, peak in points], color="#ED4245", linewidth=0.8, alpha=0.6, label="Pic")
+            axis.legend(loc="upper left", fontsize=8)
+        axis.set_title(title)
+        axis.set_ylabel(unit)
+        axis.set_ylim(bottom=0)
+        axis.grid(alpha=0.3)
+        axis.xaxis.set_major_formatter(mdates.DateFormatter("%d/%m %H:%M"))
+        figure.autofmt_xdate()
+        figure.tight_layout()
+        
+        buffer = io.BytesIO()
+        figure.savefig(buffer, format="png")
+        buffer.seek(0)
+        return buffer
+    finally:
+        plt.close(figure)
+
+# Fonction pour appliquer le résultat d'une vérification (état, notifications)
+async def apply_poll_result(channel, server_id, server_info, result):
+    if result["unknown"]:
+        mark_server_unknown(server_id)
+        return
+    
+    if result["error"]:
+        log_event(logging.WARNING, "poll.error", result["error"], server=server_id)
+    
+    resources = result["resources"]
+    if resources is None:
+        return
+    
+    # Mettre à jour les ressources de la fiche et l'historique
+    fleet.update(server_id, resources=resources)
+    resource_history.record(server_id, resources.get("resources", {}))
+    
+    # Mettre à jour le statut actuel
+    with perf.measure("diff", server_id):
+        await update_server_status(channel, server_id, server_info, resources.get("current_state"))
+    
+    logs = result["logs"]
+    if logs is None:
+        return
+    
+    # Afficher quelques logs pour débogage (LOG_LEVEL=DEBUG)
+    if logger.isEnabledFor(logging.DEBUG):
+        log_event(
+            logging.DEBUG, "poll.console", f"--- Logs du serveur {server_info['name']} ---",
+            server=server_id, lines=[log.get("attributes", {}).get("content", "") for log in logs[:3]]
+        )
+    
+    # Analyser uniquement les nouvelles lignes pour détecter les connexions/déconnexions
+    cursor = log_cursors.setdefault(server_id, LogCursor())
+    with perf.measure("diff", server_id):
+        new_lines = cursor.advance([log.get("attributes", {}).get("content", "") for log in logs])
+    if new_lines:
+        state_store.set_log_cursor(server_id, cursor.anchor)
+        await process_log_lines(channel, server_id, server_info, new_lines)
+
+# Flux websocket de la console d'un serveur
+# Reçoit les lignes de console, les changements d'état et les statistiques en direct,
+# renouvelle le jeton avant expiration et se reconnecte avec un délai croissant.
+class ConsoleStream:
+    def __init__(self, server_id, on_line, on_status=None, on_stats=None):
+        self.server_id = server_id
+        self.on_line = on_line
+        self.on_status = on_status
+        self.on_stats = on_stats
+        self.connected = False
+        self._task = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            except Exception:
+                pass
+        self._task = None
+        self.connected = False
+
+    # Récupérer le jeton et l'URL du websocket auprès du panel
+    async def _fetch_credentials(self):
+        response = await api.get(f"/api/client/servers/{self.server_id}/websocket")
+        if response.status_code != 200:
+            raise RuntimeError(f"Impossible d'obtenir le websocket du serveur {self.server_id}: {response.status_code}")
+        data = response.json().get("data", {})
+        return data["token"], data["socket"]
+
+    async def _run(self):
+        attempt = 0
+        while True:
+            try:
+                token, socket_url = await self._fetch_credentials()
+                ws = await api.ws_connect(socket_url, headers={"Origin": api.base_url}, heartbeat=30)
+                try:
+                    await ws.send_json({"event": "auth", "args": [token]})
+                    async for msg in ws:
+                        if msg.type != aiohttp.WSMsgType.TEXT:
+                            continue
+                        payload = json.loads(msg.data)
+                        event = payload.get("event")
+                        args = payload.get("args") or []
+                        
+                        if event == "auth success":
+                            self.connected = True
+                            attempt = 0
+                            log_event(logging.INFO, "stream.connected", f"🔌 Console du serveur {self.server_id} suivie en direct", server=self.server_id)
+                        elif event == "console output":
+                            for arg in args:
+                                for line in str(arg).splitlines():
+                                    await self.on_line(self.server_id, line)
+                        elif event == "status" and self.on_status and args:
+                            await self.on_status(self.server_id, args[0])
+                        elif event == "stats" and self.on_stats and args:
+                            await self.on_stats(self.server_id, json.loads(args[0]))
+                        elif event == "token expiring":
+                            # Renouveler le jeton sans couper la connexion
+                            token, _ = await self._fetch_credentials()
+                            await ws.send_json({"event": "auth", "args": [token]})
+                        elif event in ("token expired", "jwt error"):
+                            break
+                finally:
+                    self.connected = False
+                    await ws.close()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log_event(
+                    logging.WARNING, "stream.interrupted",
+                    f"⚠️ Flux console du serveur {self.server_id} interrompu: {str(e) or type(e).__name__}",
+                    server=self.server_id
+                )
+            
+            # Reconnexion avec un délai exponentiel (et un peu d'aléa)
+            delay = min(STREAM_RECONNECT_MAX_DELAY, 2 ** attempt) + random.uniform(0, 1)
+            attempt += 1
+            await asyncio.sleep(delay)
+
+# Gestionnaire des flux de console (un websocket par serveur en ligne)
+class ConsoleStreamManager:
+    def __init__(self):
+        self.streams = {}
+
+    def is_live(self, server_id):
+        stream = self.streams.get(server_id)
+        return stream is not None and stream.connected
+
+    # Démarrer les flux des serveurs en ligne et arrêter les autres
+    async def sync(self, running_ids):
+        running_ids = set(running_ids)
+        for server_id in list(self.streams):
+            if server_id not in running_ids:
+                await self.streams.pop(server_id).stop()
+        for server_id in running_ids:
+            if server_id not in self.streams:
+                stream = ConsoleStream(server_id, on_stream_line, on_stream_status, on_stream_stats)
+                self.streams[server_id] = stream
+                stream.start()
+
+    async def stop_all(self):
+        for server_id in list(self.streams):
+            await self.streams.pop(server_id).stop()
+
+# Flux de console actifs
+console_streams = ConsoleStreamManager()
+
+# Callback: nouvelle ligne de console reçue par websocket
+async def on_stream_line(server_id, line):
+    channel = bot.get_channel(NOTIFICATION_CHANNEL_ID)
+    server_info = fleet.servers.get(server_id)
+    if channel and server_info:
+        # Tenir le curseur à jour pour que le prochain /logs ne ré-analyse pas cette ligne
+        cursor = log_cursors.setdefault(server_id, LogCursor())
+        cursor.mark_seen([line])
+        state_store.set_log_cursor(server_id, cursor.anchor)
+        await process_log_lines(channel, server_id, server_info, [line])
+        fleet.publish()
+
+# Callback: changement d'état reçu par websocket
+async def on_stream_status(server_id, status):
+    channel = bot.get_channel(NOTIFICATION_CHANNEL_ID)
+    server_info = fleet.get(server_id)
+    if channel and server_info:
+        fleet.update(server_id, resources={**(server_info.get("resources") or {}), "current_state": status})
+        await update_server_status(channel, server_id, server_info, status)
+        fleet.publish()
+
+# Callback: statistiques reçues par websocket (même format que /resources)
+# Fréquentes: publiées avec le prochain passage du planificateur plutôt qu'une par une
+async def on_stream_stats(server_id, stats):
+    server_info = fleet.get(server_id)
+    if not server_info:
+        return
+    network = stats.get("network", {})
+    usage = {
+        "memory_bytes": stats.get("memory_bytes", 0),
+        "cpu_absolute": stats.get("cpu_absolute", 0),
+        "disk_bytes": stats.get("disk_bytes", 0),
+        "network_rx_bytes": network.get("rx_bytes", 0),
+        "network_tx_bytes": network.get("tx_bytes", 0),
+        "uptime": stats.get("uptime", 0)
+    }
+    fleet.update(server_id, resources={**(server_info.get("resources") or {}), "resources": usage})
+    resource_history.record(server_id, usage)
+
+# Sondes de requête des jeux (liste des joueurs de référence)
+# Interrogent directement le port du jeu (allocation par défaut) avec le protocole du profil:
+# Minecraft Server List Ping (TCP) ou Query (UDP), Steam A2S (UDP) ou RCON Source (TCP).
+# Le résultat sert à corriger les joueurs détectés dans la console (ligne manquée, crash...).
+QueryResult = namedtuple("QueryResult", ["online", "max_players", "players"])  # players: None si noms inconnus
+
+# Protocole UDP: conserve les datagrammes reçus pour les lire un par un
+class UdpQueryProtocol(asyncio.DatagramProtocol):
+    def __init__(self):
+        self.packets = asyncio.Queue()
+
+    def datagram_received(self, data, addr):
+        self.packets.put_nowait(data)
+
+    def error_received(self, exc):
+        self.packets.put_nowait(exc)
+
+# Fonction pour échanger des datagrammes UDP avec un serveur de jeu
+# `exchange(data)` envoie un datagramme et retourne la réponse suivante
+@contextlib.asynccontextmanager
+async def udp_session(host, port):
+    transport, protocol = await asyncio.get_running_loop().create_datagram_endpoint(
+        UdpQueryProtocol, remote_addr=(host, port)
+    )
+    
+    async def exchange(data):
+        transport.sendto(data)
+        packet = await protocol.packets.get()
+        if isinstance(packet, Exception):
+            raise packet
+        return packet
+    
+    try:
+        yield exchange
+    finally:
+        transport.close()
+
+# Lecture séquentielle d'un paquet binaire (chaînes terminées par un octet nul)
+class PacketReader:
+    def __init__(self, data, offset=0):
+        self.data = data
+        self.offset = offset
+
+    def unpack(self, fmt):
+        values = struct.unpack_from(fmt, self.data, self.offset)
+        self.offset += struct.calcsize(fmt)
+        return values if len(values) > 1 else values[0]
+
+    def string(self):
+        end = self.data.index(b"\x00", self.offset)
+        value = self.data[self.offset:end].decode("utf-8", "replace")
+        self.offset = end + 1
+        return value
+
+# Fonction pour encoder un entier au format VarInt de Minecraft
+def minecraft_varint(value):
+    value &= 0xFFFFFFFF
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        out.append(byte | (0x80 if value else 0))
+        if not value:
+            return bytes(out)
+
+# Fonction pour lire un VarInt de Minecraft dans un flux TCP
+async def read_minecraft_varint(reader):
+    value = 0
+    for shift in range(0, 35, 7):
+        byte = (await reader.readexactly(1))[0]
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value
+    raise ValueError("VarInt trop long")
+
+# Fonction pour interroger un serveur Minecraft (Server List Ping, TCP)
+# La liste `sample` n'est complète que si elle contient tous les joueurs en ligne.
+async def query_minecraft_ping(host, port, settings):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        address = host.encode("utf-8")
+        handshake = (
+            b"\x00" + minecraft_varint(-1) + minecraft_varint(len(address)) + address
+            + struct.pack(">H", port) + minecraft_varint(1)
+        )
+        writer.write(minecraft_varint(len(handshake)) + handshake + b"\x01\x00")
+        await writer.drain()
+        
+        await read_minecraft_varint(reader)  # Longueur du paquet
+        if await read_minecraft_varint(reader) != 0:
+            raise ValueError("Réponse de statut inattendue")
+        payload = await reader.readexactly(await read_minecraft_varint(reader))
+    finally:
+        writer.close()
+    
+    players = json.loads(payload.decode("utf-8")).get("players", {})
+    online = players.get("online", 0)
+    sample = players.get("sample") or []
+    names = [player.get("name", "") for player in sample]
+    # Liste tronquée (12 joueurs au plus) ou anonymisée (hide-online-players): noms inconnus
+    complete = len(names) == online and all(names) and not any(player.get("id") == "00000000-0000-0000-0000-000000000000" for player in sample)
+    return QueryResult(online, players.get("max", 0), names if complete else None)
+
+# Fonction pour interroger un serveur Minecraft (protocole Query, UDP, enable-query=true)
+async def query_minecraft_query(host, port, settings):
+    session_id = random.getrandbits(32) & 0x0F0F0F0F
+    async with udp_session(host, port) as exchange:
+        response = await exchange(b"\xfe\xfd\x09" + struct.pack(">I", session_id))
+        challenge = int(PacketReader(response, 5).string())
+        response = await exchange(b"\xfe\xfd\x00" + struct.pack(">Ii", session_id, challenge) + b"\x00" * 4)
+    
+    # En-tête (5 octets) puis « splitnum » (11 octets), paires clé/valeur et liste des joueurs
+    packet = PacketReader(response, 16)
+    info = {}
+    while True:
+        key = packet.string()
+        if not key:
+            break
+        info[key] = packet.string()
+    packet.offset += 10  # « \x01player_\x00\x00 »
+    players = []
+    while packet.offset < len(response):
+        name = packet.string()
+        if not name:
+            break
+        players.append(name)
+    return QueryResult(int(info.get("numplayers", len(players))), int(info.get("maxplayers", 0)), players)
+
+# Fonction pour envoyer une requête A2S (répétée avec le challenge si le serveur en demande un)
+async def a2s_request(exchange, request, challenge=b""):
+    response = await exchange(request + challenge)
+    if response[:5] == b"\xff\xff\xff\xff\x41":
+        response = await exchange(request + response[5:9])
+    if response[:4] == b"\xfe\xff\xff\xff":
+        raise ValueError("Réponse A2S fragmentée non prise en charge")
+    return response
+
+# Fonction pour interroger un serveur Steam (A2S_INFO puis A2S_PLAYER, UDP)
+async def query_a2s(host, port, settings):
+    async with udp_session(host, port) as exchange:
+        response = await a2s_request(exchange, b"\xff\xff\xff\xffTSource Engine Query\x00")
+        if response[4:5] != b"\x49":
+            raise ValueError("Réponse A2S_INFO inattendue")
+        packet = PacketReader(response, 6)
+        for _ in range(4):  # Nom, carte, dossier, jeu
+            packet.string()
+        packet.unpack("<h")  # ID de l'application
+        online, max_players, bots = packet.unpack("<BBB")
+        
+        try:
+            response = await a2s_request(exchange, b"\xff\xff\xff\xff\x55", b"\xff\xff\xff\xff")
+        except ValueError:
+            return QueryResult(online - bots, max_players, None)
+    
+    if response[4:5] != b"\x44":
+        return QueryResult(online - bots, max_players, None)
+    packet = PacketReader(response, 5)
+    players = []
+    for _ in range(packet.unpack("<B")):
+        packet.unpack("<B")  # Index
+        name = packet.string()
+        packet.unpack("<lf")  # Score, durée
+        players.append(name)
+    # Les joueurs en cours de connexion apparaissent sans nom: liste incomplète
+    return QueryResult(online - bots, max_players, players if all(players) else None)
+
+# Fonction pour envoyer un paquet RCON Source et lire la réponse correspondante
+async def rcon_exchange(reader, writer, request_id, packet_type, body):
+    payload = struct.pack("<ii", request_id, packet_type) + body.encode("utf-8") + b"\x00\x00"
+    writer.write(struct.pack("<i", len(payload)) + payload)
+    await writer.drain()
+    while True:
+        size = struct.unpack("<i", await reader.readexactly(4))[0]
+        packet = await reader.readexactly(size)
+        response_id, response_type = struct.unpack_from("<ii", packet)
+        # Ignorer la réponse vide envoyée par certains serveurs avant celle de l'authentification
+        if packet_type == 3 and response_type == 0:
+            continue
+        return response_id, packet[8:-2].decode("utf-8", "replace")
+
+# Fonction pour interroger un serveur par RCON Source (commande et expression du profil)
+async def query_rcon(host, port, settings):
+    if not settings.get("password"):
+        raise ValueError("Mot de passe RCON non configuré")
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        response_id, _ = await rcon_exchange(reader, writer, 1, 3, settings["password"])
+        if response_id == -1:
+            raise ValueError("Mot de passe RCON refusé")
+        _, text = await rcon_exchange(reader, writer, 2, 2, settings.get("command", "status"))
+    finally:
+        writer.close()
+    
+    players = [match.group("player").strip() for match in re.finditer(settings.get("player", r'^#\s*\d+\s+"(?P<player>[^"]+)"'), text, re.MULTILINE)]
+    return QueryResult(len(players), 0, players)
+
+# Protocoles de requête disponibles dans les profils de jeux (clé `query.protocol`)
+QUERY_PROTOCOLS = {
+    "minecraft": query_minecraft_ping,
+    "minecraft_query": query_minecraft_query,
+    "a2s": query_a2s,
+    "rcon": query_rcon
+}
+
+# Sondes des serveurs en ligne et rapprochement avec les joueurs détectés dans la console
+# Le port est lu dans une variable de démarrage du serveur (`port_variable`), fixé (`port`)
+# ou déduit de l'allocation par défaut (`port_offset`). Un écart n'est corrigé que s'il
+# est confirmé par deux sondes consécutives, pour ne pas réagir à un joueur en cours de
+# connexion ou à une ligne de console pas encore lue.
+class GameQueryProber:
+    STARTUP_TTL = 900  # Durée de validité des variables de démarrage en cache (secondes)
+
+    def __init__(self, timeout=GAME_QUERY_TIMEOUT):
+        self.timeout = timeout
+        self._startup = {}  # server_id -> (horodatage, {variable: valeur})
+        self._suspects = {}  # server_id -> ({arrivées}, {départs}) de la sonde précédente
+
+    # Variables de démarrage d'un serveur (port de requête, mot de passe RCON...)
+    async def startup_variables(self, server_id):
+        cached = self._startup.get(server_id)
+        if cached is not None and time.monotonic() - cached[0] < self.STARTUP_TTL:
+            return cached[1]
+        response = await api.get(f"/api/client/servers/{server_id}/startup")
+        if response.status_code != 200:
+            raise ValueError(f"Variables de démarrage indisponibles: code {response.status_code}")
+        variables = {
+            item.get("attributes", {}).get("env_variable"): item.get("attributes", {}).get("server_value")
+            for item in response.json().get("data", [])
+        }
+        self._startup[server_id] = (time.monotonic(), variables)
+        return variables
+
+    # Adresse et réglages de la sonde d'un serveur (None si son jeu n'a pas de sonde)
+    async def target(self, server_id, server_info):
+        game = game_profiles.resolve(server_id, server_info)
+        settings = dict(game_profiles.profiles.get(game, {}).get("query") or {})
+        if settings.get("protocol") not in QUERY_PROTOCOLS:
+            return None
+        allocation = next((alloc for alloc in server_info.get("allocations", []) if alloc.get("is_default")), None)
+        if allocation is None:
+            return None
+        host = allocation.get("alias") or allocation.get("ip")
+        port = settings.get("port") or allocation.get("port", 0) + settings.get("port_offset", 0)
+        
+        if settings.get("port_variable") or settings.get("password_variable"):
+            variables = await self.startup_variables(server_id)
+            if str(variables.get(settings.get("port_variable")) or "").isdigit():
+                port = int(variables[settings["port_variable"]])
+            if variables.get(settings.get("password_variable")):
+                settings["password"] = variables[settings["password_variable"]]
+        return host, int(port), settings
+
+    # Interroger un serveur (None si son jeu n'a pas de sonde)
+    async def probe(self, server_id, server_info):
+        target = await self.target(server_id, server_info)
+        if target is None:
+            return None
+        host, port, settings = target
+        result = await asyncio.wait_for(QUERY_PROTOCOLS[settings["protocol"]](host, port, settings), self.timeout)
+        # Noms différents de ceux de la console (ex: SteamID dans les logs): seul le nombre compte
+        if settings.get("names") is False:
+            result = result._replace(players=None)
+        return result
+
+    # Corrections à appliquer (joueurs arrivés, joueurs partis) confirmées par deux sondes
+    def drift(self, server_id, known, result):
+        if result.players is not None:
+            online = set(result.players)
+            joined = online - set(known)
+            left = set(known) - online
+        elif result.online == 0:
+            joined, left = set(), set(known)
+        else:
+            joined, left = set(), set()
+        
+        previous_joined, previous_left = self._suspects.get(server_id, (set(), set()))
+        self._suspects[server_id] = (joined, left)
+        return sorted(joined & previous_joined), sorted(left & previous_left)
+
+    def forget(self, server_id):
+        self._startup.pop(server_id, None)
+        self._suspects.pop(server_id, None)
+
+# Sondes partagées
+game_queries = GameQueryProber()
+
+# Fonction pour sonder un serveur et corriger la liste de ses joueurs
+async def reconcile_players(channel, server_id, server_info, semaphore):
+    async with semaphore:
+        try:
+            result = await game_queries.probe(server_id, server_info)
+        except Exception as e:
+            metrics.inc("pterobot_game_queries_total", result="error")
+            log_event(
+                logging.DEBUG, "query.failed", f"Sonde du serveur {server_info['name']} en échec: {str(e) or type(e).__name__}",
+                server=server_id
+            )
+            return
+    if result is None:
+        return
+    metrics.inc("pterobot_game_queries_total", result="ok")
+    fleet.update(server_id, query={"online": result.online, "max": result.max_players})
+    
+    # Joueurs confirmés par la sonde: repousser leur expiration
+    sessions = connected_players.get(server_id, {})
+    if result.players is not None or result.online >= len(sessions):
+        now = time.monotonic()
+        for player in sessions.keys() if result.players is None else sessions.keys() & set(result.players):
+            sessions[player].seen_at = now
+    
+    # Un serveur peut s'être arrêté pendant la sonde
+    if fleet.get(server_id, {}).get("status") != "running":
+        return
+    joined, left = game_queries.drift(server_id, connected_players.get(server_id, {}), result)
+    if not (joined or left):
+        return
+    log_event(
+        logging.INFO, "query.reconciled",
+        f"🔁 Joueurs de {server_info['name']} corrigés d'après la sonde du jeu: +{len(joined)} / -{len(left)}",
+        server=server_id, joined=joined, left=left
+    )
+    now = time.monotonic()
+    await process_player_events(
+        channel, server_id, server_info,
+        [PlayerEvent("leave", player, now) for player in left] + [PlayerEvent("join", player, now) for player in joined]
+    )
+
+# Task: Sonder les serveurs en ligne avec le protocole de leur jeu
+@tasks.loop(seconds=max(GAME_QUERY_INTERVAL, 1))
+async def query_game_servers():
+    try:
+        channel = bot.get_channel(NOTIFICATION_CHANNEL_ID)
+        if not channel:
+            return
+        semaphore = asyncio.Semaphore(GAME_QUERY_CONCURRENCY)
+        await asyncio.gather(*[
+            reconcile_players(channel, server_id, server_info, semaphore)
+            for server_id, server_info in fleet.servers.items()
+            if server_info.get("status") == "running"
+        ])
+        fleet.publish()
+    except Exception as e:
+        log_event(logging.ERROR, "query.loop_failed", f"Erreur lors des sondes des jeux: {str(e)}", exc_info=True)
+
+# Task: Oublier les sessions de joueurs périmées
+@tasks.loop(minutes=5)
+async def expire_player_sessions():
+    try:
+        evict_stale_players()
+    except Exception as e:
+        log_event(logging.ERROR, "player.expire_failed", f"Erreur lors de l'oubli des joueurs périmés: {str(e)}", exc_info=True)
+
+# Planificateur adaptatif des vérifications
+# Chaque serveur a sa propre échéance (file de priorité): vérification rapprochée pendant
+# un démarrage/arrêt ou quand des joueurs sont connectés, espacée pour un serveur éteint
+# depuis longtemps. Un peu d'aléa évite que tous les serveurs tombent sur le même passage.
+class PollScheduler:
+    def __init__(self):
+        self._heap = []  # (échéance, server_id)
+        self._next = {}  # server_id -> échéance actuelle
+        self._offline_streak = {}  # server_id -> nombre de vérifications consécutives hors ligne
+        self.lag = 0  # Retard (secondes) du serveur le plus en retard au dernier passage
+
+    # Intervalle avant la prochaine vérification d'un serveur
+    def interval_for(self, server_id, server_info):
+        status = server_info.get("status")
+        if status in ("starting", "stopping"):
+            interval = max(SCHEDULER_TICK, CHECK_INTERVAL / 6)
+        elif status == "running":
+            interval = CHECK_INTERVAL / 2 if server_info.get("players") else CHECK_INTERVAL
+        elif status == "offline":
+            streak = self._offline_streak.get(server_id, 0)
+            interval = min(OFFLINE_MAX_INTERVAL, CHECK_INTERVAL * 2 ** min(streak, 10))
+        else:
+            interval = CHECK_INTERVAL
+        return max(SCHEDULER_TICK, interval * random.uniform(1 - POLL_JITTER, 1 + POLL_JITTER))
+
+    # Programmer la prochaine vérification d'un serveur après une vérification
+    def schedule(self, server_id, server_info, now):
+        if server_info.get("status") == "offline":
+            self._offline_streak[server_id] = self._offline_streak.get(server_id, 0) + 1
+        else:
+            self._offline_streak.pop(server_id, None)
+        
+        due_at = now + self.interval_for(server_id, server_info)
+        self._next[server_id] = due_at
+        heapq.heappush(self._heap, (due_at, server_id))
+
+    # Serveurs à vérifier maintenant (les nouveaux serveurs sont vérifiés immédiatement)
+    def due(self, server_ids, now):
+        due = {server_id for server_id in server_ids if server_id not in self._next}
+        self.lag = 0
+        while self._heap and self._heap[0][0] <= now:
+            due_at, server_id = heapq.heappop(self._heap)
+            # Ignorer les entrées périmées (serveur reprogrammé ou retiré)
+            if self._next.get(server_id) == due_at and server_id in server_ids:
+                due.add(server_id)
+                self.lag = max(self.lag, now - due_at)
+        return due
+
+    # Oublier un serveur retiré de l'inventaire
+    def forget(self, server_id):
+        self._next.pop(server_id, None)
+        self._offline_streak.pop(server_id, None)
+
+# Planificateur partagé
+poll_scheduler = PollScheduler()
+
+# Task: Vérifier l'état des serveurs
+# Avec le planificateur adaptatif, la tâche se réveille toutes les SCHEDULER_TICK secondes
+# et ne vérifie que les serveurs arrivés à échéance (`full=True` pour tout vérifier).
+@tasks.loop(seconds=SCHEDULER_TICK if ADAPTIVE_POLLING else CHECK_INTERVAL)
+async def check_server_status(full=False):
+    global poll_lock
+    
+    try:
+        channel = bot.get_channel(NOTIFICATION_CHANNEL_ID)
+        if not channel:
+            log_event(logging.ERROR, "discord.channel_missing", f"❌ Canal de notification introuvable (ID: {NOTIFICATION_CHANNEL_ID})")
+            return
+        
+        if poll_lock is None:
+            poll_lock = asyncio.Lock()
+        
+        async with poll_lock:
+            # Restauration reportée faute d'inventaire au démarrage
+            if not await restore_state_when_ready():
+                return
+            
+            # Prendre en compte une modification du fichier de profils de jeux
+            game_profiles.reload_if_changed()
+            
+            # Instantané du passage (publie aussi les statistiques reçues par websocket)
+            snapshot = fleet.publish()
+            servers = list(snapshot.servers.items())
+            now = time.monotonic()
+            if ADAPTIVE_POLLING and not full:
+                due = poll_scheduler.due(snapshot.servers, now)
+                servers = [(server_id, server_info) for server_id, server_info in servers if server_id in due]
+                if not servers:
+                    return
+            log_event(logging.DEBUG, "poll.tick", f"Vérification de l'état des serveurs ({len(servers)} serveurs)...", servers=len(servers))
+            tick_started = time.monotonic()
+            perf.begin_tick()
+            
+            # Interroger tous les serveurs en parallèle, avec une limite de requêtes simultanées
+            # et une échéance commune à tout le passage
+            semaphore = asyncio.Semaphore(POLL_CONCURRENCY)
+            deadline = api.batch_deadline()
+            # États des serveurs des nœuds Wings configurés: une requête par nœud
+            bulk = await wings.collect(servers, deadline) if wings.nodes else {}
+            results = await asyncio.gather(*[
+                poll_server(server_id, semaphore, deadline, bulk.get(server_id)) for server_id, _ in servers
+            ])
+            
+            # Appliquer les résultats et envoyer les notifications dans l'ordre des serveurs
+            for (server_id, server_info), result in zip(servers, results):
+                try:
+                    await apply_poll_result(channel, server_id, server_info, result)
+                except Exception as e:
+                    log_event(
+                        logging.ERROR, "poll.apply_failed", f"Erreur lors de la vérification du serveur {server_id}: {str(e)}",
+                        exc_info=True, server=server_id
+                    )
+                poll_scheduler.schedule(server_id, fleet.get(server_id, server_info), now)
+            
+            # Publier tous les résultats du passage d'un seul coup
+            fleet.publish()
+            report_breakers(channel)
+            
+            tick_duration = time.monotonic() - tick_started
+            metrics.observe("pterobot_tick_duration_seconds", tick_duration)
+            perf.end_tick(tick_duration, len(servers))
+            await perf.write_file()
+            
+            # Ouvrir/fermer les flux de console selon les serveurs en ligne
+            if CONSOLE_STREAMING:
+                await console_streams.sync([
+                    server_id for server_id, server_info in fleet.servers.items() if server_info.get("status") == "running"
+                ])
+    
+    except Exception as e:
+        log_event(logging.ERROR, "poll.failed", f"Erreur lors de la vérification des serveurs: {str(e)}", exc_info=True)
+
 # Task: Rafraîchir la liste des serveurs périodiquement
 @tasks.loop(minutes=15)
 async def refresh_servers_list():
-    print("Actualisation périodique de la liste des serveurs...")
-    await fetch_servers()
+    log_event(logging.DEBUG, "inventory.refresh", "Actualisation périodique de la liste des serveurs...")
+    await refresh_inventory()
+
+# Fonction pour calculer les jauges de la flotte et du bot (appelée à chaque lecture de /metrics)
+def collect_fleet_metrics():
+    cpu, memory, disk, up, players = [], [], [], [], []
+    servers = fleet.servers
+    for server_id, server_info in servers.items():
+        labels = {"server": server_id, "name": server_info.get("name", "")}
+        status = server_info.get("status")
+        up.append((labels, 1 if status == "running" else 0))
+        players.append((labels, len(connected_players.get(server_id, {}))))
+        res = server_info.get("resources", {}).get("resources")
+        if status == "running" and res:
+            cpu.append((labels, res.get("cpu_absolute", 0)))
+            memory.append((labels, res.get("memory_bytes", 0)))
+            disk.append((labels, res.get("disk_bytes", 0)))
+    
+    usage = api.governor.snapshot()
+    return [
+        ("pterobot_server_up", "1 si le serveur est en ligne", up),
+        ("pterobot_server_cpu_percent", "Utilisation CPU du serveur (%)", cpu),
+        ("pterobot_server_memory_bytes", "Mémoire utilisée par le serveur", memory),
+        ("pterobot_server_disk_bytes", "Disque utilisé par le serveur", disk),
+        ("pterobot_server_players", "Joueurs connectés au serveur", players),
+        ("pterobot_servers", "Serveurs dans l'inventaire", [({}, len(servers))]),
+        ("pterobot_notification_queue_depth", "Notifications Discord en attente d'envoi", [({}, outbox.depth())]),
+        ("pterobot_poll_lag_seconds", "Retard du serveur le plus en retard au dernier passage", [({}, poll_scheduler.lag)]),
+        ("pterobot_api_tokens_available", "Requêtes disponibles dans le budget de l'API", [({}, usage["available"])]),
+        ("pterobot_console_streams", "Flux de console websocket connectés", [({}, sum(1 for stream in console_streams.streams.values() if stream.connected))]),
+        ("pterobot_circuit_open", "1 si le disjoncteur du panel ou d'un nœud est ouvert", [
+            ({"target": "panel" if breaker is panel_breaker else node}, 0 if breaker.state == "closed" else 1)
+            for node, breaker in [(None, panel_breaker)] + list(node_breakers.items())
+        ]),
+    ]
+
+metrics.add_collector(collect_fleet_metrics)
+
+# Serveur HTTP de l'endpoint /metrics (dans la boucle du bot)
+metrics_runner = None
+
+# Fonction pour démarrer l'endpoint /metrics si METRICS_PORT est défini
+async def start_metrics_server():
+    global metrics_runner
+    if not METRICS_PORT or metrics_runner is not None:
+        return
+    
+    async def handle_metrics(request):
+        return web.Response(text=metrics.render(), content_type="text/plain", charset="utf-8", headers={"X-Content-Type-Options": "nosniff"})
+    
+    app = web.Application()
+    app.router.add_get("/metrics", handle_metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    try:
+        await web.TCPSite(runner, METRICS_HOST, METRICS_PORT).start()
+    except OSError as e:
+        log_event(logging.ERROR, "metrics.bind_failed", f"❌ Impossible d'ouvrir l'endpoint /metrics sur le port {METRICS_PORT}: {str(e)}", port=METRICS_PORT)
+        await runner.cleanup()
+        return
+    metrics_runner = runner
+    log_event(logging.INFO, "metrics.started", f"📈 Métriques Prometheus disponibles sur http://{METRICS_HOST}:{METRICS_PORT}/metrics", port=METRICS_PORT)
+
+# Fonction pour arrêter l'endpoint /metrics
+async def stop_metrics_server():
+    global metrics_runner
+    if metrics_runner is not None:
+        await metrics_runner.cleanup()
+        metrics_runner = None
+
+# Fonction pour calculer l'empreinte du contenu significatif d'un message de statut
+# (état, ressources arrondies par paliers, joueurs): le message n'est modifié que si
+# l'empreinte change, les horodatages de l'embed ne comptent pas.
+def status_fingerprint(server_info):
+    resources = server_info.get("resources", {})
+    status = resources.get("current_state", "offline")
+    fingerprint = [
+        status,
+        server_info.get("name"),
+        server_info.get("node"),
+        server_info.get("description"),
+        tuple((alloc.get("alias") or alloc.get("ip"), alloc.get("port")) for alloc in server_info.get("allocations", []) if alloc.get("is_default"))
+    ]
+    
+    if status == "running" and resources.get("resources"):
+        res = resources["resources"]
+        limits = server_info.get("limits", {})
+        fingerprint.append(int(res.get("cpu_absolute", 0) // STATUS_RESOURCE_BUCKET))
+        for key, limit_key in (("memory_bytes", "memory"), ("disk_bytes", "disk")):
+            used = res.get(key, 0)
+            limit = limits.get(limit_key, 0)
+            if limit:
+                fingerprint.append(int(used * 100 / (limit * 1024 * 1024) // STATUS_RESOURCE_BUCKET))
+            else:
+                # Sans limite: paliers de 256 Mo
+                fingerprint.append(int(used // (256 * 1024 * 1024)))
+        fingerprint.append(tuple(sorted(server_info.get("players", {}))))
+        fingerprint.append(tuple(sorted((server_info.get("query") or {}).items())))
+    
+    return tuple(fingerprint)
+
+# Fonction pour enregistrer un message de statut posté
+def remember_status_message(server_id, message, fingerprint):
+    entry = status_messages.get(server_id)
+    if entry is None or entry.message.id != message.id:
+        state_store.set_status_message(server_id, message)
+    status_messages[server_id] = StatusMessage(message, fingerprint)
+
+# Fonction pour supprimer des messages par lots (100 max par appel, messages de moins de 14 jours)
+async def bulk_delete_messages(channel, messages):
+    messages = [message for message in messages if message is not None]
+    for i in range(0, len(messages), 100):
+        chunk = messages[i:i + 100]
+        try:
+            await channel.delete_messages(chunk)
+        except discord.HTTPException:
+            # Messages trop anciens pour la suppression groupée: les supprimer un par un
+            for message in chunk:
+                try:
+                    await message.delete()
+                except discord.HTTPException:
+                    pass
+
+# Fonction pour découper la flotte en pages du tableau de bord
+# (10 embeds maximum et 6000 caractères maximum par message Discord)
+def build_dashboard_pages(servers):
+    pages = []
+    current, current_ids, size = [], [], 0
+    for server_id, server_info in servers.items():
+        embed = create_server_compact_embed(server_id, server_info)
+        if current and (len(current) >= DASHBOARD_PAGE_SIZE or size + len(embed) > 5500):
+            pages.append((current, current_ids))
+            current, current_ids, size = [], [], 0
+        current.append(embed)
+        current_ids.append(server_id)
+        size += len(embed)
+    if current:
+        pages.append((current, current_ids))
+    return pages
+
+# Fonction pour publier ou mettre à jour le tableau de bord (plusieurs serveurs par message)
+# Seules les pages dont le contenu a changé sont modifiées.
+async def update_dashboard(channel):
+    servers = fleet.servers
+    with perf.measure("render"):
+        pages = build_dashboard_pages(servers)
+    updated_at = datetime.datetime.now().strftime("%H:%M:%S")
+    
+    for index, (embeds, server_ids) in enumerate(pages):
+        fingerprint = tuple((server_id, status_fingerprint(servers[server_id])) for server_id in server_ids)
+        page = dashboard_pages[index] if index < len(dashboard_pages) else None
+        if page and page.fingerprint == fingerprint:
+            continue
+        
+        embeds[-1].set_footer(text=f"Page {index + 1}/{len(pages)} · Dernière mise à jour: {updated_at}")
+        message = None
+        if page:
+            try:
+                message = await page.message.edit(embeds=embeds) or page.message
+            except discord.NotFound:
+                message = None
+        if message is None:
+            message = await channel.send(embeds=embeds)
+        
+        entry = StatusMessage(message, fingerprint)
+        if page is None or page.message.id != message.id:
+            state_store.set_dashboard_page(index, message)
+        if page:
+            dashboard_pages[index] = entry
+        else:
+            dashboard_pages.append(entry)
+    
+    # La flotte a rétréci: supprimer les pages en trop
+    if len(dashboard_pages) > len(pages):
+        extra_pages = dashboard_pages[len(pages):]
+        del dashboard_pages[len(pages):]
+        state_store.clear("dashboard_pages")
+        for index, page in enumerate(dashboard_pages):
+            state_store.set_dashboard_page(index, page.message)
+        await bulk_delete_messages(channel, [page.message for page in extra_pages])
 
 # Fonction pour poster immédiatement les statistiques des serveurs
 async def post_server_status_now():
     try:
         channel = bot.get_channel(NOTIFICATION_CHANNEL_ID)
         if not channel:
-            print(f"❌ Canal de notification introuvable (ID: {NOTIFICATION_CHANNEL_ID})")
+            log_event(logging.ERROR, "discord.channel_missing", f"❌ Canal de notification introuvable (ID: {NOTIFICATION_CHANNEL_ID})")
             return False
         
-        # Supprimer les anciens messages de statut
-        for message_id in status_messages.values():
-            try:
-                message = await channel.fetch_message(message_id)
-                await message.delete()
-            except:
-                pass
+        # Supprimer les anciens messages de statut (par lots)
+        await bulk_delete_messages(
+            channel,
+            [entry.message for entry in status_messages.values()] + [page.message for page in dashboard_pages]
+        )
         
         status_messages.clear()
+        dashboard_pages.clear()
+        state_store.clear("status_messages")
+        state_store.clear("dashboard_pages")
+        
+        # Mode tableau de bord: quelques messages regroupant tous les serveurs
+        if DASHBOARD_MODE:
+            await update_dashboard(channel)
+            return True
         
         # Créer un message de statut pour chaque serveur
-        for server_id, server_info in servers_cache.items():
+        for server_id, server_info in fleet.servers.items():
             embed = create_server_status_embed(
                 server_id,
                 server_info,
@@ -1310,12 +4485,12 @@ async def post_server_status_now():
             )
             
             message = await channel.send(embed=embed)
-            status_messages[server_id] = message.id
+            remember_status_message(server_id, message, status_fingerprint(server_info))
         
         return True
     
     except Exception as e:
-        print(f"Erreur lors de la publication des statistiques: {str(e)}")
+        log_event(logging.ERROR, "status.post_failed", f"Erreur lors de la publication des statistiques: {str(e)}", exc_info=True)
         return False
 
 # Task: Publier régulièrement le statut des serveurs
@@ -1324,38 +4499,60 @@ async def post_server_status():
     try:
         channel = bot.get_channel(NOTIFICATION_CHANNEL_ID)
         if not channel:
-            print(f"❌ Canal de notification introuvable (ID: {NOTIFICATION_CHANNEL_ID})")
+            log_event(logging.ERROR, "discord.channel_missing", f"❌ Canal de notification introuvable (ID: {NOTIFICATION_CHANNEL_ID})")
+            return
+        
+        # Ne rien publier avant d'avoir repris les messages déjà postés
+        if not await restore_state_when_ready():
+            return
+        
+        # Mode tableau de bord: modifier uniquement les pages qui ont changé
+        if DASHBOARD_MODE:
+            await update_dashboard(channel)
             return
         
         # Mettre à jour les messages existants ou en créer de nouveaux
-        for server_id, server_info in servers_cache.items():
+        for server_id, server_info in fleet.servers.items():
             try:
+                fingerprint = status_fingerprint(server_info)
+                entry = status_messages.get(server_id)
+                
+                # Rien de significatif n'a changé: ne pas toucher au message
+                if entry and entry.fingerprint == fingerprint:
+                    continue
+                
                 # Créer l'embed mis à jour
-                embed = create_server_status_embed(
-                    server_id,
-                    server_info,
-                    server_info.get("resources", {})
-                )
+                with perf.measure("render", server_id):
+                    embed = create_server_status_embed(
+                        server_id,
+                        server_info,
+                        server_info.get("resources", {})
+                    )
                 
-                # Si un message existe déjà pour ce serveur, le mettre à jour
-                if server_id in status_messages:
+                # Si un message existe déjà pour ce serveur, le modifier directement (sans le récupérer)
+                if entry:
                     try:
-                        message = await channel.fetch_message(status_messages[server_id])
-                        await message.edit(embed=embed)
+                        with perf.measure("send", server_id):
+                            message = await entry.message.edit(embed=embed)
+                        remember_status_message(server_id, message or entry.message, fingerprint)
                         continue
-                    except:
-                        # Message non trouvé, en créer un nouveau
+                    except discord.NotFound:
+                        # Message supprimé, en créer un nouveau
                         pass
                 
                 # Créer un nouveau message
-                message = await channel.send(embed=embed)
-                status_messages[server_id] = message.id
+                with perf.measure("send", server_id):
+                    message = await channel.send(embed=embed)
+                remember_status_message(server_id, message, fingerprint)
             
             except Exception as e:
-                print(f"Erreur lors de la mise à jour du statut du serveur {server_id}: {str(e)}")
+                log_event(
+                    logging.ERROR, "status.update_failed", f"Erreur lors de la mise à jour du statut du serveur {server_id}: {str(e)}",
+                    server=server_id
+                )
     
     except Exception as e:
-        print(f"Erreur lors de la publication des statistiques: {str(e)}")
+        log_event(logging.ERROR, "status.post_failed", f"Erreur lors de la publication des statistiques: {str(e)}", exc_info=True)
 
 # Lancer le bot
 if __name__ == "__main__":
@@ -1366,16 +4563,17 @@ if __name__ == "__main__":
             missing_vars.append(var)
     
     if missing_vars:
-        print(f"⚠️ Variables d'environnement manquantes: {', '.join(missing_vars)}")
+        log_event(logging.ERROR, "bot.config_missing", f"⚠️ Variables d'environnement manquantes: {', '.join(missing_vars)}", missing=missing_vars)
         exit(1)
     
-    print("=" * 50)
-    print(f"🚀 Démarrage du bot Discord Pterodactyl Monitor v1.0")
-    print(f"📢 Canal de notification: {NOTIFICATION_CHANNEL_ID}")
-    print(f"🔄 Intervalle de vérification: {CHECK_INTERVAL} secondes")
-    print(f"⏱️ Intervalle de mise à jour du statut: {STATUS_UPDATE_INTERVAL} secondes")
-    print(f"👥 Utilisateurs whitelistés: {len(WHITELIST)}")
-    print(f"📊 Publication automatique des statistiques: {'Activée' if AUTO_POST_STATS else 'Désactivée'}")
-    print("=" * 50)
+    log_event(
+        logging.INFO, "bot.starting", "🚀 Démarrage du bot Discord Pterodactyl Monitor v1.0",
+        channel=NOTIFICATION_CHANNEL_ID,
+        check_interval=CHECK_INTERVAL,
+        status_update_interval=STATUS_UPDATE_INTERVAL,
+        whitelisted=len(WHITELIST),
+        auto_post_stats=AUTO_POST_STATS
+    )
     
-    bot.run(DISCORD_TOKEN)
\ No newline at end of file
+    # Les logs de discord.py passent par la même file (log_handler=None: pas de handler propre)
+    bot.run(DISCORD_TOKEN, log_handler=None)
\ No newline at end of file